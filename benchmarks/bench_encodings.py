@@ -0,0 +1,49 @@
+"""
+Benchmark: InReach messages needed per GRIB for each text alphabet.
+
+Usage:
+    python benchmarks/bench_encodings.py [file.grb ...]
+
+Without arguments the Saildocs GRIB fixtures in tests/fixtures are used.
+"""
+import math
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src import configs
+from src.compression_functions import CODEC_NAMES, compress_payload
+from src.encoding_functions import ALPHABETS, decode_payload, encode_payload
+
+
+def bench_file(path: Path):
+    data = path.read_bytes()
+    print(f"\n{path.name}: {len(data)} bytes")
+    print(f"{'codec':<6} {'encoding':<8} {'chars':>7} {'escapes':>7} {'msgs':>5} {'enc ms':>7}")
+
+    for codec in list(CODEC_NAMES) + ["best"]:
+        payload = compress_payload(data, codec)
+
+        for encoding in ALPHABETS:
+            start = time.perf_counter()
+            text = encode_payload(payload, encoding)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            assert decode_payload(text) == payload
+            messages = math.ceil(len(text) / configs.MESSAGE_SPLIT_LENGTH)
+            escapes = text.count("~") - (1 if text.startswith("~") else 0)
+
+            print(f"{codec:<6} {encoding:<8} {len(text):>7} {escapes:>7} {messages:>5} {elapsed_ms:>7.2f}")
+
+
+def main():
+    paths = [Path(p) for p in sys.argv[1:]] or sorted((ROOT / "tests" / "fixtures").glob("*.grb"))
+    for path in paths:
+        bench_file(path)
+
+
+if __name__ == "__main__":
+    main()
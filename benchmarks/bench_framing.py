@@ -0,0 +1,61 @@
+"""
+Benchmark: InReach messages needed per GRIB for each frame format.
+
+Every GRIB is encoded like a reply (configs.GRIB_COMPRESSION and each
+text alphabet) and framed as legacy "msg x/y ... end" messages and as
+compact "#1" frames, with and without CRC.
+
+Usage:
+    python benchmarks/bench_framing.py [file.grb ...]
+
+Without arguments the Saildocs GRIB fixtures in tests/fixtures are used.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src import configs
+from src import framing
+from src import inreach_functions as inreach_func
+from src.encoding_functions import ALPHABETS
+from src.saildoc_functions import encode_saildocs_grib_file, unwrap_messages_to_payload_chunks
+
+JOB_ID = "bench"
+
+
+def frame(payload: str, fmt: str) -> list[str]:
+    if fmt == "legacy":
+        return inreach_func.wrap_messages(inreach_func.split_message(payload))
+    return framing.frame_messages(payload, JOB_ID, crc=fmt == "compact+crc")
+
+
+def bench_file(path: Path):
+    data = path.read_bytes()
+    print(f"\n{path.name}: {len(data)} bytes")
+    print(f"{'encoding':<8} {'chars':>6} {'format':<12} {'msgs':>5} {'payload %':>9} {'max len':>7}")
+
+    for encoding in ALPHABETS:
+        payload = encode_saildocs_grib_file(str(path), encoding=encoding)
+
+        for fmt in ("legacy", "compact", "compact+crc"):
+            messages = frame(payload, fmt)
+            assert "".join(unwrap_messages_to_payload_chunks("\n".join(messages))) == payload
+
+            sent = sum(len(m) for m in messages)
+            print(
+                f"{encoding:<8} {len(payload):>6} {fmt:<12} {len(messages):>5} "
+                f"{100 * len(payload) / sent:>8.1f}% {max(len(m) for m in messages):>7}"
+            )
+
+
+def main():
+    print(f"message length {configs.INREACH_MESSAGE_LENGTH}, legacy split length {configs.MESSAGE_SPLIT_LENGTH}")
+    paths = [Path(p) for p in sys.argv[1:]] or sorted((ROOT / "tests" / "fixtures").glob("*.grb"))
+    for path in paths:
+        bench_file(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: bytes transferred and latency of one mailbox search, before
+(unread filter only, full messages, sender filtered in Python) and after
+(server-side $filter/$orderby/$select from graph_query).
+
+A local fake Graph endpoint serves a synthetic mailbox shaped like the
+real one (Garmin InReach mails with HTML bodies, Saildocs replies, other
+mail) and evaluates the OData options the way Graph does.
+
+Usage:
+    python benchmarks/bench_graph_search.py [rounds]
+"""
+import json
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx
+
+from src.graph_query import build_message_query, to_query_string_params
+
+SERVICE_EMAIL = "no.reply.inreach@garmin.com"
+SAILDOCS_EMAIL = "query-reply@saildocs.com"
+
+
+def synthetic_mailbox() -> list[dict]:
+    now = datetime.now(timezone.utc)
+    garmin_body = (
+        "<html><head><style>" + "p{margin:0}" * 200 + "</style></head><body>"
+        "<p>GRIB ecmwf:24n,34n,72w,60w|8,8|12,48|wind,press</p>"
+        "<p>View the location or send a reply to Test Boat: https://share.garmin.com/TestBoat</p>"
+        "<p>Reply to Garmin: https://explore.garmin.com/textmessage/txtmsg?extId=0000-GUID&adr=x</p>"
+        + "<p>Do not reply directly to this message.</p>" * 40 + "</body></html>"
+    )
+    mailbox = []
+    for i in range(120):
+        if i % 4 == 0:
+            sender, body, unread = SERVICE_EMAIL, garmin_body, i < 20
+        elif i % 4 == 1:
+            sender, body, unread = SAILDOCS_EMAIL, "Data extracted from file ... " * 60, i < 10
+        else:
+            sender, body, unread = f"crew{i}@example.com", "Newsletter " * 400, i % 3 == 0
+
+        mailbox.append({
+            "id": f"AAMkAD-{i:04d}" + "x" * 120,
+            "subject": f"Message {i}",
+            "from": {"emailAddress": {"name": sender, "address": sender}},
+            "receivedDateTime": (now - timedelta(minutes=i * 7)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "isRead": not unread,
+            "hasAttachments": sender == SAILDOCS_EMAIL,
+            "bodyPreview": body[:255],
+            "body": {"contentType": "html", "content": body},
+            "toRecipients": [{"emailAddress": {"name": "Boat", "address": "boat@example.com"}}],
+            "internetMessageId": f"<{i}@example.com>",
+            "conversationId": "AAQkAD" + "y" * 100,
+        })
+    return mailbox
+
+
+def matches(message: dict, clause: str) -> bool:
+    clause = clause.strip()
+    if m := re.fullmatch(r"receivedDateTime ge (\S+)", clause):
+        return message["receivedDateTime"] >= m.group(1)
+    if m := re.fullmatch(r"from/emailAddress/address eq '(.*)'", clause):
+        return message["from"]["emailAddress"]["address"].lower() == m.group(1).replace("''", "'").lower()
+    if m := re.fullmatch(r"isRead eq (true|false)", clause):
+        return message["isRead"] == (m.group(1) == "true")
+    if m := re.fullmatch(r"contains\(subject,'(.*)'\)", clause):
+        return m.group(1).lower() in message["subject"].lower()
+    raise ValueError(f"Unsupported filter: {clause}")
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    mailbox: list[dict] = []
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        messages = self.mailbox
+
+        if "$filter" in params:
+            clauses = params["$filter"].split(" and ")
+            messages = [m for m in messages if all(matches(m, c) for c in clauses)]
+        if params.get("$orderby", "").startswith("receivedDateTime"):
+            messages = sorted(messages, key=lambda m: m["receivedDateTime"], reverse="desc" in params["$orderby"])
+
+        messages = messages[:int(params.get("$top", 10))]
+
+        if "$select" in params:
+            fields = params["$select"].split(",")
+            messages = [{k: m[k] for k in fields if k in m} for m in messages]
+
+        body = json.dumps({"@odata.context": "https://graph.microsoft.com/v1.0/$metadata", "value": messages}).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def search_before(client: httpx.Client, url: str) -> tuple[int, int]:
+    response = client.get(url, params={"$top": 25, "$filter": "isRead eq false"})
+    messages = [
+        m for m in response.json()["value"]
+        if m["from"]["emailAddress"]["address"].lower() == SERVICE_EMAIL
+    ]
+    messages.sort(key=lambda m: m["receivedDateTime"], reverse=True)
+    return len(response.content), len(messages)
+
+
+def search_after(client: httpx.Client, url: str) -> tuple[int, int]:
+    query = build_message_query(sender_email=SERVICE_EMAIL, unread_only=True, top=25)
+    response = client.get(url, params=to_query_string_params(query))
+    return len(response.content), len(response.json()["value"])
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    FakeGraphHandler.mailbox = synthetic_mailbox()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1.0/users/boat@example.com/messages"
+
+    print(f"{'search':<8} {'bytes':>9} {'matches':>8} {'ms/search':>10}")
+    with httpx.Client() as client:
+        for name, search in (("before", search_before), ("after", search_after)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                size, count = search(client, url)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / rounds
+            print(f"{name:<8} {size:>9} {count:>8} {elapsed_ms:>10.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
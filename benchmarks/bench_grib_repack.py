@@ -0,0 +1,73 @@
+"""
+Benchmark: GRIB1 re-packing time and size on large synthetic grids.
+
+Usage:
+    python benchmarks/bench_grib_repack.py [file.grb ...]
+
+Without arguments a synthetic 0.25 degree Atlantic GRIB (wind + pressure,
+several forecast times) is built from the Saildocs fixture.
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src import configs
+from src import grib_functions as grib_func
+from src.compression_functions import compress_payload
+
+
+def synthetic_grib(ni: int = 261, nj: int = 137, times: int = 4) -> bytes:
+    """
+    Atlantic crossing box (44N-10N, 75W-10W) at 0.25 degrees, packed at
+    Saildocs-like fine precision.
+    """
+    template = (ROOT / "tests" / "fixtures" / "saildocs_sample.grb").read_bytes()
+    templates = {m.parameter: m for m in grib_func.parse_grib(template)}
+    rng = np.random.default_rng(0)
+    lat, lon = np.meshgrid(np.linspace(0, 3, nj), np.linspace(0, 6, ni), indexing="ij")
+
+    messages = []
+    for parameter, base, amplitude, precision in ((2, 101300, 2500, 1.0), (33, 0, 15, 0.01), (34, 0, 15, 0.01)):
+        message = templates[parameter]
+        gds = message.gds[:6] + ni.to_bytes(2, "big") + nj.to_bytes(2, "big") + message.gds[10:]
+        message = grib_func.GribMessage(message.pds, gds, None, message.bds)
+
+        for t in range(times):
+            field = base + amplitude * np.sin(lat + t) * np.cos(lon - t) + rng.normal(0, amplitude / 50, lat.shape)
+            messages.append(grib_func.pack_values(message, field.ravel(), precision).to_bytes())
+
+    return b"".join(messages)
+
+
+def bench(name: str, data: bytes):
+    start = time.perf_counter()
+    repacked = grib_func.repack_grib(data, configs.GRIB_PRECISION)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    before = len(compress_payload(data))
+    after = len(compress_payload(repacked))
+    split = configs.MESSAGE_SPLIT_LENGTH
+
+    print(f"\n{name}")
+    print(f"  raw GRIB        {len(data):>9} -> {len(repacked):>9} bytes")
+    print(f"  compressed      {before:>9} -> {after:>9} bytes")
+    print(f"  base64 messages {-(-before * 4 // 3 // split):>9} -> {-(-after * 4 // 3 // split):>9}")
+    print(f"  repack time     {elapsed_ms:>9.1f} ms")
+
+
+def main():
+    if len(sys.argv) > 1:
+        for path in map(Path, sys.argv[1:]):
+            bench(path.name, path.read_bytes())
+    else:
+        bench("synthetic 0.25deg Atlantic", synthetic_grib())
+        bench("saildocs_sample.grb", (ROOT / "tests" / "fixtures" / "saildocs_sample.grb").read_bytes())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: cold-start import time of the function modules.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter
+and reports the total import time, the slowest direct imports and
+which heavy SDKs were loaded.
+
+Usage:
+    python benchmarks/bench_import_time.py [module ...] [--runs N]
+
+Without arguments src.process (what function_app imports per tick) is measured.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# SDKs a run should only import when it uses them
+HEAVY_MODULES = ("openai", "numpy", "msgraph", "azure.identity", "httpx")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ImportEntry:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportReport:
+    module: str
+    entries: list[ImportEntry]
+
+    @property
+    def total_ms(self) -> float:
+        entry = next((e for e in self.entries if e.module == self.module), None)
+        return entry.cumulative_us / 1000 if entry else 0.0
+
+    @property
+    def loaded(self) -> set[str]:
+        return {e.module for e in self.entries}
+
+    def heavy_loaded(self) -> list[str]:
+        return [m for m in HEAVY_MODULES if m in self.loaded]
+
+    def slowest_imports(self, count: int = 10) -> list[ImportEntry]:
+        """
+        Direct imports of the measured module, slowest first.
+        """
+        direct = [e for e in self.entries if e.depth == 1]
+        return sorted(direct, key=lambda e: e.cumulative_us, reverse=True)[:count]
+
+
+def parse_importtime(stderr: str, module: str) -> ImportReport:
+    """
+    Parse `-X importtime` output (one line per imported module).
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append(ImportEntry(name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return ImportReport(module, entries)
+
+
+def measure_imports(module: str, python: str = sys.executable) -> ImportReport:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr, module)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modules", nargs="*", default=["src.process"])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        reports = [measure_imports(module) for _ in range(args.runs)]
+        totals = [r.total_ms for r in reports]
+        report = reports[-1]
+
+        print(f"\n{module}: median {statistics.median(totals):.1f} ms "
+              f"(min {min(totals):.1f}, max {max(totals):.1f}, {len(report.entries)} modules)")
+        print(f"heavy SDKs loaded: {', '.join(report.heavy_loaded()) or 'none'}")
+        print(f"{'import':<32} {'cumulative ms':>13}")
+        for entry in report.slowest_imports():
+            print(f"{entry.module:<32} {entry.cumulative_us / 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: per-message cost of a new httpx client per chunk (old
+InReachSender behaviour) versus the pooled InReachSender client.
+
+A local stand-in for explore.garmin.com accepts the form POSTs and counts
+TCP connections, so the removed connection setup shows up per message.
+
+Usage:
+    python benchmarks/bench_inreach_sender.py [messages]
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("MAILBOX", "bench@example.com")
+
+import httpx
+
+from src import configs
+from src.inreach_sender import InReachSender
+
+
+class StandInGarminHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        StandInGarminHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        body = b'{"Success": true}'
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def send_with_new_client_per_chunk(url: str, messages: list[str]):
+    sender = InReachSender()
+    for message in messages:
+        async with httpx.AsyncClient(cookies=configs.INREACH_COOKIES) as client:
+            await sender.post_request_to_inreach(client, url, message)
+
+
+async def send_with_pooled_client(url: str, messages: list[str]):
+    async with InReachSender() as sender:
+        for message in messages:
+            await sender.send(url, message)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInGarminHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_port}/textmessage/txtmsg?extId=BENCH-GUID"
+    messages = [f"msg {i}/{count}:\n{'A' * 120}\nend" for i in range(1, count + 1)]
+
+    print(f"{'mode':<22} {'msgs':>5} {'conns':>6} {'total ms':>9} {'ms/msg':>7}")
+    for name, runner in (
+        ("new client per chunk", send_with_new_client_per_chunk),
+        ("pooled client", send_with_pooled_client),
+    ):
+        StandInGarminHandler.connections = 0
+        start = time.perf_counter()
+        asyncio.run(runner(url, messages))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(
+            f"{name:<22} {count:>5} {StandInGarminHandler.connections:>6} "
+            f"{elapsed_ms:>9.1f} {elapsed_ms / count:>7.2f}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
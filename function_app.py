@@ -1,13 +1,12 @@
 #FILE function_app.py
 import logging
-import asyncio
 import azure.functions as func
 
 app = func.FunctionApp()
 
 @app.function_name(name="process_mails")
 @app.timer_trigger(schedule="0 */2 * * * *", arg_name="mytimer")
-def process_mails(mytimer: func.TimerRequest):
+async def process_mails(mytimer: func.TimerRequest):
     logging.info("Timer triggered")
 
     if mytimer.past_due:
@@ -18,7 +17,9 @@ def process_mails(mytimer: func.TimerRequest):
         from src import process
         logging.info("Successfully imported run()")
 
-        asyncio.run(process.run())
+        # Awaited on the worker's event loop, which outlives the invocation,
+        # so the pooled clients of service_registry are reused next tick
+        await process.run()
         logging.info("Mail processing completed successfully")
 
     except Exception:
@@ -85,6 +85,7 @@ else:
 # APPLICATION IMPORTS (after logging setup)
 # =================================================
 from src import process
+from src.inreach_sender import InReachSender
 logger.info("Imports completed")
 
 # =================================================
@@ -92,13 +93,15 @@ logger.info("Imports completed")
 # =================================================
 def main_cli():
     async def runner():
-        if args.loop:
-            logger.info("Running in loop mode")
-            while True:
-                await process.run()
-                await asyncio.sleep(300)
-        else:
-            await process.run()
+        # One pooled InReach client for the lifetime of the worker
+        async with InReachSender() as inreach_sender:
+            if args.loop:
+                logger.info("Running in loop mode")
+                while True:
+                    await process.run(inreach_sender=inreach_sender)
+                    await asyncio.sleep(300)
+            else:
+                await process.run(inreach_sender=inreach_sender)
 
     asyncio.run(runner())
 
@@ -3,7 +3,7 @@ from typing import Literal
 
 @dataclass
 class InReachRequest:
-    type: Literal["weather", "chat"]
+    type: Literal["weather", "forecast", "chat", "resend"]
     payload_text: str
     reply_url: str
 
@@ -0,0 +1,175 @@
+#FILE src/chat_budget.py
+import re
+from dataclasses import dataclass
+from typing import Literal
+
+import src.configs as configs
+
+# Budget units: "CHAT 50: ..." words (the model is only asked),
+# "CHAT 2m: ..." InReach messages, "CHAT 200c: ..." characters
+WORDS = "words"
+MESSAGES = "messages"
+CHARS = "chars"
+
+_BUDGET = re.compile(r"^\s*(\d+)\s*([mMcC]?)\s*:(.*)$", re.S)
+
+
+@dataclass(frozen=True)
+class ChatBudget:
+    unit: Literal["words", "messages", "chars"]
+    value: int
+
+    @property
+    def max_chars(self) -> int | None:
+        """
+        Characters of answer text allowed, None for a word budget.
+        A message holds configs.MESSAGE_SPLIT_LENGTH characters
+        (see inreach_functions.split_message).
+        """
+        if self.unit == MESSAGES:
+            return min(self.value, configs.CHAT_MAX_MESSAGES) * configs.MESSAGE_SPLIT_LENGTH
+        if self.unit == CHARS:
+            return min(self.value, configs.CHAT_MAX_MESSAGES * configs.MESSAGE_SPLIT_LENGTH)
+        return None
+
+
+def parse_chat_request(request: str) -> tuple[ChatBudget, str] | None:
+    """
+    Split '<budget>: <prompt>' where budget is 50 (words), 2m (messages)
+    or 200c (characters).
+    Returns (ChatBudget, prompt) or None if the request has another format.
+    """
+    match = _BUDGET.match(request)
+    if not match or int(match.group(1)) <= 0:
+        return None
+
+    value, unit, prompt = match.groups()
+    unit = {"m": MESSAGES, "c": CHARS}.get(unit.lower(), WORDS)
+    return ChatBudget(unit, int(value)), prompt
+
+
+def is_size_budget(request: str) -> bool:
+    """
+    True for message and character budgets, which are enforced on the answer.
+    """
+    parsed = parse_chat_request(request)
+    return parsed is not None and parsed[0].unit != WORDS
+
+
+# =========================
+# COMPACTION
+# =========================
+# Longest phrases first; matched as whole words, case insensitive
+NAUTICAL_ABBREVIATIONS = {
+    "nautical miles": "nm",
+    "nautical mile": "nm",
+    "knots": "kt",
+    "knot": "kt",
+    "degrees": "deg",
+    "hectopascals": "hPa",
+    "millibars": "mb",
+    "kilometers": "km",
+    "kilometres": "km",
+    "meters": "m",
+    "metres": "m",
+    "hours": "h",
+    "minutes": "min",
+    "approximately": "~",
+    "forecast": "fcst",
+    "visibility": "vis",
+    "temperature": "temp",
+    "pressure": "pres",
+    "becoming": "bcmg",
+    "occasionally": "occ",
+    "increasing": "incr",
+    "decreasing": "decr",
+    "moderate": "mod",
+    "scattered": "sct",
+    "showers": "shwrs",
+    "thunderstorms": "tstms",
+    "gusts": "gst",
+    "gusting": "gst",
+    "latitude": "lat",
+    "longitude": "lon",
+    "position": "pos",
+    "tomorrow": "tmrw",
+    "tonight": "tngt",
+    "between": "btwn",
+}
+
+_ABBREVIATION = re.compile(
+    r"\b(" + "|".join(re.escape(p) for p in sorted(NAUTICAL_ABBREVIATIONS, key=len, reverse=True)) + r")\b",
+    re.I,
+)
+
+# Compass points are only abbreviated as a direction ("north-east winds",
+# "50 nm south of"), not in names like "the Middle East" or "West Africa"
+COMPASS_POINTS = {
+    "northeast": "NE",
+    "northwest": "NW",
+    "southeast": "SE",
+    "southwest": "SW",
+    "north-east": "NE",
+    "north-west": "NW",
+    "south-east": "SE",
+    "south-west": "SW",
+    "north": "N",
+    "south": "S",
+    "east": "E",
+    "west": "W",
+}
+
+_COMPASS = "|".join(re.escape(p) for p in sorted(COMPASS_POINTS, key=len, reverse=True))
+# Before a wind, swell or number: "north-east winds", "east 15kt"
+_COMPASS_BEFORE = re.compile(
+    r"\b(" + _COMPASS + r")\b(?=[\s-]*(?:winds?|swells?|breezes?|gales?|currents?|\d))",
+    re.I,
+)
+# After a number or distance: "50 nm south of"
+_COMPASS_AFTER = re.compile(r"(\d\s*(?:kt|nm|km|deg)?\s+)(" + _COMPASS + r")\b", re.I)
+
+# Typographic characters the model likes, as plain ASCII
+_ASCII = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "…": "...", " ": " ", "°": "",
+})
+
+
+def compact_text(text: str) -> str:
+    """
+    Deterministic shortening of a chat answer: plain ASCII punctuation,
+    no markdown, nautical abbreviations, compass points of directions
+    and no redundant whitespace.
+    """
+    text = text.translate(_ASCII)
+    text = re.sub(r"[*_#`]+", "", text)
+    text = re.sub(r"^\s*[-+]\s+", "", text, flags=re.M)
+    text = _ABBREVIATION.sub(lambda m: NAUTICAL_ABBREVIATIONS[m.group(1).lower()], text)
+    text = _COMPASS_BEFORE.sub(lambda m: COMPASS_POINTS[m.group(1).lower()], text)
+    text = _COMPASS_AFTER.sub(lambda m: m.group(1) + COMPASS_POINTS[m.group(2).lower()], text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r" ([,.;:!?)])", r"\1", text)
+    text = re.sub(r"(\d) (kt|nm|h|hPa|mb|km|m|deg)\b", r"\1\2", text)
+    return text.strip()
+
+
+def fit_to_budget(text: str, max_chars: int) -> str:
+    """
+    Cut text that is still too long after compaction at the last
+    sentence or word that fits, marked with "..".
+    """
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 2:
+        # No room for the ".." mark
+        return text[:max(max_chars, 0)]
+
+    cut = text[:max_chars - 2]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end >= max_chars // 2:
+        return cut[:sentence_end + 1]
+
+    word_end = cut.rfind(" ")
+    if word_end > 0:
+        cut = cut[:word_end]
+    return cut.rstrip(" ,;:-") + ".."
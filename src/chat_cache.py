@@ -0,0 +1,103 @@
+#FILE src/chat_cache.py
+import logging
+import re
+import time
+
+import src.configs as configs
+from src import chat_budget
+from src.sqlite_cache import SqliteLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# CACHE KEY
+# =========================
+# Words, and numbers with their sign, decimals, ranges and units
+# ("-10c", "1.5", "10-15", "m/s"); other punctuation is dropped
+_TOKEN = re.compile(r"(?<!\w)-?\d+(?:[-./]\d+)*\w*(?:/\w+)*|\w+(?:/\w+)*")
+
+
+def cache_key(request: str) -> str | None:
+    """
+    Key of a CHAT request: its budget and the prompt without case,
+    punctuation or extra whitespace. Signs, decimal points and "/" in
+    numbers and units are kept.
+
+        "50: What is a knot?" -> "words=50|what is a knot"
+
+    None for requests without a budget (they are not answered by OpenAI).
+    """
+    parsed = chat_budget.parse_chat_request(request)
+    if parsed is None:
+        return None
+
+    budget, prompt = parsed
+    words = _TOKEN.findall(prompt.lower())
+    if not words:
+        return None
+    return f"{budget.unit}={budget.value}|{' '.join(words)}"
+
+
+# =========================
+# CHAT CACHE
+# =========================
+class ChatCache:
+    """
+    Chat answers by normalized prompt and budget.
+    Entries expire after configs.CHAT_CACHE_TTL seconds.
+
+    hits and misses count the lookups of this process.
+    """
+
+    def __init__(self, store: SqliteLRUCache, ttl: float | None = None):
+        self.store = store
+        self.ttl = ttl if ttl is not None else configs.CHAT_CACHE_TTL
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, request: str, now: float | None = None) -> str | None:
+        key = cache_key(request)
+        if key is None:
+            return None
+
+        entry = self.store.get(key, now=now)
+        if entry is None:
+            self.misses += 1
+            logger.info("Chat cache miss: %s (hits=%d misses=%d)", key, self.hits, self.misses)
+            return None
+
+        self.hits += 1
+        logger.info("Chat cache hit: %s (hits=%d misses=%d)", key, self.hits, self.misses)
+        return entry[0].decode("utf-8")
+
+    def put(self, request: str, answer: str, now: float | None = None):
+        key = cache_key(request)
+        if key is None or not answer:
+            return
+
+        now = time.time() if now is None else now
+        self.store.put(key, answer.encode("utf-8"), now + self.ttl, now=now)
+        logger.info("Chat answer cached: %s", key)
+
+
+_chat_cache: ChatCache | None = None
+
+
+def get_chat_cache() -> ChatCache:
+    """
+    Process wide ChatCache at configs.CHAT_CACHE_PATH.
+    """
+    global _chat_cache
+    if _chat_cache is None:
+        _chat_cache = ChatCache(SqliteLRUCache(
+            configs.CHAT_CACHE_PATH(),
+            max_entries=configs.CHAT_CACHE_MAX_ENTRIES,
+            table="chat_cache",
+        ))
+    return _chat_cache
@@ -0,0 +1,128 @@
+#FILE src/compression_functions.py
+import bz2
+import logging
+import lzma
+import zlib
+
+# =========================
+# CODEC TAGS
+# =========================
+# The first byte of every compressed payload identifies the codec used.
+# Legacy payloads (raw GRIB without a tag) start with b"GRIB" and are
+# detected by the decompressor as well.
+CODEC_NONE = 0x00
+CODEC_ZLIB = 0x01
+CODEC_LZMA = 0x02
+CODEC_BZ2 = 0x03
+
+CODEC_NAMES = {
+    "none": CODEC_NONE,
+    "zlib": CODEC_ZLIB,
+    "lzma": CODEC_LZMA,
+    "bz2": CODEC_BZ2,
+}
+
+# Raw LZMA2 stream: no xz container, saves ~60 bytes per payload
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 9 | lzma.PRESET_EXTREME}]
+
+
+# =========================
+# CODEC IMPLEMENTATIONS
+# =========================
+def _zlib_compress(data: bytes) -> bytes:
+    # Raw deflate (wbits=-15): no zlib header/checksum
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _zlib_decompress(data: bytes) -> bytes:
+    return zlib.decompress(data, -15)
+
+
+def _lzma_compress(data: bytes) -> bytes:
+    return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+
+
+def _lzma_decompress(data: bytes) -> bytes:
+    return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+
+
+_CODECS = {
+    CODEC_NONE: (bytes, bytes),
+    CODEC_ZLIB: (_zlib_compress, _zlib_decompress),
+    CODEC_LZMA: (_lzma_compress, _lzma_decompress),
+    CODEC_BZ2: (lambda data: bz2.compress(data, 9), bz2.decompress),
+}
+
+
+# =========================
+# COMPRESS
+# =========================
+def compress_payload(data: bytes, codec: str = "best") -> bytes:
+    """
+    Compress data and prefix it with a one-byte codec tag.
+
+    Args:
+        data (bytes): raw payload (e.g. GRIB file content)
+        codec (str): "none", "zlib", "lzma", "bz2" or "best".
+            "best" tries every codec and keeps the smallest result.
+
+    Returns:
+        bytes: <codec tag><compressed data>
+    """
+    codec = codec.lower()
+
+    if codec == "best":
+        candidates = [compress_payload(data, name) for name in CODEC_NAMES]
+        best = min(candidates, key=len)
+        logging.info(
+            "Best compression: %s (%d -> %d bytes)",
+            _codec_name(best[0]),
+            len(data),
+            len(best),
+        )
+        return best
+
+    if codec not in CODEC_NAMES:
+        raise ValueError(f"Unknown compression codec: {codec}")
+
+    tag = CODEC_NAMES[codec]
+    compress, _ = _CODECS[tag]
+    return bytes([tag]) + compress(data)
+
+
+# =========================
+# DECOMPRESS
+# =========================
+def decompress_payload(payload: bytes) -> bytes:
+    """
+    Decompress a payload produced by compress_payload.
+
+    Untagged legacy payloads (raw GRIB bytes) are returned unchanged.
+    """
+    if not payload:
+        raise ValueError("payload is empty")
+
+    if payload.startswith(b"GRIB"):
+        logging.info("Untagged payload, assuming raw GRIB")
+        return bytes(payload)
+
+    tag = payload[0]
+    if tag not in _CODECS:
+        raise ValueError(f"Unknown compression codec tag: {tag:#04x}")
+
+    _, decompress = _CODECS[tag]
+    data = decompress(payload[1:])
+
+    logging.info("Decompressed %s payload: %d -> %d bytes", _codec_name(tag), len(payload), len(data))
+    return data
+
+
+# =========================
+# HELPERS
+# =========================
+def _codec_name(tag: int) -> str:
+    for name, value in CODEC_NAMES.items():
+        if value == tag:
+            return name
+    return f"{tag:#04x}"
@@ -13,11 +13,29 @@ Copy this file to configs.py or configure the values as environment variables.
 TENANT_ID = "your-tenant-id"
 CLIENT_ID = "your-client-id"
 CLIENT_SECRET = "your-client-secret"
+# Graph JSON batching: mark-as-read, body and attachment fetches issued
+# within the window (seconds) are sent as one $batch call (max 20 requests)
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+GRAPH_BATCH_WINDOW = 0.05
+# Renew the Graph token when it expires within this many seconds
+# (azure.identity also renews its cached token in the last 5 minutes)
+GRAPH_TOKEN_REFRESH_MARGIN = 300
 
 #--------------------------
 # OpenAI
 #--------------------------
 OPEN_AI_KEY = "Your-openai-key"
+# Whole chat completion (seconds), single read and client retries
+OPENAI_RESPONSE_TIMEOUT = 60
+OPENAI_TIMEOUT = 20
+OPENAI_MAX_RETRIES = 2
+# Chat answers budgeted in messages ("CHAT 2m:") or characters ("CHAT 200c:"):
+# largest budget in messages, answer length asked from the model
+# (share of the budget) and re-asks while the answer is too long
+CHAT_MAX_MESSAGES = 5
+CHAT_TARGET_RATIO = 0.85
+CHAT_COMPACTION_ROUNDS = 2
 
 # -------------------------
 # Mail / InReach / Saildocs
@@ -27,6 +45,30 @@ SERVICE_EMAIL = "sender@domain.com"  # Sender of InReach emails
 SAILDOCS_EMAIL_QUERY = "query@saildocs.com"  # Saildocs query address
 SAILDOCS_RESPONSE_EMAIL = "query-reply@saildocs.com"  # Saildocs response address
 TOP_SEARCH_COUNT_MAILBOX = 25
+# Number of InReach requests processed concurrently per run
+MAX_CONCURRENT_REQUESTS = 4
+# Give up on a Saildocs reply after (seconds), wait per run (seconds),
+# Inbox delta poll interval and how far back (seconds) replies received
+# before waiting are considered
+SAILDOCS_RESPONSE_TIMEOUT = 900
+SAILDOCS_RESPONSE_WAIT = 30
+SAILDOCS_POLL_INTERVAL = 10
+SAILDOCS_LOOKBACK = 900
+
+# -------------------------
+# Jobs
+# -------------------------
+# Requests are kept as jobs (RECEIVED, QUERIED, GRIB_READY, SENDING, DONE)
+# in a SQLite file, so each run only advances what can progress and
+# sending resumes after the last delivered part. Use a persistent path.
+JOB_STORE_PATH = "/home/data/jobs.sqlite"  # ":memory:" keeps jobs for one run only
+# Seconds a run may spend advancing jobs (timer runs every 2 minutes)
+RUN_TIME_BUDGET = 90
+# Failed steps before a job is given up, and send rounds with failed parts
+JOB_MAX_ATTEMPTS = 3
+JOB_MAX_SEND_ROUNDS = 3
+# Finished jobs are deleted after (seconds)
+JOB_RETENTION_SECONDS = 172800
 
 # -------------------------
 # Garmin / InReach
@@ -34,8 +76,108 @@ TOP_SEARCH_COUNT_MAILBOX = 25
 BASE_GARMIN_REPLY_URL = "https://garmin.com/sendmessage"
 # Split length for outgoing InReach messages
 MESSAGE_SPLIT_LENGTH = 120
+# Characters per InReach message. GRIB replies keep the "msg x/y ... end"
+# format with MESSAGE_SPLIT_LENGTH chunks ("legacy") that old decoders
+# read; "compact" frames ("#1" header with job id and base36 seq/total,
+# no footer) fill each message. "GRIB <command> frame=compact" switches
+# per request. GRIB_FRAME_CRC adds a CRC-16 per compact frame.
+INREACH_MESSAGE_LENGTH = 160
+GRIB_FRAMING = "legacy"
+GRIB_FRAME_CRC = False
+# Reed-Solomon parity frames per GRIB reply (compact framing only), so
+# any N of N + parity frames rebuild it. "GRIB <command> fec=2" overrides
+# the default per request, up to GRIB_FEC_MAX_PARITY, and implies compact
+# framing.
+GRIB_FEC_PARITY = 0
+GRIB_FEC_MAX_PARITY = 10
+# "GRIB gfs:24n,65w;30n,55w|1,1|24|wind corridor=120": grid points more
+# than corridor nm from the route are masked out of the GRIB (GRIB1 bitmap)
+GRIB_CORRIDOR_NM = 120
 # Delay between outgoing messages (seconds)
 DELAY_BETWEEN_MESSAGES = 5
+# Adaptive send rate: interval between messages stays within these bounds
+SEND_MIN_INTERVAL = 1
+SEND_MAX_INTERVAL = 60
+# Rate increase (messages/second) after each accepted message
+SEND_RATE_INCREASE = 0.05
+# Attempts per message and base retry backoff (seconds, jittered)
+SEND_MAX_ATTEMPTS = 3
+SEND_RETRY_BACKOFF = 5
+# Pooled HTTP client used by InReachSender
+INREACH_HTTP2 = True
+INREACH_TIMEOUT_SECONDS = 30
+INREACH_MAX_CONNECTIONS = 4
+INREACH_KEEPALIVE_SECONDS = 120
+
+# -------------------------
+# GRIB encoding
+# -------------------------
+# Compression codec applied before base64: none, zlib, lzma, bz2 or best
+GRIB_COMPRESSION = "best"
+# Text alphabet for the payload: base64, base85 or base88 (base91-style)
+GRIB_ENCODING = "base64"
+
+# Re-quantize GRIB fields before encoding (see grib_functions.repack_grib)
+GRIB_REPACK = True
+# Precision per GRIB1 parameter (WMO table 2), in the parameter's unit
+GRIB_PRECISION = {
+    1: 100.0,   # PRES  Pa   (1 hPa)
+    2: 100.0,   # PRMSL Pa   (1 hPa)
+    7: 10.0,    # HGT   gpm
+    11: 0.5,    # TMP   K
+    33: 0.5,    # UGRD  m/s  (~1 kt)
+    34: 0.5,    # VGRD  m/s  (~1 kt)
+    52: 5.0,    # RH    %
+    61: 0.5,    # APCP  kg/m2
+    71: 5.0,    # TCDC  %
+    100: 0.1,   # HTSGW m
+}
+
+# -------------------------
+# GRIB cache
+# -------------------------
+# Downloaded GRIB files are reused for identical Saildocs commands until
+# the next model cycle is available (SQLite file, LRU evicted)
+GRIB_CACHE_ENABLED = True
+GRIB_CACHE_PATH = "/tmp/grib_cache.sqlite"  # ":memory:" keeps it in-process
+GRIB_CACHE_MAX_ENTRIES = 100
+# Model runs: model -> (hours between cycles, hours until a cycle is available at Saildocs)
+GRIB_MODEL_CYCLES = {
+    "gfs": (6, 4),
+    "ecmwf": (12, 8),
+    "icon": (6, 4),
+    "cmc": (12, 5),
+}
+
+# -------------------------
+# Chat cache
+# -------------------------
+# Answers to repeated CHAT prompts (same words, any case or punctuation,
+# same budget) are reused for CHAT_CACHE_TTL seconds (SQLite file, LRU evicted)
+CHAT_CACHE_ENABLED = True
+CHAT_CACHE_PATH = "/tmp/chat_cache.sqlite"  # ":memory:" keeps it in-process
+CHAT_CACHE_MAX_ENTRIES = 500
+CHAT_CACHE_TTL = 7 * 24 * 3600
+
+# -------------------------
+# Text forecast (FCST)
+# -------------------------
+# "FCST 24.5n,65w|0,24" replies with wind and pressure at the positions
+# as text, from a GRIB of FCST_RESOLUTION degrees around them
+FCST_MODEL = "gfs"
+FCST_HOURS = "0,12,24,48"
+FCST_RESOLUTION = 0.5
+FCST_MAX_POSITIONS = 4
+
+# -------------------------
+# Sent parts (RESEND)
+# -------------------------
+# Parts of every reply are kept for SENT_PARTS_TTL seconds, so
+# "RESEND <job> 3,7" sends lost parts again (two entries per reply, LRU evicted)
+SENT_PARTS_ENABLED = True
+SENT_PARTS_PATH = "/tmp/sent_parts.sqlite"  # ":memory:" keeps it in-process
+SENT_PARTS_MAX_ENTRIES = 400
+SENT_PARTS_TTL = 2 * 24 * 3600
 
 
 # -------------------------
@@ -1,12 +1,13 @@
 #FILE src/email_functions.py
-import asyncio
 import re
+import asyncio
 import logging
 from html import unescape
 
 import src.configs as configs
 
 from src.graph_mail import GraphMailService
+from src.graph_query import BODY_PREVIEW_LENGTH
 from src.InReachRequest import InReachRequest
 
 logger = logging.getLogger(__name__)
@@ -14,12 +15,15 @@ logger = logging.getLogger(__name__)
 # ======================================================
 # 1️⃣ GARMIN INREACH MAIL → INREACH REQUEST
 # ======================================================
-async def retrieve_new_inreach_request(mail: GraphMailService):
+async def retrieve_new_inreach_requests(mail: GraphMailService) -> list[InReachRequest]:
     """
-    Process exactly one unread InReach request mail.
-    Extracts Saildocs command and Garmin reply URL.
-    Marks InReach mail as read.
-    Returns: InReachRequest (type, payload_text, garmin_reply_url) or None
+    Process all unread InReach request mails (up to TOP_SEARCH_COUNT_MAILBOX).
+    Extracts Saildocs command and Garmin reply URL of each mail.
+    Marks processed InReach mails as read. A mail that fails is logged
+    and skipped without affecting the others.
+    Mails are handled concurrently, so their body fetches and
+    mark-as-read calls share Graph $batch requests.
+    Returns: list[InReachRequest] (type, payload_text, garmin_reply_url)
     """
     logger.info("Search for mail in mail account: %s", configs.MAILBOX())
     logger.info("Search for mail from Service Mail: %s", configs.SERVICE_EMAIL())
@@ -32,13 +36,35 @@ async def retrieve_new_inreach_request(mail: GraphMailService):
 
     if not messages or not messages.value:
         logger.info("No unread InReach requests found")
-        return None
+        return []
+
+    logger.info("Found %d unread InReach requests", len(messages.value))
+
+    results = await asyncio.gather(
+        *(_retrieve_inreach_request(mail, msg) for msg in messages.value),
+        return_exceptions=True,
+    )
+
+    inreach_requests: list[InReachRequest] = []
+    for msg, result in zip(messages.value, results):
+        if isinstance(result, Exception):
+            logger.error("Failed retrieving InReach request %s: %s", msg.id, result, exc_info=result)
+            continue
+
+        if result:
+            inreach_requests.append(result)
+
+    return inreach_requests
+
 
-    msg = messages.value[0]
+async def _retrieve_inreach_request(mail: GraphMailService, msg) -> InReachRequest | None:
+    """
+    Decode one InReach request mail and mark it as read.
+    """
     logger.info("Processing InReach request %s", msg.id)
 
     try:
-        body_message = await _fetch_message_body_from_mail(msg.id, mail)
+        body_message = await _message_text(msg, mail)
 
         inreach_request = _decode_inreach_request(body_message)
         if inreach_request:
@@ -78,73 +104,76 @@ async def request_weather_report(mail: GraphMailService, message_request: str):
 # ======================================================
 # 2️⃣ SAILDOCS → GARMIN INREACH (RESPONSE)
 # ======================================================
-async def process_new_saildocs_response(mail: GraphMailService, saildocs_command: str):
+async def process_new_saildocs_response(
+    mail: GraphMailService,
+    saildocs_command: str,
+    timeout: float | None = None,
+):
     """
-    Poll for unread Saildocs response for the given command.
-    Poll every 10 sec, up to 6 times (1 min total).
-    Downloads GRIB in-memory and returns (BytesIO, garmin_reply_url)
+    Wait for the unread Saildocs response for the given command.
+    Uses the Inbox subscription of the mailbox, so the request wakes up as
+    soon as the reply arrives (waits up to timeout seconds, default
+    SAILDOCS_RESPONSE_WAIT; the job checks again next run).
+    Downloads GRIB in-memory and returns PayloadBuffer, or None
     """
+    subscription = mail.inbox_subscription(configs.MAILBOX())
+    timeout = configs.SAILDOCS_RESPONSE_WAIT if timeout is None else timeout
 
-    poll_attempts = 6
-    for attempt in range(poll_attempts):
-        logger.info("Polling for Saildocs response (%d/%d)...", attempt + 1, poll_attempts)
+    logger.info("Waiting for Saildocs response (timeout %ss)...", timeout)
+    msg = await subscription.wait_for(
+        lambda m: _is_saildocs_response(m, saildocs_command),
+        timeout=timeout,
+    )
 
-        messages = await mail.search_messages(
-            user_id=configs.MAILBOX(),
-            sender_email=configs.SAILDOCS_RESPONSE_EMAIL(),
-            unread_only=True,
-            top=5
-        )
+    if msg is None:
+        logger.info("No Saildocs response found for command yet")
+        return None
 
-        if messages and messages.value:
-            for msg in messages.value:
-                message_body = msg.body.content or ""
-                if msg.body.content_type == "html":
-                    decoded = _html_to_text(message_body)
-                else:
-                    decoded = message_body
+    # Download GRIB attachment in-memory
+    grib_file = await mail.download_grib_attachment(
+        user_id=configs.MAILBOX(),
+        message_id=msg.id
+    )
 
-                decoded = decoded.lower()
+    await mail.mark_as_read(configs.MAILBOX(), msg.id)
 
-                # Check if this Saildocs mail corresponds to our command
-                if saildocs_command.lower() in decoded:
-                    # Download GRIB attachment in-memory
-                    grib_file = await mail.download_grib_attachment(
-                        user_id=configs.MAILBOX(),
-                        message_id=msg.id
-                    )
+    if not grib_file:
+        logger.warning("No GRIB attachment found in %s", msg.id)
+        return None
 
-                    if not grib_file:
-                        logger.warning("No GRIB attachment found in %s", msg.id)
-                        await mail.mark_as_read(configs.MAILBOX(), msg.id)
-                        return None
+    logger.info("Saildocs response %s processed and marked as read", msg.id)
+    return grib_file
 
-                    await mail.mark_as_read(configs.MAILBOX(), msg.id)
-                    logger.info("Saildocs response %s processed and marked as read", msg.id)
 
-                    return grib_file
+# ======================================================
+# HELPERS
+# ======================================================
+async def _message_text(msg, mail: GraphMailService) -> str:
+    """
+    Lowercased text of an InReach request mail, taken from the search
+    result. Only a truncated bodyPreview costs an extra (batched) fetch.
+    """
+    body = getattr(msg, "body", None)
+    if body is not None and body.content:
+        if body.content_type == "html":
+            return _html_to_text(body.content).lower()
+        return body.content.lower()
 
-        await asyncio.sleep(10)
+    preview = getattr(msg, "body_preview", None) or ""
+    if len(preview) < BODY_PREVIEW_LENGTH:
+        return preview.lower()
 
-    logger.warning("No Saildocs response found for command after polling")
-    return None
+    return await _fetch_message_body_from_mail(msg.id, mail)
 
 
-# ======================================================
-# HELPERS
-# ======================================================
 async def _fetch_message_body_from_mail(message_id, mail: GraphMailService):
     """
-    Extract Saildocs command text and Garmin reply URL from an InReach request mail.
+    Fetch the full plain text body of an InReach request mail.
     """
-    message = await mail.client.users \
-        .by_user_id(configs.MAILBOX()) \
-        .messages \
-        .by_message_id(message_id) \
-        .get()
+    message_body = await mail.get_message_body(configs.MAILBOX(), message_id)
 
-    body = message.body.content or ""
-    body_type = message.body.content_type
+    body = message_body.get("content") or ""
+    body_type = message_body.get("contentType")
 
     if body_type == "html":
         decoded = _html_to_text(body)
@@ -156,6 +185,29 @@ async def _fetch_message_body_from_mail(message_id, mail: GraphMailService):
     return decoded
 
 
+def _is_saildocs_response(msg, saildocs_command: str) -> bool:
+    """
+    True if msg is an unread Saildocs mail answering saildocs_command.
+    """
+    if msg.is_read:
+        return False
+
+    sender = msg.from_.email_address.address if msg.from_ and msg.from_.email_address else ""
+    if (sender or "").lower() != configs.SAILDOCS_RESPONSE_EMAIL().lower():
+        return False
+
+    if not msg.body:
+        return False
+
+    message_body = msg.body.content or ""
+    if msg.body.content_type == "html":
+        decoded = _html_to_text(message_body)
+    else:
+        decoded = message_body
+
+    return saildocs_command.lower() in decoded.lower()
+
+
 def _decode_inreach_request(raw_text: str) -> InReachRequest:
     """
     Decode an InReach email body into an InReachRequest.
@@ -169,10 +221,15 @@ def _decode_inreach_request(raw_text: str) -> InReachRequest:
 
     Single-line:
         grib <saildocs-command> reply to garmin: <url>
+
+    FCST <positions>, CHAT <prompt> and RESEND [job] <parts> have the
+    same layout.
     """
 
     GRIB_PREFIX = "GRIB"
+    FCST_PREFIX = "FCST"
     CHAT_PREFIX = "CHAT"
+    RESEND_PREFIX = "RESEND"
     REPLY_PREFIX = "Reply to Garmin:"
 
     logging.info("Decode InReach request: %s", raw_text)
@@ -210,10 +267,18 @@ def _decode_inreach_request(raw_text: str) -> InReachRequest:
         request_type = "weather"
         payload_text = request_part[len(GRIB_PREFIX):].lstrip()
 
+    elif request_part.upper().startswith(FCST_PREFIX):
+        request_type = "forecast"
+        payload_text = request_part[len(FCST_PREFIX):].lstrip()
+
     elif request_part.upper().startswith(CHAT_PREFIX):
         request_type = "chat"
         payload_text = request_part[len(CHAT_PREFIX):].lstrip()
 
+    elif request_part.upper().startswith(RESEND_PREFIX):
+        request_type = "resend"
+        payload_text = request_part[len(RESEND_PREFIX):].lstrip()
+
     else:
         raise ValueError(f"Unknown request type: {request_part}")
 
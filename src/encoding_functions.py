@@ -0,0 +1,255 @@
+#FILE src/encoding_functions.py
+import base64
+import logging
+import re
+import string
+from dataclasses import dataclass, field
+
+# =========================
+# GARMIN SAFE CHARACTERS
+# =========================
+# Characters that survive the Garmin reply form and the Earthmate app.
+# Quotes, backslash, backtick and whitespace are never used.
+_ALNUM = string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+# Escape character: inserted between two characters that form a blocked
+# sequence and removed again by the decoder. It is never part of an
+# alphabet and never part of a blocked sequence.
+ESCAPE = "~"
+
+# Sequences the Garmin pipeline drops or mangles. '>f' is documented as
+# unsendable; '<x' and '&x' are treated as HTML tags/entities on the way.
+_HTML_BLOCKLIST = frozenset(
+    [">f"]
+    + ["<" + c for c in string.ascii_letters + "/!?"]
+    + ["&" + c for c in string.ascii_letters + "#"]
+)
+
+
+@dataclass(frozen=True)
+class Alphabet:
+    """
+    Binary-to-text alphabet.
+
+    name: encoding name used in configs/requests
+    marker: character after ESCAPE at the start of the payload
+        identifying the alphabet ("" for legacy base64 without header)
+    chars: alphabet characters, index = digit value
+    block_bytes: bytes encoded per full block
+    blocklist: two-character sequences that must be escaped
+    """
+    name: str
+    marker: str
+    chars: str
+    block_bytes: int
+    blocklist: frozenset = field(default_factory=frozenset)
+
+    @property
+    def block_chars(self) -> int:
+        return _chars_for_bytes(self.block_bytes, len(self.chars))
+
+
+ALPHABETS = {
+    # RFC 4648 base64, 4 chars per 3 bytes. Kept without header for
+    # compatibility with older decoders.
+    "base64": Alphabet(
+        name="base64",
+        marker="",
+        chars=_ALNUM + "+/",
+        block_bytes=3,
+    ),
+    # 5 chars per 4 bytes, no '<', '>', '&' so nothing needs escaping
+    "base85": Alphabet(
+        name="base85",
+        marker="5",
+        chars=_ALNUM + "!#$()*+,-./:;=?@[]^_{|}",
+        block_bytes=4,
+        blocklist=frozenset(),
+    ),
+    # base91-style: every Garmin safe character, 72 chars per 58 bytes,
+    # blocked sequences are escaped
+    "base88": Alphabet(
+        name="base88",
+        marker="8",
+        chars=_ALNUM + "!#$&()*+,-./:;<=>?@[]^_{|}",
+        block_bytes=58,
+        blocklist=_HTML_BLOCKLIST,
+    ),
+}
+
+
+# =========================
+# ENCODE
+# =========================
+def encode_payload(data: bytes, encoding: str = "base64") -> str:
+    """
+    Encode bytes to Garmin safe text.
+
+    Non-base64 payloads start with ESCAPE + alphabet marker, so
+    decode_payload can pick the alphabet.
+    """
+    alphabet = _get_alphabet(encoding)
+
+    if alphabet.name == "base64":
+        return base64.b64encode(data).decode("ascii")
+
+    text = _radix_encode(data, alphabet)
+    text = _escape_blocked(text, alphabet)
+
+    logging.info("Encoded %d bytes as %s: %d chars", len(data), alphabet.name, len(text))
+    return ESCAPE + alphabet.marker + text
+
+
+# =========================
+# DECODE
+# =========================
+def decode_payload(text: str) -> bytes:
+    """
+    Decode text produced by encode_payload.
+    Payloads without header are decoded as legacy base64.
+    """
+    if not text.startswith(ESCAPE):
+        return base64.b64decode(text)
+
+    alphabet = _get_alphabet(payload_encoding(text))
+    body = text[2:].replace(ESCAPE, "")
+    return _radix_decode(body, alphabet)
+
+
+def payload_encoding(text: str) -> str:
+    """
+    Name of the alphabet text was encoded with (see encode_payload).
+    """
+    if not text.startswith(ESCAPE):
+        return "base64"
+
+    marker = text[1:2]
+    alphabet = next((a for a in ALPHABETS.values() if a.marker and a.marker == marker), None)
+    if alphabet is None:
+        raise ValueError(f"Unknown payload encoding marker: {marker!r}")
+    return alphabet.name
+
+
+# =========================
+# HELPERS
+# =========================
+def _get_alphabet(encoding: str) -> Alphabet:
+    try:
+        return ALPHABETS[encoding.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown payload encoding: {encoding}")
+
+
+def max_bytes_for_chars(char_count: int, encoding: str) -> int:
+    """
+    Most bytes whose encoding (header included, escapes not) fits in
+    char_count characters.
+    """
+    alphabet = _get_alphabet(encoding)
+
+    if alphabet.name == "base64":
+        return char_count // 4 * 3
+
+    chars = char_count - len(ESCAPE + alphabet.marker)
+    if chars <= 0:
+        return 0
+
+    full_blocks, rest = divmod(chars, alphabet.block_chars)
+    tail = max((n for n in range(alphabet.block_bytes) if _chars_for_bytes(n, len(alphabet.chars)) <= rest), default=0)
+    return full_blocks * alphabet.block_bytes + tail
+
+
+def _chars_for_bytes(byte_count: int, base: int) -> int:
+    """
+    Smallest number of base-N digits that can hold byte_count bytes.
+    """
+    limit = 256 ** byte_count
+    chars = 0
+    capacity = 1
+    while capacity < limit:
+        capacity *= base
+        chars += 1
+    return chars
+
+
+def _radix_encode(data: bytes, alphabet: Alphabet) -> str:
+    chars = alphabet.chars
+    base = len(chars)
+    out: list[str] = []
+
+    for i in range(0, len(data), alphabet.block_bytes):
+        block = data[i:i + alphabet.block_bytes]
+        value = int.from_bytes(block, "big")
+
+        digits = []
+        for _ in range(_chars_for_bytes(len(block), base)):
+            value, digit = divmod(value, base)
+            digits.append(chars[digit])
+
+        out.append("".join(reversed(digits)))
+
+    return "".join(out)
+
+
+def _radix_decode(text: str, alphabet: Alphabet) -> bytes:
+    base = len(alphabet.chars)
+    lookup = {c: i for i, c in enumerate(alphabet.chars)}
+    block_chars = alphabet.block_chars
+
+    # Last (short) block: map its char count back to its byte count
+    tail_bytes = {
+        _chars_for_bytes(n, base): n for n in range(1, alphabet.block_bytes + 1)
+    }
+
+    out = bytearray()
+    for i in range(0, len(text), block_chars):
+        block = text[i:i + block_chars]
+        byte_count = tail_bytes.get(len(block))
+        if byte_count is None:
+            raise ValueError(f"Invalid {alphabet.name} block length: {len(block)}")
+
+        value = 0
+        for c in block:
+            try:
+                value = value * base + lookup[c]
+            except KeyError:
+                raise ValueError(f"Invalid {alphabet.name} character: {c!r}")
+
+        if value >= 256 ** byte_count:
+            raise ValueError(f"Invalid {alphabet.name} block: {block}")
+
+        out += value.to_bytes(byte_count, "big")
+
+    return bytes(out)
+
+
+_BLOCKLIST_PATTERNS: dict[str, re.Pattern | None] = {}
+
+
+def _escape_blocked(text: str, alphabet: Alphabet) -> str:
+    """
+    Insert ESCAPE between the two characters of every blocked sequence.
+    """
+    if alphabet.name not in _BLOCKLIST_PATTERNS:
+        _BLOCKLIST_PATTERNS[alphabet.name] = _compile_blocklist(alphabet.blocklist)
+
+    pattern = _BLOCKLIST_PATTERNS[alphabet.name]
+    if pattern is None:
+        return text
+    return pattern.sub(ESCAPE, text)
+
+
+def _compile_blocklist(blocklist: frozenset) -> re.Pattern | None:
+    if not blocklist:
+        return None
+
+    followers: dict[str, set[str]] = {}
+    for sequence in blocklist:
+        followers.setdefault(sequence[0], set()).add(sequence[1])
+
+    # Zero-width match between first and second char of a blocked pair
+    alternatives = [
+        f"(?<={re.escape(first)})(?=[{''.join(re.escape(c) for c in sorted(seconds))}])"
+        for first, seconds in sorted(followers.items())
+    ]
+    return re.compile("|".join(alternatives))
@@ -0,0 +1,148 @@
+#FILE src/fec.py
+
+# Reed-Solomon erasure code over GF(256).
+#
+# N equally sized data blocks are extended with K parity blocks, and any
+# N of the N+K blocks rebuild the data. The code is systematic (data
+# blocks are sent unchanged) and uses a Cauchy matrix, whose square
+# submatrices are all invertible.
+#
+# Block i of the N+K blocks is data block i for i < N and parity block
+# i - N otherwise. Lost blocks are known (missing part numbers), so this
+# only corrects erasures, not corrupted blocks.
+
+# GF(256) with the AES/Reed-Solomon polynomial x^8 + x^4 + x^3 + x + 1
+_POLYNOMIAL = 0x11B
+
+MAX_BLOCKS = 256
+
+
+def _build_tables():
+    exp = [0] * 512
+    log = [0] * 256
+    value = 1
+    for power in range(255):
+        exp[power] = value
+        log[value] = power
+        # multiply by the generator (x + 1)
+        value ^= (value << 1) ^ (_POLYNOMIAL if value & 0x80 else 0)
+        value &= 0xFF
+    for power in range(255, 512):
+        exp[power] = exp[power - 255]
+    return exp, log
+
+
+_EXP, _LOG = _build_tables()
+
+
+def _mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def _inverse(a: int) -> int:
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(256)")
+    return _EXP[255 - _LOG[a]]
+
+
+# Multiplying a block by a constant is one bytes.translate
+_MUL_TABLES = [bytes(_mul(c, b) for b in range(256)) for c in range(256)]
+
+
+def _scale(block: bytes, coefficient: int) -> bytes:
+    return block.translate(_MUL_TABLES[coefficient])
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "big") ^ int.from_bytes(b, "big")).to_bytes(len(a), "big")
+
+
+def _combine(blocks: list[bytes], coefficients: list[int]) -> bytes:
+    out = bytes(len(blocks[0]))
+    for block, coefficient in zip(blocks, coefficients):
+        if coefficient:
+            out = _xor(out, _scale(block, coefficient))
+    return out
+
+
+def _generator_row(index: int, data_count: int) -> list[int]:
+    """
+    Row of the (N+K) x N generator matrix: identity for data blocks,
+    Cauchy 1 / (x_j + y_i) with x_j = N + j, y_i = i for parity blocks.
+    """
+    if index < data_count:
+        return [1 if i == index else 0 for i in range(data_count)]
+    x = index
+    return [_inverse(x ^ y) for y in range(data_count)]
+
+
+# =========================
+# ENCODE
+# =========================
+def encode(blocks: list[bytes], parity: int) -> list[bytes]:
+    """
+    Parity blocks for equally sized data blocks.
+    """
+    if not blocks:
+        raise ValueError("No data blocks")
+    if len({len(b) for b in blocks}) != 1:
+        raise ValueError("Data blocks must have the same size")
+    if len(blocks) + parity > MAX_BLOCKS:
+        raise ValueError(f"At most {MAX_BLOCKS} data and parity blocks")
+
+    data_count = len(blocks)
+    return [
+        _combine(blocks, _generator_row(data_count + j, data_count))
+        for j in range(parity)
+    ]
+
+
+# =========================
+# DECODE
+# =========================
+def decode(received: dict[int, bytes], data_count: int) -> list[bytes]:
+    """
+    The data_count data blocks, rebuilt from any data_count received
+    blocks (index -> block, index as in the header comment).
+    """
+    if len(received) < data_count:
+        raise ValueError(f"Need {data_count} blocks to rebuild the data, got {len(received)}")
+
+    if all(i in received for i in range(data_count)):
+        return [received[i] for i in range(data_count)]
+
+    indexes = sorted(received)[:data_count]
+    matrix = [_generator_row(i, data_count) for i in indexes]
+    inverse = _invert(matrix)
+    blocks = [received[i] for i in indexes]
+
+    return [
+        received[i] if i in received else _combine(blocks, inverse[i])
+        for i in range(data_count)
+    ]
+
+
+def _invert(matrix: list[list[int]]) -> list[list[int]]:
+    """
+    Gauss-Jordan inversion over GF(256).
+    """
+    size = len(matrix)
+    rows = [row[:] + [1 if i == r else 0 for i in range(size)] for r, row in enumerate(matrix)]
+
+    for column in range(size):
+        pivot = next((r for r in range(column, size) if rows[r][column]), None)
+        if pivot is None:
+            raise ValueError("Blocks do not determine the data")
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+
+        factor = _inverse(rows[column][column])
+        rows[column] = [_mul(v, factor) for v in rows[column]]
+
+        for r in range(size):
+            if r != column and rows[r][column]:
+                f = rows[r][column]
+                rows[r] = [v ^ _mul(f, p) for v, p in zip(rows[r], rows[column])]
+
+    return [row[size:] for row in rows]
@@ -0,0 +1,148 @@
+#FILE src/forecast.py
+import math
+import re
+from dataclasses import dataclass
+
+import src.configs as configs
+from src.route import box_longitudes, format_degrees, parse_positions, unwrap_longitudes
+
+# "FCST" requests: wind and pressure at a few positions as a short text
+# table computed from a Saildocs GRIB, instead of sending the GRIB.
+#
+#   FCST [model:]<lat>,<lon>[;<lat>,<lon>...][|<hours>]
+#   FCST 24.5n,65w;26n,62.2w|0,12,24,48
+#
+# Reply, one block per position (hour from the model run, wind
+# direction/speed in kt, pressure in hPa):
+#
+#   gfs 17/06Z
+#   24.5N 65.0W
+#   00 230/12 1015
+#   12 240/15 1012
+
+_MODEL = re.compile(r"^\s*([a-z]+)\s*:", re.I)
+
+_MS_TO_KT = 3600 / 1852
+
+# GRIB1 parameters (WMO table 2)
+_PRMSL = 2
+_PRES = 1
+_UGRD = 33
+_VGRD = 34
+
+
+@dataclass(frozen=True)
+class ForecastRequest:
+    model: str
+    positions: tuple[tuple[float, float], ...]
+    hours: str
+
+
+def parse_forecast_request(request: str) -> ForecastRequest:
+    """
+    Positions (lat, lon in degrees, east/north positive), model and
+    forecast hours of a FCST request. Model and hours default to
+    configs.FCST_MODEL and configs.FCST_HOURS.
+    Raises ValueError without a valid position or with too many.
+    """
+    model = configs.FCST_MODEL
+    match = _MODEL.match(request)
+    if match:
+        model = match.group(1).lower()
+        request = request[match.end():]
+
+    positions_text, _, hours = request.partition("|")
+    positions = parse_positions(positions_text)
+
+    if not positions:
+        raise ValueError(f"No position in forecast request: {request}")
+    if len(positions) > configs.FCST_MAX_POSITIONS:
+        raise ValueError(f"At most {configs.FCST_MAX_POSITIONS} positions per forecast request")
+
+    hours = re.sub(r"\s+", "", hours) or configs.FCST_HOURS
+    return ForecastRequest(model, positions, hours)
+
+
+def saildocs_command(request: ForecastRequest) -> str:
+    """
+    Saildocs command for the smallest grid around the positions, at
+    configs.FCST_RESOLUTION degrees, with wind and pressure only. Across
+    the 180th meridian the area has west > east.
+    """
+    step = configs.FCST_RESOLUTION
+    lats = [lat for lat, _ in request.positions]
+    lons = unwrap_longitudes([lon for _, lon in request.positions])
+
+    south = math.floor(min(lats) / step) * step
+    north = max(math.ceil(max(lats) / step) * step, south + step)
+    west = math.floor(min(lons) / step) * step
+    west, east = box_longitudes(west, max(math.ceil(max(lons) / step) * step, west + step))
+
+    area = ",".join([
+        format_degrees(south, "N", "S"),
+        format_degrees(north, "N", "S"),
+        format_degrees(west, "E", "W"),
+        format_degrees(east, "E", "W"),
+    ])
+    return f"{request.model}:{area}|{step:g},{step:g}|{request.hours}|wind,press"
+
+
+# =========================
+# TEXT FORECAST
+# =========================
+def forecast_text(grib: bytes, request: ForecastRequest) -> str:
+    """
+    Wind and pressure at the requested positions, from the nearest grid
+    point of every forecast time in the GRIB. Missing values are "-".
+    """
+    # numpy is only imported once a forecast is actually computed
+    from src import grib_functions as grib_func
+
+    # (forecast hour, parameter) -> GRIB message
+    fields = {}
+    reference = None
+
+    for message in grib_func.parse_grib(grib):
+        if message.parameter not in (_PRMSL, _PRES, _UGRD, _VGRD):
+            continue
+        # Mean sea level pressure wins over surface pressure
+        if message.parameter == _PRES and (message.forecast_hour, _PRMSL) in fields:
+            continue
+        parameter = _PRMSL if message.parameter == _PRES else message.parameter
+        fields[(message.forecast_hour, parameter)] = message
+        reference = reference or message.reference_time
+
+    if reference is None:
+        raise ValueError("GRIB has no wind or pressure fields")
+
+    values = {key: grib_func.field_values(message) for key, message in fields.items()}
+    hours = sorted({hour for hour, _ in fields})
+
+    lines = [f"{request.model} {reference:%d/%H}Z"]
+    for lat, lon in request.positions:
+        lines.append(f"{abs(lat):.1f}{'N' if lat >= 0 else 'S'} {abs(lon):.1f}{'E' if lon >= 0 else 'W'}")
+
+        for hour in hours:
+            u, v, pressure = (_value_at(fields, values, (hour, p), lat, lon) for p in (_UGRD, _VGRD, _PRMSL))
+            lines.append(f"{hour:02.0f} {_wind(u, v)} {_pressure(pressure)}")
+
+    return "\n".join(lines)
+
+
+def _value_at(fields, values, key, lat: float, lon: float) -> float:
+    message = fields.get(key)
+    index = message.grid().nearest_index(lat, lon) if message is not None else None
+    return math.nan if index is None else float(values[key][index])
+
+
+def _wind(u: float, v: float) -> str:
+    if math.isnan(u) or math.isnan(v):
+        return "-"
+    speed = round(math.hypot(u, v) * _MS_TO_KT)
+    # Direction the wind comes from, to 10 degrees
+    direction = round(math.degrees(math.atan2(-u, -v)) % 360, -1) % 360
+    return f"{direction:03.0f}/{speed:02d}"
+
+
+def _pressure(pa: float) -> str:
+    return "-" if math.isnan(pa) else f"{pa / 100:.0f}"
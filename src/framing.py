@@ -0,0 +1,310 @@
+#FILE src/framing.py
+import binascii
+import logging
+import math
+import re
+from dataclasses import dataclass
+
+import src.configs as configs
+from src import fec
+from src.encoding_functions import decode_payload, encode_payload, max_bytes_for_chars, payload_encoding
+
+# =========================
+# FRAME FORMATS
+# =========================
+# Legacy:   "msg <seq>/<total>:\n<data>\nend"  (decimal, fixed chunk size)
+# Compact:  "#1<job><seq><total>[*<crc>]\n<data>"
+#   "#1"      version marker
+#   job       job id, JOB_ID_LENGTH base36 characters
+#   seq/total base36, zero padded to the same width
+#   crc       optional CRC-16/CCITT of data, 4 hex digits
+# FEC:      "#2<job><parity><seq><total>[*<crc>]\n<block>"
+#   parity    number of parity frames, same width as seq/total
+#   block     one block of a Reed-Solomon code (see fec) over the binary
+#             payload, text encoded on its own; frames seq > total - parity
+#             are parity blocks, and any total - parity frames rebuild it
+# A compact frame has no footer, and its chunk size is chosen so every
+# frame fills configs.INREACH_MESSAGE_LENGTH.
+LEGACY = "legacy"
+COMPACT = "compact"
+
+COMPACT_VERSION = "#1"
+FEC_VERSION = "#2"
+JOB_ID_LENGTH = 5
+CRC_LENGTH = 4
+
+# Binary payload length prefix of the first FEC block
+_LENGTH_BYTES = 4
+
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+_COMPACT_HEADER = re.compile(
+    rf"^({COMPACT_VERSION}|{FEC_VERSION})([0-9a-z]{{{JOB_ID_LENGTH}}})([0-9a-z]+?)(?:\*([0-9a-f]{{{CRC_LENGTH}}}))?$"
+)
+_LEGACY_HEADER = re.compile(r"^msg (\d+)/(\d+|\?):?$")
+
+
+@dataclass
+class Frame:
+    seq: int
+    total: int | None
+    data: str
+    job_id: str | None = None
+    parity: int = 0
+    fec: bool = False
+
+
+# =========================
+# COMPACT FRAMES
+# =========================
+def frame_messages(
+    payload: str,
+    job_id: str,
+    message_length: int | None = None,
+    crc: bool | None = None,
+) -> list[str]:
+    """
+    Split payload into compact frames that each fill message_length
+    characters (default configs.INREACH_MESSAGE_LENGTH).
+    """
+    message_length = message_length or configs.INREACH_MESSAGE_LENGTH
+    crc = configs.GRIB_FRAME_CRC if crc is None else crc
+    _check_job_id(job_id)
+
+    chunk_size, width = compact_chunk_size(len(payload), message_length, crc)
+    chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+    total = len(chunks)
+
+    return [
+        _compact_header(job_id, index + 1, total, width, chunk if crc else None) + "\n" + chunk
+        for index, chunk in enumerate(chunks)
+    ]
+
+
+def compact_chunk_size(payload_length: int, message_length: int, crc: bool = False) -> tuple[int, int]:
+    """
+    Data characters per compact frame and the width of seq/total.
+    The header grows with the number of frames, so the smallest width
+    that can number all frames is used.
+    """
+    overhead = len(COMPACT_VERSION) + JOB_ID_LENGTH + (1 + CRC_LENGTH if crc else 0) + 1
+    width = 1
+    while True:
+        chunk_size = message_length - overhead - 2 * width
+        if chunk_size <= 0:
+            raise ValueError(f"Message length {message_length} leaves no room for data")
+        total = max(1, math.ceil(payload_length / chunk_size))
+        if total < len(_BASE36) ** width:
+            return chunk_size, width
+        width += 1
+
+
+# =========================
+# FEC FRAMES
+# =========================
+def frame_fec_messages(
+    payload: str,
+    job_id: str,
+    parity: int,
+    message_length: int | None = None,
+    crc: bool | None = None,
+) -> list[str]:
+    """
+    Split the encoded payload into FEC frames: the binary payload is cut
+    into N equal blocks and extended with `parity` Reed-Solomon parity
+    blocks, each text encoded like the payload and sized to fill
+    message_length characters. Any N of the N + parity frames rebuild it.
+    """
+    message_length = message_length or configs.INREACH_MESSAGE_LENGTH
+    crc = configs.GRIB_FRAME_CRC if crc is None else crc
+    _check_job_id(job_id)
+
+    encoding = payload_encoding(payload)
+    binary = decode_payload(payload)
+    data = len(binary).to_bytes(_LENGTH_BYTES, "big") + binary
+
+    overhead = len(FEC_VERSION) + JOB_ID_LENGTH + (1 + CRC_LENGTH if crc else 0) + 1
+    width = 1
+    while True:
+        capacity = message_length - overhead - 3 * width
+        block_size = max_bytes_for_chars(capacity, encoding)
+
+        # Escaped characters make some blocks longer than estimated
+        while block_size > 0:
+            count = math.ceil(len(data) / block_size)
+            if count + parity >= len(_BASE36) ** width:
+                break
+
+            padded = data.ljust(count * block_size, b"\0")
+            blocks = [padded[i:i + block_size] for i in range(0, len(padded), block_size)]
+            texts = [encode_payload(block, encoding) for block in blocks + fec.encode(blocks, parity)]
+
+            if all(len(text) <= capacity for text in texts):
+                total = len(texts)
+                logging.info("FEC framing: %d data and %d parity frames of %d bytes", count, parity, block_size)
+                return [
+                    _compact_header(job_id, index + 1, total, width, text if crc else None, parity) + "\n" + text
+                    for index, text in enumerate(texts)
+                ]
+            block_size -= 1
+
+        if block_size <= 0:
+            raise ValueError(f"Message length {message_length} leaves no room for data")
+        width += 1
+
+
+def _check_job_id(job_id: str):
+    if len(job_id) != JOB_ID_LENGTH or job_id.strip(_BASE36):
+        raise ValueError(f"Job id must be {JOB_ID_LENGTH} base36 characters: {job_id!r}")
+
+
+def _compact_header(
+    job_id: str,
+    seq: int,
+    total: int,
+    width: int,
+    data: str | None,
+    parity: int | None = None,
+) -> str:
+    if parity is None:
+        header = f"{COMPACT_VERSION}{job_id}{_to_base36(seq, width)}{_to_base36(total, width)}"
+    else:
+        header = f"{FEC_VERSION}{job_id}{_to_base36(parity, width)}{_to_base36(seq, width)}{_to_base36(total, width)}"
+    if data is not None:
+        header += f"*{crc16(data):0{CRC_LENGTH}x}"
+    return header
+
+
+def crc16(data: str) -> int:
+    return binascii.crc_hqx(data.encode("ascii"), 0xFFFF)
+
+
+# =========================
+# PARSE
+# =========================
+def parse_frames(text: str) -> list[Frame]:
+    """
+    Parse received messages in either format, in the order received.
+    Blank lines are ignored. A compact frame with a CRC that does not
+    match its data raises ValueError.
+    """
+    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+
+    frames: list[Frame] = []
+    i = 0
+
+    while i < len(lines):
+        header = lines[i]
+
+        if header.startswith("msg "):
+            if i + 2 >= len(lines):
+                raise ValueError(f"Expected 'msg x/y' at line {i}, got: {header}")
+            if lines[i + 2] != "end":
+                raise ValueError(f"Expected 'end' at line {i+2}, got: {lines[i + 2]}")
+            frame = parse_frame(header, lines[i + 1])
+            if frame is None:
+                raise ValueError(f"Expected 'msg x/y' at line {i}, got: {header}")
+            frames.append(frame)
+            i += 3
+
+        elif header.startswith((COMPACT_VERSION, FEC_VERSION)):
+            frame = parse_frame(header, lines[i + 1]) if i + 1 < len(lines) else None
+            if frame is None:
+                raise ValueError(f"Invalid compact frame at line {i}: {header}")
+            frames.append(frame)
+            i += 2
+
+        else:
+            raise ValueError(
+                f"Expected 'msg x/y', '{COMPACT_VERSION}' or '{FEC_VERSION}' frame at line {i}, got: {header}"
+            )
+
+    return frames
+
+
+def is_frame_header(line: str) -> bool:
+    line = line.strip()
+    return bool(_LEGACY_HEADER.match(line) or _COMPACT_HEADER.match(line))
+
+
+def parse_frame(header: str, data: str) -> Frame | None:
+    """
+    Frame of one header line and its data line, None if header is not
+    a frame header. A CRC that does not match data raises ValueError.
+    """
+    header, data = header.strip(), data.strip()
+
+    match = _LEGACY_HEADER.match(header)
+    if match is not None:
+        seq, total = match.groups()
+        return Frame(int(seq), None if total == "?" else int(total), data)
+
+    match = _COMPACT_HEADER.match(header)
+    if match is None:
+        return None
+
+    version, job_id, numbers, checksum = match.groups()
+    fields = 3 if version == FEC_VERSION else 2
+    if len(numbers) % fields:
+        return None
+
+    width = len(numbers) // fields
+    values = [int(numbers[n:n + width], 36) for n in range(0, len(numbers), width)]
+    parity = values.pop(0) if version == FEC_VERSION else 0
+    seq, total = values
+
+    if checksum is not None and int(checksum, 16) != crc16(data):
+        raise ValueError(f"CRC mismatch in frame {seq}/{total} of job {job_id}")
+
+    return Frame(seq, total, data, job_id, parity, version == FEC_VERSION)
+
+
+def frames_to_payload_chunks(frames: list[Frame]) -> list[str]:
+    """
+    Payload chunks of one reply. Compact frames are put in sequence
+    order and must be complete; legacy frames are kept as received.
+    FEC frames are rebuilt from any sufficient subset into one base64
+    chunk.
+    """
+    if not frames or all(f.job_id is None for f in frames):
+        return [f.data for f in frames]
+
+    job_ids = {f.job_id for f in frames}
+    if len(job_ids) > 1 or None in job_ids:
+        raise ValueError(f"Frames of more than one reply: {sorted(map(str, job_ids))}")
+
+    by_seq = {f.seq: f for f in frames}
+    total = frames[0].total
+
+    if any(f.fec for f in frames):
+        return [_rebuild_fec_payload(frames[0].job_id, by_seq, total, frames[0].parity)]
+
+    missing = [seq for seq in range(1, total + 1) if seq not in by_seq]
+    if missing:
+        raise ValueError(f"Missing frames of job {frames[0].job_id}: {missing}")
+
+    logging.info("Reassembled %d compact frames of job %s", total, frames[0].job_id)
+    return [by_seq[seq].data for seq in range(1, total + 1)]
+
+
+def _rebuild_fec_payload(job_id: str, by_seq: dict[int, Frame], total: int, parity: int) -> str:
+    data_count = total - parity
+    if len(by_seq) < data_count:
+        missing = [seq for seq in range(1, total + 1) if seq not in by_seq]
+        raise ValueError(
+            f"Missing frames of job {job_id}: {missing}, any {data_count} of {total} are needed"
+        )
+
+    received = {seq - 1: decode_payload(frame.data) for seq, frame in by_seq.items()}
+    data = b"".join(fec.decode(received, data_count))
+    length = int.from_bytes(data[:_LENGTH_BYTES], "big")
+
+    logging.info("Rebuilt job %s from %d of %d FEC frames", job_id, len(by_seq), total)
+    return encode_payload(data[_LENGTH_BYTES:_LENGTH_BYTES + length], "base64")
+
+
+def _to_base36(value: int, width: int) -> str:
+    digits = ""
+    while value:
+        value, digit = divmod(value, 36)
+        digits = _BASE36[digit] + digits
+    return digits.rjust(width, "0")
@@ -0,0 +1,106 @@
+#FILE src/graph_batch.py
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Graph JSON batching accepts at most 20 requests per $batch call
+MAX_BATCH_SIZE = 20
+
+
+class GraphBatchError(Exception):
+    """
+    A single request inside a $batch call failed.
+    """
+
+    def __init__(self, status: int, body):
+        self.status = status
+        self.body = body
+        message = body.get("error", {}).get("message") if isinstance(body, dict) else body
+        super().__init__(f"Graph batch request failed ({status}): {message}")
+
+
+@dataclass
+class _PendingRequest:
+    request: dict
+    future: asyncio.Future = field(repr=False)
+
+
+class GraphBatcher:
+    """
+    Groups independent Graph requests into JSON $batch calls.
+
+    Requests submitted within `window` seconds of each other are sent
+    together (max 20 per call). Every caller gets its own response body,
+    or its own GraphBatchError.
+
+    transport: async callable posting {"requests": [...]} to /$batch and
+    returning the "responses" list.
+    """
+
+    def __init__(self, transport: Callable[[list[dict]], Awaitable[list[dict]]], window: float = 0.05):
+        self.transport = transport
+        self.window = window
+        self._pending: list[_PendingRequest] = []
+        self._flush_task: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._ids = itertools.count(1)
+
+    async def submit(self, method: str, url: str, body: dict | None = None, headers: dict | None = None):
+        """
+        Queue one request; url is relative to the Graph version root
+        (e.g. /users/{id}/messages/{id}). Returns the response body.
+        """
+        request = {"id": str(next(self._ids)), "method": method, "url": url}
+        if body is not None:
+            request["body"] = body
+            request["headers"] = {"Content-Type": "application/json", **(headers or {})}
+        elif headers:
+            request["headers"] = headers
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingRequest(request, future))
+
+        if len(self._pending) >= MAX_BATCH_SIZE:
+            # A full batch goes out right away
+            chunk, self._pending = self._pending, []
+            task = asyncio.create_task(self._send(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif self._flush_task is None or self._flush_task.done():
+            # Requests arriving during the window join this batch
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        while self._pending:
+            chunk, self._pending = self._pending[:MAX_BATCH_SIZE], self._pending[MAX_BATCH_SIZE:]
+            await self._send(chunk)
+
+    async def _send(self, chunk: list[_PendingRequest]):
+        logger.info("Sending Graph $batch with %d requests", len(chunk))
+        try:
+            responses = await self.transport([p.request for p in chunk])
+        except Exception as e:
+            for pending in chunk:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        by_id = {r.get("id"): r for r in responses}
+        for pending in chunk:
+            if pending.future.done():
+                continue
+
+            response = by_id.get(pending.request["id"])
+            if response is None:
+                pending.future.set_exception(GraphBatchError(0, "Missing response in $batch result"))
+            elif response.get("status", 500) >= 400:
+                pending.future.set_exception(GraphBatchError(response.get("status"), response.get("body")))
+            else:
+                pending.future.set_result(response.get("body"))
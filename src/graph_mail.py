@@ -1,37 +1,140 @@
 #FILE src/graph_mail.py
 import os
+import asyncio
 import logging
-from io import BytesIO
-import base64
-
-from azure.identity import ClientSecretCredential
-from msgraph import GraphServiceClient
-from msgraph.generated.models.message import Message
-from msgraph.generated.models.item_body import ItemBody
-from msgraph.generated.models.body_type import BodyType
-from msgraph.generated.models.recipient import Recipient
-from msgraph.generated.models.email_address import EmailAddress
-from msgraph.generated.users.item.send_mail.send_mail_post_request_body import SendMailPostRequestBody
-from msgraph.generated.users.item.messages.messages_request_builder import MessagesRequestBuilder
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING
+from urllib.parse import quote
 
 from src import configs
+from src.graph_batch import GraphBatcher
+from src.graph_query import PREFER_TEXT_BODY, build_message_query
+from src.payload_buffer import PayloadBuffer, RAW
+from src.mail_subscription import DeltaQueryNotifier, MailSubscription
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
+# The Graph SDK, azure.identity and httpx are imported on first use:
+# importing msgraph alone takes seconds on a Functions cold start.
+
 class GraphMailService:
 
-    def __init__(self):
-        self.credential = ClientSecretCredential(
-            tenant_id = configs.TENANT_ID(), 
-            client_id = configs.CLIENT_ID(),
-            client_secret = configs.CLIENT_SECRET()
+    def __init__(self, credential=None):
+        self._credential = credential
+        self._client = None
+        self._subscriptions: dict[str, MailSubscription] = {}
+
+        # Raw HTTP client for JSON $batch calls and attachment streams (created on first use)
+        self._http: "httpx.AsyncClient | None" = None
+        self._batcher: GraphBatcher | None = None
+        self._token = None
+
+    @property
+    def credential(self):
+        if self._credential is None:
+            from azure.identity import ClientSecretCredential
+
+            self._credential = ClientSecretCredential(
+                tenant_id = configs.TENANT_ID(),
+                client_id = configs.CLIENT_ID(),
+                client_secret = configs.CLIENT_SECRET()
+            )
+        return self._credential
+
+    @property
+    def client(self):
+        if self._client is None:
+            from msgraph import GraphServiceClient
+
+            self._client = GraphServiceClient(self.credential)
+        return self._client
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._credential is not None:
+            self._credential.close()
+            self._credential = None
+            self._token = None
+
+    def drop_connections(self):
+        """
+        Forget the clients bound to an event loop that is gone, without
+        closing them. The credential and its cached token are kept.
+        """
+        self._client = None
+        self._http = None
+        self._batcher = None
+
+    # -------------------------
+    # JSON BATCHING
+    # -------------------------
+    @property
+    def batcher(self) -> GraphBatcher:
+        """
+        Batches independent requests (mark as read, body and attachment
+        fetches) into one $batch call.
+        """
+        if self._batcher is None:
+            self._batcher = GraphBatcher(self._post_batch, window=configs.GRAPH_BATCH_WINDOW)
+        return self._batcher
+
+    async def _post_batch(self, requests: list[dict]) -> list[dict]:
+        response = await self._http_client().post(
+            f"{configs.GRAPH_BASE_URL}/$batch",
+            json={"requests": requests},
+            headers=await self._auth_headers(),
         )
-        self.client = GraphServiceClient(self.credential)
+        response.raise_for_status()
+        return response.json().get("responses", [])
+
+    def _http_client(self) -> "httpx.AsyncClient":
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(timeout=30)
+        return self._http
+
+    async def _auth_headers(self) -> dict:
+        return {"Authorization": f"Bearer {await self._access_token()}"}
+
+    async def _access_token(self) -> str:
+        if self._token is None or self._token_expiring():
+            self._token = await asyncio.to_thread(self.credential.get_token, configs.GRAPH_SCOPE)
+        return self._token.token
+
+    async def refresh_token(self) -> bool:
+        """
+        Renew the access token if it expires within
+        configs.GRAPH_TOKEN_REFRESH_MARGIN, so no request of the run has
+        to wait for it. Nothing is fetched before the first request.
+        Returns True if the token was renewed.
+        """
+        if self._token is None or not self._token_expiring():
+            return False
+        self._token = await asyncio.to_thread(self.credential.get_token, configs.GRAPH_SCOPE)
+        logger.info("Graph access token renewed")
+        return True
+
+    def _token_expiring(self) -> bool:
+        return self._token.expires_on - configs.GRAPH_TOKEN_REFRESH_MARGIN < time.time()
 
     # -------------------------
     # SEND MAIL
     # -------------------------
     async def send_mail(self, sender, to, subject, body):
+        from msgraph.generated.models.message import Message
+        from msgraph.generated.models.item_body import ItemBody
+        from msgraph.generated.models.body_type import BodyType
+        from msgraph.generated.models.recipient import Recipient
+        from msgraph.generated.models.email_address import EmailAddress
+        from msgraph.generated.users.item.send_mail.send_mail_post_request_body import SendMailPostRequestBody
+
         message = Message(
             subject=subject,
             body=ItemBody(
@@ -54,25 +157,44 @@ class GraphMailService:
     # -------------------------
     # SEARCH MESSAGES
     # -------------------------
-    async def search_messages(self, user_id: str, sender_email: str | None = None, subject_contains: str | None =None, top: int = 50, unread_only: bool=False):
-        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
-            top=top
-        )
+    async def search_messages(
+        self,
+        user_id: str,
+        sender_email: str | None = None,
+        subject_contains: str | None = None,
+        top: int = 50,
+        unread_only: bool = False,
+        received_after: datetime | None = None,
+        select: list[str] | None = None,
+    ):
+        """
+        Search messages, newest first.
+        Sender, unread and received-after conditions are filtered by
+        Graph, and only the $select fields are returned. Bodies are
+        returned as plain text.
+        """
+        from msgraph.generated.users.item.messages.messages_request_builder import MessagesRequestBuilder
 
-        filters = []
-        if unread_only:
-            filters.append("isRead eq false")
-        if subject_contains:
-            filters.append(f"contains(subject,'{subject_contains}')")
+        query = build_message_query(
+            sender_email=sender_email,
+            unread_only=unread_only,
+            received_after=received_after,
+            subject_contains=subject_contains,
+            top=top,
+            select=select,
+        )
 
-        filter_string = " and ".join(filters) if filters else None
+        query_params = MessagesRequestBuilder.MessagesRequestBuilderGetQueryParameters(
+            filter=query["$filter"],
+            orderby=query["$orderby"],
+            select=query["$select"],
+            top=query["$top"],
+        )
 
         request_config = MessagesRequestBuilder.MessagesRequestBuilderGetRequestConfiguration(
             query_parameters=query_params
         )
-
-        if filter_string:
-            request_config.query_parameters.filter = filter_string
+        request_config.headers.add("Prefer", PREFER_TEXT_BODY)
 
         try:
             result = await self.client.users.by_user_id(user_id).messages.get(
@@ -81,16 +203,6 @@ class GraphMailService:
 
             messages = result.value or []
 
-            # Filter sender in Python to avoid InefficientFilter
-            if sender_email:
-                messages = [
-                    m for m in messages
-                    if m.from_ and m.from_.email_address.address.lower() == sender_email.lower()
-                ]
-
-            # Sort in Python (nyeste først)
-            messages.sort(key=lambda m: m.received_date_time, reverse=True)
-
             # Return as fake object with .value to match SDK interface
             class DummyCollection:
                 def __init__(self, val):
@@ -102,33 +214,115 @@ class GraphMailService:
             logger.exception("Failed to search messages: %s", e)
             raise
 
-    
+    # -------------------------
+    # INBOX DELTA / SUBSCRIPTION
+    # -------------------------
+    async def get_inbox_delta(self, user_id: str, delta_link: str | None = None, received_after=None):
+        """
+        Delta query on the Inbox.
+        Returns (new messages, delta link for the next call).
+        """
+        from msgraph.generated.users.item.mail_folders.item.messages.delta.delta_request_builder import DeltaRequestBuilder
+
+        builder = self.client.users.by_user_id(user_id)\
+            .mail_folders.by_mail_folder_id("inbox")\
+            .messages.delta
+
+        # Prefer is not carried by next/delta links, so send it on every call
+        text_body_config = DeltaRequestBuilder.DeltaRequestBuilderGetRequestConfiguration()
+        text_body_config.headers.add("Prefer", PREFER_TEXT_BODY)
+
+        try:
+            if delta_link:
+                result = await builder.with_url(delta_link).get(request_configuration=text_body_config)
+            else:
+                query_params = DeltaRequestBuilder.DeltaRequestBuilderGetQueryParameters(
+                    select=["id", "from", "receivedDateTime", "subject", "body", "isRead", "hasAttachments"],
+                )
+                if received_after:
+                    # Only receivedDateTime filters are supported on message delta
+                    query_params.filter = f"receivedDateTime ge {received_after.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+                request_config = DeltaRequestBuilder.DeltaRequestBuilderGetRequestConfiguration(
+                    query_parameters=query_params
+                )
+                request_config.headers.add("Prefer", PREFER_TEXT_BODY)
+                result = await builder.get(request_configuration=request_config)
+
+            messages = list(result.value or [])
+            while result.odata_next_link:
+                result = await builder.with_url(result.odata_next_link).get(request_configuration=text_body_config)
+                messages.extend(result.value or [])
+
+            # Skip deleted items ("@removed")
+            messages = [m for m in messages if not (m.additional_data or {}).get("@removed")]
+            return messages, result.odata_delta_link
+
+        except Exception as e:
+            logger.exception("Failed inbox delta query: %s", e)
+            raise
+
+    def inbox_subscription(self, user_id: str) -> MailSubscription:
+        """
+        Shared subscription on the Inbox of user_id.
+        Waiters are woken as soon as a matching mail arrives.
+        """
+        if user_id not in self._subscriptions:
+            self._subscriptions[user_id] = MailSubscription(DeltaQueryNotifier(self, user_id))
+        return self._subscriptions[user_id]
 
     # -------------------------
-    # DOWNLOAD GRIB ATTACHMENT (IN-MEMORY)
+    # GET MESSAGE BODY
     # -------------------------
-    async def download_grib_attachment(self, user_id, message_id):
+    async def get_message_body(self, user_id: str, message_id: str) -> dict:
+        """
+        Fetch the plain text body of one message (batched).
+        Returns: {"contentType": "text", "content": str}
+        """
         try:
-            attachments = await self.client.users.by_user_id(user_id)\
-                .messages.by_message_id(message_id)\
-                .attachments.get()
+            message = await self.batcher.submit(
+                "GET",
+                f"{_message_path(user_id, message_id)}?$select=body",
+                headers={"Prefer": PREFER_TEXT_BODY},
+            )
+            return (message or {}).get("body") or {}
+        except Exception as e:
+            logger.exception("Failed to fetch body of message %s: %s", message_id, e)
+            raise
 
-            for att in attachments.value:
-                if att.name and att.name.lower().endswith(".grb"):
+    # -------------------------
+    # DOWNLOAD GRIB ATTACHMENT (IN-MEMORY)
+    # -------------------------
+    async def download_grib_attachment(self, user_id, message_id) -> PayloadBuffer | None:
+        """
+        Find the .grb attachment and stream its raw bytes from
+        /attachments/{id}/$value, instead of the base64 contentBytes.
+        Returns PayloadBuffer (RAW) or None.
+        """
+        try:
+            # Metadata only; contentBytes is not selected
+            attachments = await self.batcher.submit(
+                "GET",
+                f"{_message_path(user_id, message_id)}/attachments?$select=id,name,size",
+            )
 
-                    # contentBytes fra Graph er ALTID Base64
-                    raw_bytes = base64.b64decode(att.content_bytes)
+            for att in (attachments or {}).get("value", []):
+                name = att.get("name")
+                if name and name.lower().endswith(".grb"):
+                    url = f"{configs.GRAPH_BASE_URL}{_message_path(user_id, message_id)}" \
+                        f"/attachments/{quote(att['id'], safe='')}/$value"
 
-                    grib_file = BytesIO(raw_bytes)
-                    grib_file.name = att.name
-                    grib_file.seek(0)
+                    raw_bytes = bytearray()
+                    async with self._http_client().stream("GET", url, headers=await self._auth_headers()) as response:
+                        response.raise_for_status()
+                        async for chunk in response.aiter_bytes():
+                            raw_bytes += chunk
 
                     logger.info(
-                        "Downloaded GRIB %s (decoded size=%d)",
-                        att.name,
+                        "Downloaded GRIB %s (size=%d)",
+                        name,
                         len(raw_bytes),
                     )
-                    return grib_file
+                    return PayloadBuffer(raw_bytes, RAW, name=name)
 
             logger.info("No GRIB attachment found in message %s", message_id)
             return None
@@ -143,13 +337,17 @@ class GraphMailService:
     async def mark_as_read(self, user_id: str, message_id: str):
         """
         Mark a Microsoft Graph email as read.
-        SDK-kompatibel og fremtidssikker.
+        Sent through the JSON $batch of GraphMailService.batcher.
         """
         try:
-            # Brug en Message-model, ikke dict
-            message_update = Message(is_read=True)
-            await self.client.users.by_user_id(user_id).messages.by_message_id(message_id).patch(message_update)
+            # Batched with the other mark-as-read/fetch requests of this run
+            await self.batcher.submit("PATCH", _message_path(user_id, message_id), body={"isRead": True})
             logger.info("Marked message %s as read", message_id)
         except Exception as e:
             logger.exception("Failed to mark message %s as read: %s", message_id, e)
             raise
+
+
+def _message_path(user_id: str, message_id: str) -> str:
+    # Message ids may contain "/", "+" and "="
+    return f"/users/{quote(user_id, safe='')}/messages/{quote(message_id, safe='')}"
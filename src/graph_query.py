@@ -0,0 +1,68 @@
+#FILE src/graph_query.py
+from datetime import datetime, timezone
+
+# Fields needed to pick and process a mail; bodies are fetched separately
+DEFAULT_MESSAGE_SELECT = ["id", "from", "receivedDateTime", "bodyPreview", "hasAttachments"]
+
+# Graph cuts bodyPreview at 255 characters; a shorter preview is the whole body
+BODY_PREVIEW_LENGTH = 255
+
+# Ask Graph for plain text bodies instead of HTML
+PREFER_TEXT_BODY = 'outlook.body-content-type="text"'
+
+# $orderby on receivedDateTime requires receivedDateTime to be the first
+# $filter clause, otherwise Exchange answers with InefficientFilter.
+_EPOCH = datetime(1900, 1, 1, tzinfo=timezone.utc)
+
+
+def build_message_query(
+    sender_email: str | None = None,
+    unread_only: bool = False,
+    received_after: datetime | None = None,
+    subject_contains: str | None = None,
+    top: int = 50,
+    select: list[str] | None = None,
+) -> dict[str, str | int | list[str]]:
+    """
+    Build OData query options for GET /users/{id}/messages.
+
+    Conditions are pushed to the server in an index-friendly order:
+    receivedDateTime (matches $orderby) first, then equality filters,
+    then contains().
+
+    Returns:
+        dict: {"$filter", "$orderby", "$select", "$top"}
+    """
+    filters = [f"receivedDateTime ge {_format_datetime(received_after or _EPOCH)}"]
+
+    if sender_email:
+        filters.append(f"from/emailAddress/address eq {_quote(sender_email.lower())}")
+    if unread_only:
+        filters.append("isRead eq false")
+    if subject_contains:
+        filters.append(f"contains(subject,{_quote(subject_contains)})")
+
+    return {
+        "$filter": " and ".join(filters),
+        "$orderby": ["receivedDateTime desc"],
+        "$select": list(select or DEFAULT_MESSAGE_SELECT),
+        "$top": top,
+    }
+
+
+def to_query_string_params(query: dict) -> dict[str, str | int]:
+    """
+    Flatten list options ($select, $orderby) for a raw HTTP request.
+    """
+    return {key: ",".join(value) if isinstance(value, list) else value for key, value in query.items()}
+
+
+def _quote(value: str) -> str:
+    # OData string literal: single quotes doubled
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _format_datetime(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -0,0 +1,133 @@
+#FILE src/grib_cache.py
+import logging
+import math
+import re
+import time
+
+import src.configs as configs
+from src.payload_buffer import PayloadBuffer
+from src.sqlite_cache import SqliteLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Saildocs uses GFS when the command has no "model:" prefix
+DEFAULT_MODEL = "gfs"
+
+_COORDINATE = re.compile(r"^(\d+(?:\.\d+)?)([nsew])$")
+
+
+# =========================
+# CANONICAL COMMAND
+# =========================
+def canonical_command(command: str) -> str:
+    """
+    Normalize a Saildocs GRIB command so equal requests share a key:
+
+        "GFS:50N, 40N,020W,010W|0.50,0.5|24,0|WIND,PRMSL"
+        -> "gfs:40n,50n,20w,10w|0.5,0.5|0,24|prmsl,wind"
+
+    Lowercased, whitespace removed around separators, latitudes ordered
+    south to north, numbers without padding, and time/parameter lists
+    sorted. Longitudes keep their order (west to east across the
+    dateline). Parts that do not parse are kept as written.
+    """
+    text = " ".join(command.lower().split())
+    text = re.sub(r"\s*([|,:=])\s*", r"\1", text)
+
+    parts = text.split("|")
+    model, _, area = parts[0].rpartition(":")
+    parts[0] = f"{model or DEFAULT_MODEL}:{_canonical_area(area)}"
+
+    if len(parts) > 1:
+        parts[1] = ",".join(_canonical_number(v) for v in parts[1].split(","))
+    if len(parts) > 2 and all(v.isdigit() for v in parts[2].split(",")):
+        parts[2] = ",".join(str(v) for v in sorted({int(v) for v in parts[2].split(",")}))
+    if len(parts) > 3:
+        parts[3] = ",".join(sorted(set(filter(None, parts[3].split(",")))))
+
+    return "|".join(parts)
+
+
+def _canonical_area(area: str) -> str:
+    coordinates = [_COORDINATE.match(c) for c in area.split(",")]
+    if len(coordinates) != 4 or not all(coordinates):
+        return area
+    if any(m.group(2) not in "ns" for m in coordinates[:2]):
+        return area
+
+    def signed(m):
+        return -float(m.group(1)) if m.group(2) == "s" else float(m.group(1))
+
+    ordered = sorted(coordinates[:2], key=signed) + coordinates[2:]
+    return ",".join(_canonical_number(m.group(1)) + m.group(2) for m in ordered)
+
+
+def _canonical_number(value: str) -> str:
+    try:
+        return f"{float(value):g}"
+    except ValueError:
+        return value
+
+
+# =========================
+# MODEL CYCLE EXPIRY
+# =========================
+def next_cycle_available(model: str, now: float | None = None) -> float:
+    """
+    Epoch time when the next run of model is available at Saildocs.
+    configs.GRIB_MODEL_CYCLES: model -> (cycle hours, availability delay hours).
+    """
+    now = time.time() if now is None else now
+    interval_hours, delay_hours = configs.GRIB_MODEL_CYCLES.get(
+        model, configs.GRIB_MODEL_CYCLES[DEFAULT_MODEL]
+    )
+    interval = interval_hours * 3600
+    delay = delay_hours * 3600
+    return (math.floor((now - delay) / interval) + 1) * interval + delay
+
+
+# =========================
+# GRIB CACHE
+# =========================
+class GribCache:
+    """
+    Downloaded Saildocs GRIB files by canonical command.
+    Entries expire when the next model cycle becomes available.
+    """
+
+    def __init__(self, store: SqliteLRUCache):
+        self.store = store
+
+    def get(self, command: str, now: float | None = None) -> PayloadBuffer | None:
+        key = canonical_command(command)
+        entry = self.store.get(key, now=now)
+        if entry is None:
+            logger.info("GRIB cache miss: %s", key)
+            return None
+
+        value, name = entry
+        logger.info("GRIB cache hit: %s (%d bytes)", key, len(value))
+        return PayloadBuffer(value, name=name)
+
+    def put(self, command: str, grib_file: PayloadBuffer, now: float | None = None):
+        key = canonical_command(command)
+        expires_at = next_cycle_available(key.split(":", 1)[0], now)
+        self.store.put(key, grib_file.raw(), expires_at, meta=grib_file.name, now=now)
+        logger.info("GRIB cached: %s until %s", key, time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(expires_at)))
+
+
+_grib_cache: GribCache | None = None
+
+
+def get_grib_cache() -> GribCache:
+    """
+    Process wide GribCache at configs.GRIB_CACHE_PATH.
+    """
+    global _grib_cache
+    if _grib_cache is None:
+        _grib_cache = GribCache(SqliteLRUCache(
+            configs.GRIB_CACHE_PATH(),
+            max_entries=configs.GRIB_CACHE_MAX_ENTRIES,
+            table="grib_cache",
+        ))
+    return _grib_cache
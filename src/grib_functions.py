@@ -0,0 +1,541 @@
+#FILE src/grib_functions.py
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Callable
+
+import numpy as np
+
+import src.configs as configs
+from src.payload_buffer import PayloadBuffer
+
+# GRIB1 layout (WMO FM 92-VIII, edition 1):
+#   IS  (8 octets)   "GRIB" + total length (3) + edition (1)
+#   PDS              product definition, flag octet 8: 0x80 GDS, 0x40 BMS
+#   GDS (optional)   grid description
+#   BMS (optional)   bitmap of present grid points
+#   BDS              binary data, simple packing: Y * 10^D = R + X * 2^E
+#   ES  (4 octets)   "7777"
+
+_BDS_HEADER_LEN = 11
+_FLAG_GDS = 0x80
+_FLAG_BMS = 0x40
+# BDS octet 4: spherical harmonics | complex packing | additional flags
+_BDS_UNSUPPORTED = 0x80 | 0x40 | 0x10
+# GDS octet 28: i towards west | j towards north | j points consecutive
+_SCAN_I_NEGATIVE = 0x80
+_SCAN_J_POSITIVE = 0x40
+_SCAN_J_CONSECUTIVE = 0x20
+# GDS data representation types storing Ni x Nj points (WMO table 6):
+# lat/lon, Mercator, gnomonic, Lambert, Gaussian, polar stereographic,
+# Albers, rotated/stretched lat/lon and Gaussian, oblique Lambert
+_NI_NJ_GRID_TYPES = (0, 1, 2, 3, 4, 5, 8, 10, 13, 14, 20, 24, 30, 34)
+# PDS octet 18 (unit of time range) in hours
+_TIME_UNIT_HOURS = {0: 1 / 60, 1: 1, 2: 24, 10: 3, 11: 6, 12: 12, 254: 1 / 3600}
+
+
+@dataclass
+class GribMessage:
+    """
+    One GRIB1 message split into its sections.
+    Sections include their own length octets.
+    """
+    pds: bytes
+    gds: bytes | None
+    bms: bytes | None
+    bds: bytes
+
+    @property
+    def parameter(self) -> int:
+        return self.pds[8]
+
+    @property
+    def decimal_scale(self) -> int:
+        return _read_signed16(self.pds[26:28])
+
+    @property
+    def binary_scale(self) -> int:
+        return _read_signed16(self.bds[4:6])
+
+    @property
+    def reference_value(self) -> float:
+        return _ibm_to_float(self.bds[6:10])
+
+    @property
+    def bits_per_value(self) -> int:
+        return self.bds[10]
+
+    @property
+    def is_simple_packing(self) -> bool:
+        return not self.bds[3] & _BDS_UNSUPPORTED
+
+    @property
+    def key(self) -> bytes:
+        """
+        Identity of the field: PDS (parameter, level, time) + grid.
+        """
+        return self.pds + (self.gds or b"")
+
+    @property
+    def reference_time(self) -> datetime:
+        """
+        Model run (analysis) time, UTC.
+        """
+        pds = self.pds
+        year = (pds[24] - 1) * 100 + pds[12]
+        return datetime(year, pds[13], pds[14], pds[15], pds[16])
+
+    @property
+    def forecast_hour(self) -> float:
+        """
+        Hours from the reference time to the (end of the) forecast period.
+        """
+        p1, p2, time_range = self.pds[18], self.pds[19], self.pds[20]
+        if time_range == 10:
+            steps = p1 * 256 + p2
+        elif time_range in (2, 3, 4, 5):
+            steps = p2
+        else:
+            steps = p1
+
+        unit = _TIME_UNIT_HOURS.get(self.pds[17])
+        if unit is None:
+            raise ValueError(f"Unsupported GRIB time unit {self.pds[17]}")
+        return steps * unit
+
+    @property
+    def valid_time(self) -> datetime:
+        return self.reference_time + timedelta(hours=self.forecast_hour)
+
+    def grid(self) -> "LatLonGrid":
+        if self.gds is None:
+            raise ValueError("GRIB message has no grid description")
+        return LatLonGrid.from_gds(self.gds)
+
+    def point_count(self) -> int:
+        if self.bms is not None:
+            return int(self.bitmap().sum())
+
+        if self.gds is not None and self.gds[5] in _NI_NJ_GRID_TYPES:
+            ni = int.from_bytes(self.gds[6:8], "big")
+            nj = int.from_bytes(self.gds[8:10], "big")
+            if ni != 0xFFFF and nj != 0xFFFF:
+                return ni * nj
+
+        if self.bits_per_value == 0:
+            return 0
+
+        unused_bits = self.bds[3] & 0x0F
+        return ((len(self.bds) - _BDS_HEADER_LEN) * 8 - unused_bits) // self.bits_per_value
+
+    def bitmap(self) -> np.ndarray | None:
+        """
+        Bitmap of present grid points (bool array), or None without BMS.
+        """
+        if self.bms is None:
+            return None
+        unused_bits = self.bms[3]
+        bits = np.unpackbits(np.frombuffer(self.bms, dtype=np.uint8, offset=6))
+        return bits[:bits.size - unused_bits].astype(bool)
+
+    def to_bytes(self) -> bytes:
+        body = self.pds + (self.gds or b"") + (self.bms or b"") + self.bds
+        total = 8 + len(body) + 4
+        return b"GRIB" + total.to_bytes(3, "big") + b"\x01" + body + b"7777"
+
+
+@dataclass(frozen=True)
+class LatLonGrid:
+    """
+    Regular latitude/longitude grid (GDS data representation type 0).
+    Coordinates in degrees, longitudes east positive.
+    """
+    ni: int
+    nj: int
+    la1: float
+    lo1: float
+    di: float
+    dj: float
+    scan: int
+
+    @classmethod
+    def from_gds(cls, gds: bytes) -> "LatLonGrid":
+        if gds[5] != 0:
+            raise ValueError(f"Unsupported GRIB grid type {gds[5]}")
+
+        ni = int.from_bytes(gds[6:8], "big")
+        nj = int.from_bytes(gds[8:10], "big")
+        la1, lo1 = _read_signed24(gds[10:13]) / 1000, _read_signed24(gds[13:16]) / 1000
+        la2, lo2 = _read_signed24(gds[17:20]) / 1000, _read_signed24(gds[20:23]) / 1000
+        scan = gds[27]
+
+        # Increments are optional (resolution flag 0x80); derive them from the corners
+        di = int.from_bytes(gds[23:25], "big") / 1000
+        dj = int.from_bytes(gds[25:27], "big") / 1000
+        if not gds[16] & 0x80 or di >= 65.535:
+            span = (lo1 - lo2) if scan & _SCAN_I_NEGATIVE else (lo2 - lo1)
+            di = (span % 360) / (ni - 1) if ni > 1 else 0.0
+        if not gds[16] & 0x80 or dj >= 65.535:
+            dj = abs(la2 - la1) / (nj - 1) if nj > 1 else 0.0
+
+        return cls(ni, nj, la1, lo1, di, dj, scan)
+
+    @property
+    def size(self) -> int:
+        return self.ni * self.nj
+
+    def coordinates(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Latitude and longitude (-180..180) of every grid point, in the
+        order the values are stored.
+        """
+        j, i = np.divmod(np.arange(self.size), self.ni)
+        if self.scan & _SCAN_J_CONSECUTIVE:
+            i, j = np.divmod(np.arange(self.size), self.nj)
+
+        lat = self.la1 + j * (self.dj if self.scan & _SCAN_J_POSITIVE else -self.dj)
+        lon = self.lo1 + i * (-self.di if self.scan & _SCAN_I_NEGATIVE else self.di)
+        return lat, (lon + 180) % 360 - 180
+
+    def nearest_index(self, lat: float, lon: float) -> int | None:
+        """
+        Storage index of the grid point nearest to (lat, lon), None if
+        the position is more than half a grid step outside the grid.
+        """
+        j = (lat - self.la1) / (self.dj if self.scan & _SCAN_J_POSITIVE else -self.dj) if self.dj else 0.0
+        east = (self.lo1 - lon) if self.scan & _SCAN_I_NEGATIVE else (lon - self.lo1)
+        i = ((east + 0.5 * self.di) % 360 - 0.5 * self.di) / self.di if self.di else 0.0
+
+        i, j = round(i), round(j)
+        if not (0 <= i < self.ni and 0 <= j < self.nj):
+            return None
+        return i * self.nj + j if self.scan & _SCAN_J_CONSECUTIVE else j * self.ni + i
+
+
+# =========================
+# PARSE
+# =========================
+def parse_grib(data: bytes) -> list[GribMessage]:
+    """
+    Split a GRIB1 file into messages.
+    Bytes outside messages (padding, mail junk) are skipped, including a
+    "GRIB" in the junk that does not start a valid message. Raises
+    ValueError if no message is valid (e.g. a GRIB2 file).
+    """
+    messages: list[GribMessage] = []
+    view = memoryview(data)
+    pos = data.find(b"GRIB")
+    first_error = None
+
+    while pos != -1 and pos + 8 <= len(data):
+        total = int.from_bytes(view[pos + 4:pos + 7], "big")
+        edition = view[pos + 7]
+        end = pos + total
+
+        error = None
+        if edition != 1:
+            error = f"Unsupported GRIB edition {edition} at offset {pos}"
+        elif data[end - 4:end] != b"7777":
+            error = f"GRIB message at offset {pos} has no end section"
+
+        if error is not None:
+            # Not a message start, look for the next one
+            first_error = first_error or error
+            pos = data.find(b"GRIB", pos + 4)
+            continue
+
+        offset = pos + 8
+        pds = _read_section(view, offset)
+        offset += len(pds)
+
+        gds = None
+        if pds[7] & _FLAG_GDS:
+            gds = _read_section(view, offset)
+            offset += len(gds)
+
+        bms = None
+        if pds[7] & _FLAG_BMS:
+            bms = _read_section(view, offset)
+            offset += len(bms)
+
+        bds = _read_section(view, offset)
+        messages.append(GribMessage(pds, gds, bms, bds))
+
+        pos = data.find(b"GRIB", end)
+
+    if not messages and first_error is not None:
+        raise ValueError(first_error)
+    return messages
+
+
+def _read_section(view: memoryview, offset: int) -> bytes:
+    length = int.from_bytes(view[offset:offset + 3], "big")
+    if length < 3:
+        raise ValueError(f"Invalid GRIB section length {length} at offset {offset}")
+    return bytes(view[offset:offset + length])
+
+
+# =========================
+# UNPACK VALUES
+# =========================
+def unpack_values(message: GribMessage) -> np.ndarray:
+    """
+    Decode the BDS of a simple packed message.
+    Returns float64 values of the present grid points.
+    """
+    if not message.is_simple_packing:
+        raise ValueError("Only simple grid point packing is supported")
+
+    count = message.point_count()
+    nbits = message.bits_per_value
+    reference = message.reference_value
+    scale = 10.0 ** -message.decimal_scale
+
+    if nbits == 0:
+        return np.full(count, reference * scale)
+
+    packed = np.frombuffer(message.bds, dtype=np.uint8, offset=_BDS_HEADER_LEN)
+    bits = np.unpackbits(packed)[:count * nbits].reshape(count, nbits)
+    weights = np.left_shift(np.uint64(1), np.arange(nbits - 1, -1, -1, dtype=np.uint64))
+    raw = bits.astype(np.uint64) @ weights
+
+    return (reference + raw * 2.0 ** message.binary_scale) * scale
+
+
+def field_values(message: GribMessage) -> np.ndarray:
+    """
+    Values of every grid point in storage order, NaN where the bitmap
+    marks a point as missing.
+    """
+    values = unpack_values(message)
+    bitmap = message.bitmap()
+    if bitmap is None:
+        return values
+
+    field = np.full(bitmap.size, np.nan)
+    field[bitmap] = values
+    return field
+
+
+# =========================
+# PACK VALUES
+# =========================
+def pack_values(message: GribMessage, values: np.ndarray, precision: float) -> GribMessage:
+    """
+    Re-quantize values to the given precision (in the parameter's unit)
+    and return a new message with a simple packed BDS.
+    """
+    decimal_scale = -math.floor(math.log10(precision))
+    binary_scale = math.floor(math.log2(precision * 10.0 ** decimal_scale))
+
+    scaled = values * 10.0 ** decimal_scale
+    reference_bytes = _float_to_ibm(float(scaled.min()) if scaled.size else 0.0)
+    reference = _ibm_to_float(reference_bytes)
+
+    raw = np.rint((scaled - reference) / 2.0 ** binary_scale).astype(np.uint64)
+    max_raw = int(raw.max()) if raw.size else 0
+    nbits = max_raw.bit_length()
+
+    if nbits:
+        shifts = np.arange(nbits - 1, -1, -1, dtype=np.uint64)
+        bits = ((raw[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+        data = np.packbits(bits.ravel()).tobytes()
+    else:
+        data = b""
+
+    # Even section length, like ECMWF encoders (unused bits may be > 7)
+    length = _BDS_HEADER_LEN + len(data)
+    if length % 2:
+        data += b"\x00"
+        length += 1
+    unused_bits = (length - _BDS_HEADER_LEN) * 8 - raw.size * nbits
+
+    bds = (
+        length.to_bytes(3, "big")
+        + bytes([unused_bits & 0x0F])
+        + _write_signed16(binary_scale)
+        + reference_bytes
+        + bytes([nbits])
+        + data
+    )
+    pds = message.pds[:26] + _write_signed16(decimal_scale) + message.pds[28:]
+
+    return GribMessage(pds, message.gds, message.bms, bds)
+
+
+# =========================
+# REPACK GRIB
+# =========================
+def repack_grib(data: bytes, precision: dict[int, float] | None = None) -> bytes:
+    """
+    Re-quantize every field to the configured precision and drop
+    redundant data:
+    - bytes outside GRIB messages
+    - duplicate fields (same PDS and grid)
+    - bitmaps where every grid point is present
+
+    Fields without a configured precision, or which are already packed
+    at least as tight, are kept unchanged.
+    """
+    precision = precision if precision is not None else configs.GRIB_PRECISION
+    start = time.perf_counter()
+
+    seen: set[bytes] = set()
+    out: list[bytes] = []
+
+    for message in parse_grib(data):
+        if message.key in seen:
+            logging.info("Dropping duplicate GRIB field (parameter %s)", message.parameter)
+            continue
+        seen.add(message.key)
+
+        out.append(_repack_message(message, precision.get(message.parameter)).to_bytes())
+
+    repacked = b"".join(out)
+    logging.info(
+        "Repacked GRIB %d -> %d bytes in %.1f ms",
+        len(data),
+        len(repacked),
+        (time.perf_counter() - start) * 1000,
+    )
+    return repacked
+
+
+def mask_grib(
+    data: bytes,
+    keep: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    precision: dict[int, float] | None = None,
+) -> bytes:
+    """
+    Drop the grid points where keep(lat, lon) is False: they are marked
+    missing in a bitmap (BMS) and only the remaining values are packed,
+    so the data shrinks with the share of points kept. Any GRIB1 reader
+    expands the bitmap again.
+
+    Values are packed at the configured precision, or at the precision
+    of the field. Fields not on a regular lat/lon grid are kept as is.
+    """
+    precision = precision if precision is not None else configs.GRIB_PRECISION
+    start = time.perf_counter()
+    out: list[bytes] = []
+    kept = total = 0
+
+    for message in parse_grib(data):
+        if not message.is_simple_packing or message.gds is None or message.gds[5] != 0:
+            out.append(message.to_bytes())
+            continue
+
+        lat, lon = message.grid().coordinates()
+        present = keep(lat, lon)
+        values = field_values(message)
+        present &= ~np.isnan(values)
+
+        kept += int(present.sum())
+        total += present.size
+        out.append(_mask_message(message, present, values[present], precision.get(message.parameter)).to_bytes())
+
+    masked = b"".join(out)
+    logging.info(
+        "Masked GRIB to %d of %d grid points, %d -> %d bytes in %.1f ms",
+        kept,
+        total,
+        len(data),
+        len(masked),
+        (time.perf_counter() - start) * 1000,
+    )
+    return masked
+
+
+def _mask_message(message: GribMessage, present: np.ndarray, values: np.ndarray, precision: float | None) -> GribMessage:
+    bits = np.packbits(present).tobytes()
+    # Even section length, like the BDS
+    length = 6 + len(bits) + (len(bits) % 2)
+    unused_bits = (length - 6) * 8 - present.size
+    bms = length.to_bytes(3, "big") + bytes([unused_bits]) + b"\x00\x00" + bits.ljust(length - 6, b"\x00")
+
+    pds = message.pds[:7] + bytes([message.pds[7] | _FLAG_BMS]) + message.pds[8:]
+    masked = GribMessage(pds, message.gds, bms, message.bds)
+
+    if precision is None:
+        precision = 2.0 ** message.binary_scale * 10.0 ** -message.decimal_scale
+    return pack_values(masked, values, precision)
+
+
+def repack_grib_file(file: BytesIO | PayloadBuffer, precision: dict[int, float] | None = None) -> PayloadBuffer:
+    """
+    repack_grib for the in-memory attachment from download_grib_attachment.
+    """
+    buffer = PayloadBuffer.from_source(file)
+    return PayloadBuffer(repack_grib(buffer.raw(), precision), name=buffer.name)
+
+
+def _repack_message(message: GribMessage, precision: float | None) -> GribMessage:
+    if not message.is_simple_packing:
+        return message
+
+    if message.bms is not None and message.bitmap().all():
+        pds = message.pds[:7] + bytes([message.pds[7] & ~_FLAG_BMS]) + message.pds[8:]
+        message = GribMessage(pds, message.gds, None, message.bds)
+
+    if precision is None or message.bits_per_value == 0:
+        return message
+
+    values = unpack_values(message)
+    repacked = pack_values(message, values, precision)
+
+    if repacked.bits_per_value >= message.bits_per_value:
+        return message
+    return repacked
+
+
+# =========================
+# HELPERS
+# =========================
+def _read_signed16(raw: bytes) -> int:
+    # GRIB1 signed integers: sign bit + magnitude
+    value = int.from_bytes(raw, "big")
+    return -(value & 0x7FFF) if value & 0x8000 else value
+
+
+def _read_signed24(raw: bytes) -> int:
+    value = int.from_bytes(raw, "big")
+    return -(value & 0x7FFFFF) if value & 0x800000 else value
+
+
+def _write_signed16(value: int) -> bytes:
+    return ((0x8000 | -value) if value < 0 else value).to_bytes(2, "big")
+
+
+def _ibm_to_float(raw: bytes) -> float:
+    value = int.from_bytes(raw, "big")
+    sign = -1.0 if value & 0x80000000 else 1.0
+    exponent = (value >> 24) & 0x7F
+    mantissa = value & 0x00FFFFFF
+    return sign * mantissa / 2.0 ** 24 * 16.0 ** (exponent - 64)
+
+
+def _float_to_ibm(value: float) -> bytes:
+    """
+    Encode an IBM single precision float, rounding towards -inf so the
+    reference value never exceeds the field minimum.
+    """
+    if value == 0.0:
+        return b"\x00\x00\x00\x00"
+
+    sign = 0x80 if value < 0 else 0
+    magnitude = abs(value)
+
+    _, exp2 = math.frexp(magnitude)
+    exponent = math.ceil(exp2 / 4)
+    fraction = magnitude / 16.0 ** exponent * 2 ** 24
+    mantissa = math.ceil(fraction) if sign else math.floor(fraction)
+
+    if mantissa >= 2 ** 24:
+        mantissa >>= 4
+        exponent += 1
+
+    exponent = max(0, min(127, exponent + 64))
+    return bytes([sign | exponent]) + mantissa.to_bytes(3, "big")
@@ -0,0 +1,185 @@
+#FILE src/inreach_decoder.py
+import argparse
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from src import framing
+from src.compression_functions import decompress_payload
+from src.encoding_functions import decode_payload
+
+logger = logging.getLogger(__name__)
+
+# Offline decoder for the GRIB messages received on the InReach.
+# Only needs the standard library and the encoding/compression/framing
+# modules, not the mail or OpenAI clients.
+#
+#     python -m src.inreach_decoder messages.txt [more.txt ...] [-o out.grb]
+#     pbpaste | python -m src.inreach_decoder
+
+
+# =========================
+# STREAMING DECODER
+# =========================
+class InReachDecoder:
+    """
+    Collects the messages of one GRIB reply from any paste: messages may
+    repeat, come in any order or be mixed with other text (Earthmate
+    timestamps, signatures, ...), which is skipped. Text can be fed in
+    pieces as messages arrive; a frame header and its data line may be
+    in different pieces.
+
+    Messages are indexed by sequence number, so feeding is linear in the
+    length of the text. Frames of another job than the first one seen
+    are skipped.
+    """
+
+    def __init__(self):
+        self.frames: dict[int, framing.Frame] = {}
+        self.job_id: str | None = None
+        self.total: int | None = None
+        self.parity = 0
+        self.duplicates = 0
+        self.skipped_lines = 0
+        self.other_jobs: set[str] = set()
+        self._header: str | None = None
+
+    def feed(self, text: str) -> list[int]:
+        """
+        Index the messages in text. Returns the sequence numbers that
+        were new.
+        """
+        new: list[int] = []
+
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line == "end":
+                continue
+
+            if framing.is_frame_header(line):
+                if self._header is not None:
+                    self.skipped_lines += 1
+                self._header = line
+                continue
+
+            if self._header is None:
+                self.skipped_lines += 1
+                continue
+
+            try:
+                frame = framing.parse_frame(self._header, line)
+            except ValueError as e:
+                logger.warning("Skipping message: %s", e)
+                frame = None
+            self._header = None
+
+            if frame is not None and self._add(frame):
+                new.append(frame.seq)
+
+        return new
+
+    def _add(self, frame: framing.Frame) -> bool:
+        if self.job_id is None and not self.frames:
+            self.job_id = frame.job_id
+        elif frame.job_id != self.job_id:
+            self.other_jobs.add(str(frame.job_id))
+            return False
+
+        if frame.seq in self.frames:
+            self.duplicates += 1
+            return False
+
+        self.frames[frame.seq] = frame
+        if frame.total is not None:
+            self.total = frame.total
+            self.parity = frame.parity
+        return True
+
+    @property
+    def missing(self) -> list[int]:
+        """
+        Sequence numbers not received, up to the total (or the highest
+        number seen while the total is unknown).
+        """
+        last = self.total or max(self.frames, default=0)
+        return [seq for seq in range(1, last + 1) if seq not in self.frames]
+
+    @property
+    def needed(self) -> int:
+        """
+        Messages still needed; with FEC any of the missing ones will do.
+        """
+        if self.total is None:
+            return len(self.missing) if self.frames else 1
+        return max(0, self.total - self.parity - len(self.frames))
+
+    @property
+    def complete(self) -> bool:
+        return self.total is not None and self.needed == 0
+
+    def status(self) -> str:
+        if not self.frames:
+            return "No messages found"
+
+        text = f"{len(self.frames)}/{self.total or '?'} messages"
+        if self.job_id:
+            text = f"Job {self.job_id}: " + text
+        if self.complete:
+            return text + ", complete"
+        if self.parity:
+            return text + f", need {self.needed} more of {self.missing}"
+        return text + f", missing {self.missing}"
+
+    def payload_chunks(self) -> list[str]:
+        """
+        Encoded payload chunks in order. Raises ValueError listing the
+        missing messages if the reply is not complete.
+        """
+        if not self.complete:
+            raise ValueError(self.status())
+        frames = [self.frames[seq] for seq in sorted(self.frames)]
+        return framing.frames_to_payload_chunks(frames)
+
+    def decode(self) -> bytes:
+        """
+        The GRIB file, once complete.
+        """
+        return decompress_payload(decode_payload("".join(self.payload_chunks())))
+
+
+# =========================
+# CLI
+# =========================
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Decode GRIB messages received on the InReach")
+    parser.add_argument("files", nargs="*", help="Text files with the messages (default: stdin)")
+    parser.add_argument("-o", "--output", help="GRIB file to write (default: decoded_grib_<time>.grb)")
+    args = parser.parse_args(argv)
+
+    decoder = InReachDecoder()
+
+    if args.files:
+        for name in args.files:
+            decoder.feed(Path(name).read_text(encoding="utf-8", errors="replace"))
+    else:
+        for line in sys.stdin:
+            decoder.feed(line)
+
+    print(decoder.status())
+    if decoder.other_jobs:
+        print(f"Skipped messages of other jobs: {sorted(decoder.other_jobs)}")
+
+    if not decoder.complete:
+        return 1
+
+    grib_bytes = decoder.decode()
+    output = Path(args.output or f"decoded_grib_{datetime.now().strftime('%Y%m%d_%H%M%S')}.grb")
+    output.write_bytes(grib_bytes)
+
+    print(f"Decoded GRIB ({len(grib_bytes)} bytes) saved to: {output.resolve()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
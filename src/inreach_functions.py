@@ -1,42 +1,67 @@
 #FILE src/inreach_functions.py
 import logging
-import asyncio
+from typing import AsyncIterable
 import src.configs as configs
 from src.inreach_sender import InReachSender
+from src.send_scheduler import SendScheduler, SendSummary
 
 async def send_messages_to_inreach(
     reply_url: str,
     wrapped_messages: list[str],
     sender: InReachSender,
-    delay_seconds: float = 1.0,
-):
+    delay_seconds: float | None = None,
+    delivered: list[int] | None = None,
+    on_delivered=None,
+    deadline: float | None = None,
+) -> SendSummary:
     """
     Sends split messages to InReach using the provided sender.
-    Attempts to send all messages, even if some fail.
-    Logs errors per message instead of raising immediately.
-    """
 
-    for idx, part in enumerate(wrapped_messages, start=1):
-        try:
-            logging.info("Sending InReach message %s/%s", idx, len(wrapped_messages))
-            response = await sender.send(reply_url, part)
+    Sending is paced by an adaptive token bucket starting at one message
+    per delay_seconds (default configs.DELAY_BETWEEN_MESSAGES). The rate
+    speeds up while Garmin accepts messages and backs off on 429/5xx or
+    Retry-After. Failed parts are retried with jitter without stalling
+    the other parts.
+
+    Parts in delivered (1-based) are skipped, so an interrupted reply
+    resumes where it stopped. on_delivered(part_number) is called per
+    delivered part; parts left at deadline (time.monotonic()) stay pending.
 
-            if response.status_code == 200:
-                logging.info("Message %s/%s sent successfully", idx, len(wrapped_messages))
-            else:
-                logging.error(
-                    "Failed to send message %s/%s: %s %s",
-                    idx,
-                    len(wrapped_messages),
-                    response.status_code,
-                    response.text,
-                )
+    Returns:
+    SendSummary: which parts were delivered and which failed
+    """
+    scheduler = SendScheduler(interval=delay_seconds)
+    return await scheduler.send(
+        reply_url,
+        wrapped_messages,
+        sender,
+        delivered=delivered,
+        on_delivered=on_delivered,
+        deadline=deadline,
+    )
 
-        except Exception as e:
-            logging.exception("Exception sending message %s/%s: %s", idx, len(wrapped_messages), e)
+async def send_stream_to_inreach(
+    reply_url: str,
+    wrapped_messages: AsyncIterable[str],
+    sender: InReachSender,
+    on_delivered=None,
+    deadline: float | None = None,
+) -> SendSummary:
+    """
+    Sends parts to InReach while they are still being produced
+    (see MessageSplitter), paced like send_messages_to_inreach.
 
-        if idx < len(wrapped_messages):
-            await asyncio.sleep(delay_seconds)
+    Returns:
+    SendSummary: which parts were delivered, failed or left pending
+    """
+    scheduler = SendScheduler()
+    return await scheduler.send_stream(
+        reply_url,
+        wrapped_messages,
+        sender,
+        on_delivered=on_delivered,
+        deadline=deadline,
+    )
 
 def split_message(message: str):
     """
@@ -66,6 +91,52 @@ def wrap_messages(encodedmessages: list[str]):
 
     total_splits = len(encodedmessages)
     return [
-        f"msg {index + 1}/{total_splits}:\n{encodedMessage}\nend"
+        wrap_message(index + 1, encodedMessage, total_splits)
         for index, encodedMessage in enumerate(encodedmessages)
     ]
+
+def wrap_message(number: int, message: str, total: int | None = None):
+    """
+    Wrap one message as "msg x/y:\n<data>\nend".
+    y is "?" while the total number of messages is not known yet.
+    """
+    return f"msg {number}/{total if total is not None else '?'}:\n{message}\nend"
+
+
+class MessageSplitter:
+    """
+    split_message and wrap_messages for a message that is still being
+    generated (e.g. a streamed chat answer).
+
+    feed() returns the parts that are complete, so they can be sent
+    before the rest of the message exists. Their total is not known yet,
+    so they are wrapped as "msg x/?"; the last part, returned by
+    finish(), is "msg y/y".
+    """
+
+    def __init__(self, split_length: int | None = None):
+        self.split_length = split_length or configs.MESSAGE_SPLIT_LENGTH
+        self.chunks: list[str] = []
+        self._buffer = ""
+
+    @property
+    def message(self) -> str:
+        return "".join(self.chunks) + self._buffer
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        parts = []
+        # A full chunk is only complete once more text follows it
+        while len(self._buffer) > self.split_length:
+            chunk = self._buffer[:self.split_length]
+            self._buffer = self._buffer[self.split_length:]
+            self.chunks.append(chunk)
+            parts.append(wrap_message(len(self.chunks), chunk))
+        return parts
+
+    def finish(self) -> list[str]:
+        if not self._buffer:
+            return []
+        self.chunks.append(self._buffer)
+        self._buffer = ""
+        return [wrap_message(len(self.chunks), self.chunks[-1], len(self.chunks))]
@@ -1,28 +1,78 @@
 #FILE src/inreach_sender.py
 
-import httpx
 import logging
 import uuid
 import src.configs as configs
+from typing import TYPE_CHECKING
 from urllib.parse import urlparse, parse_qs
 
+if TYPE_CHECKING:
+    import httpx
+
 
 class InReachSender:
-    async def send(self, url: str, message: str) -> httpx.Response:
-        async with httpx.AsyncClient() as client:
-            logging.info("Sending InReach message")
-            return await self.post_request_to_inreach(client, url, message)
-        
+    """
+    Sends reply messages to Garmin InReach.
+
+    Owns one long-lived pooled httpx client (HTTP/2, keep-alive), so all
+    parts of a reply reuse the same connection to explore.garmin.com.
+    Use as async context manager, or call aclose() when done.
+    """
+
+    def __init__(self, client: "httpx.AsyncClient | None" = None):
+        self._client = client
+        if client is not None:
+            client.cookies.update(configs.INREACH_COOKIES)
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            # Imported on first send, not on every cold start
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                http2=configs.INREACH_HTTP2,
+                cookies=configs.INREACH_COOKIES,
+                timeout=httpx.Timeout(configs.INREACH_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=configs.INREACH_MAX_CONNECTIONS,
+                    max_keepalive_connections=configs.INREACH_MAX_CONNECTIONS,
+                    keepalive_expiry=configs.INREACH_KEEPALIVE_SECONDS,
+                ),
+            )
+        return self._client
+
+    async def send(self, url: str, message: str) -> "httpx.Response":
+        logging.info("Sending InReach message")
+        return await self.post_request_to_inreach(self.client, url, message)
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def drop_connections(self):
+        """
+        Forget a client bound to an event loop that is gone, without closing it.
+        """
+        self._client = None
+
+    async def __aenter__(self) -> "InReachSender":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
     # =========================
     # DEFAULT HTTP IMPLEMENTATION
     # =========================
 
     async def post_request_to_inreach(
         self,
-        client: httpx.AsyncClient,
+        client: "httpx.AsyncClient",
         url: str,
         message_str: str,
-    ) -> httpx.Response:
+    ) -> "httpx.Response":
         """
         Default HTTP implementation of InReachSender.
         """
@@ -41,7 +91,6 @@ class InReachSender:
 
         response = await client.post(
             url,
-            cookies=configs.INREACH_COOKIES,
             headers=configs.INREACH_HEADERS,
             data=data,
         )
@@ -74,4 +123,3 @@ class InReachSender:
             raise ValueError(f"No extId found in InReach URL: {url}")
 
         return guid[0]
-
@@ -0,0 +1,200 @@
+#FILE src/job_store.py
+import json
+import logging
+import secrets
+import sqlite3
+import string
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field, replace
+
+import src.configs as configs
+from src.InReachRequest import InReachRequest
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# JOB STATES
+# =========================
+# RECEIVED    request decoded from the InReach mail
+# QUERIED     Saildocs query sent, waiting for the GRIB reply
+# GRIB_READY  reply payload (encoded GRIB or chat answer) ready to send
+# SENDING     parts being sent, job.delivered holds the delivered parts (k/n)
+# DONE        every part delivered
+# FAILED      gave up (no Saildocs reply, attempts or send rounds exhausted)
+RECEIVED = "received"
+QUERIED = "queried"
+GRIB_READY = "grib_ready"
+SENDING = "sending"
+DONE = "done"
+FAILED = "failed"
+
+TERMINAL_STATES = (DONE, FAILED)
+
+_JOB_ID_CHARS = string.digits + string.ascii_lowercase
+
+
+@dataclass
+class Job:
+    """
+    One InReach request on its way through the pipeline.
+    Part numbers in delivered are 1-based, like in "msg x/y".
+    """
+    id: str
+    type: str
+    payload_text: str
+    reply_url: str
+    state: str = RECEIVED
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    queried_at: float | None = None
+    message: str | None = None
+    parts: list[str] = field(default_factory=list)
+    delivered: list[int] = field(default_factory=list)
+    attempts: int = 0
+    send_rounds: int = 0
+    error: str | None = None
+
+    @classmethod
+    def from_request(cls, inreach_request: InReachRequest) -> "Job":
+        return cls(
+            id=new_job_id(),
+            type=inreach_request.type,
+            payload_text=inreach_request.payload_text,
+            reply_url=inreach_request.reply_url,
+        )
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+    @property
+    def progress(self) -> str:
+        if self.state == SENDING:
+            return f"{SENDING}({len(self.delivered)}/{len(self.parts)})"
+        return self.state
+
+
+def new_job_id(length: int = 5) -> str:
+    """
+    Short base36 job id (fits in an InReach message header).
+    """
+    return "".join(secrets.choice(_JOB_ID_CHARS) for _ in range(length))
+
+
+# =========================
+# STORES
+# =========================
+class JobStore(ABC):
+    """
+    Persistence for jobs between timer invocations.
+    Implementations: SqliteJobStore (file backed) and MemoryJobStore.
+    """
+
+    @abstractmethod
+    def save(self, job: Job):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Job | None:
+        ...
+
+    @abstractmethod
+    def active(self) -> list[Job]:
+        """
+        Jobs that are not DONE/FAILED, oldest first.
+        """
+
+    @abstractmethod
+    def prune(self, older_than: float):
+        """
+        Delete finished jobs last updated before older_than (epoch seconds).
+        """
+
+    def close(self):
+        pass
+
+
+class MemoryJobStore(JobStore):
+
+    def __init__(self):
+        self._jobs: dict[str, Job] = {}
+
+    def save(self, job: Job):
+        job.updated_at = time.time()
+        self._jobs[job.id] = _copy(job)
+
+    def get(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        return _copy(job) if job else None
+
+    def active(self) -> list[Job]:
+        jobs = [_copy(j) for j in self._jobs.values() if not j.is_terminal]
+        return sorted(jobs, key=lambda j: j.created_at)
+
+    def prune(self, older_than: float):
+        for job_id in [j.id for j in self._jobs.values() if j.is_terminal and j.updated_at < older_than]:
+            del self._jobs[job_id]
+
+
+class SqliteJobStore(JobStore):
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+        self._db.commit()
+
+    def save(self, job: Job):
+        job.updated_at = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, state, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                (job.id, job.state, job.created_at, job.updated_at, json.dumps(asdict(job))),
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(**json.loads(row[0])) if row else None
+
+    def active(self) -> list[Job]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM jobs WHERE state NOT IN (?, ?) ORDER BY created_at",
+                TERMINAL_STATES,
+            ).fetchall()
+        return [Job(**json.loads(row[0])) for row in rows]
+
+    def prune(self, older_than: float):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+                (*TERMINAL_STATES, older_than),
+            )
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def open_job_store() -> JobStore:
+    """
+    Job store at configs.JOB_STORE_PATH (":memory:" keeps jobs for one run only).
+    """
+    return SqliteJobStore(configs.JOB_STORE_PATH())
+
+
+def _copy(job: Job) -> Job:
+    return replace(job, parts=list(job.parts), delivered=list(job.delivered))
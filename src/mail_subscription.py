@@ -0,0 +1,135 @@
+#FILE src/mail_subscription.py
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import src.configs as configs
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# NOTIFIERS
+# =========================
+class DeltaQueryNotifier:
+    """
+    Reports new Inbox mails using Microsoft Graph delta queries.
+
+    The first call returns the mails received within the lookback window
+    (so replies that arrived before anybody waited are seen), every
+    following call returns only the changes since the previous call.
+    """
+
+    def __init__(
+        self,
+        mail,
+        user_id: str,
+        interval: float | None = None,
+        lookback: float | None = None,
+    ):
+        self.mail = mail
+        self.user_id = user_id
+        self.interval = interval if interval is not None else configs.SAILDOCS_POLL_INTERVAL
+        lookback = lookback if lookback is not None else configs.SAILDOCS_LOOKBACK
+        self.received_after = datetime.now(timezone.utc) - timedelta(seconds=lookback)
+        self._delta_link: str | None = None
+
+    async def next_batch(self) -> list:
+        if self._delta_link is not None:
+            await asyncio.sleep(self.interval)
+
+        messages, self._delta_link = await self.mail.get_inbox_delta(
+            self.user_id,
+            delta_link=self._delta_link,
+            received_after=self.received_after,
+        )
+        return messages
+
+
+class LocalNotifier:
+    """
+    In-process stand-in notifier: publish() pushes mails to the waiters.
+    Used by tests and local runs without Graph.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def publish(self, *messages):
+        self._queue.put_nowait(list(messages))
+
+    async def next_batch(self) -> list:
+        return await self._queue.get()
+
+
+# =========================
+# SUBSCRIPTION
+# =========================
+class MailSubscription:
+    """
+    Wakes waiting requests as soon as a matching mail arrives.
+
+    One notifier is shared by all waiters, so concurrent requests cost a
+    single stream of Graph calls. The notifier only runs while somebody
+    is waiting. Mails nobody claimed yet are kept (bounded) for waiters
+    that register later.
+    """
+
+    def __init__(self, notifier, max_unclaimed: int = 200):
+        self.notifier = notifier
+        self._waiters: list[tuple[Callable, asyncio.Future]] = []
+        self._unclaimed: deque = deque(maxlen=max_unclaimed)
+        self._pump: asyncio.Task | None = None
+
+    async def wait_for(self, predicate: Callable, timeout: float | None = None):
+        """
+        Wait for the first mail matching predicate.
+        Returns the mail, or None on timeout.
+        """
+        for message in list(self._unclaimed):
+            if predicate(message):
+                self._unclaimed.remove(message)
+                return message
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (predicate, future)
+        self._waiters.append(waiter)
+
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run())
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.info("No matching mail within %ss", timeout)
+            return None
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if not self._waiters and self._pump is not None:
+                self._pump.cancel()
+                self._pump = None
+
+    def _dispatch(self, message):
+        for waiter in self._waiters:
+            predicate, future = waiter
+            if not future.done() and predicate(message):
+                future.set_result(message)
+                self._waiters.remove(waiter)
+                return
+        self._unclaimed.append(message)
+
+    async def _run(self):
+        try:
+            while self._waiters:
+                for message in await self.notifier.next_batch():
+                    self._dispatch(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Mail subscription failed: %s", e)
+            for _, future in self._waiters:
+                if not future.done():
+                    future.set_exception(e)
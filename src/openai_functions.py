@@ -1,31 +1,148 @@
-import sys
-sys.path.append(".")
 from src import configs
+from src import chat_budget
 import logging
-from openai import OpenAI
+import time
+from typing import AsyncIterator
 
-client = OpenAI(api_key=configs.OPEN_AI_KEY())
+_client = None
 
-async def request_openai_response(request: str):
 
-    try:
-      max_words_str, prompt = request.split(":", 1)  # split at ":" to separate max_words and prompt
-      max_words = int(max_words_str)
-      logging.info("Max words in response: %s", max_words)
-      logging.info("Prompt to ChatGPT: %s", prompt)
-    except ValueError:
-        print("Invalid message format. Please use 'gpt <max_words>: <prompt>'")
+def get_client():
+    """
+    AsyncOpenAI client, created on first use.
+    Importing openai is slow, so runs without chat requests skip it.
+    """
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(
+            api_key=configs.OPEN_AI_KEY(),
+            timeout=configs.OPENAI_TIMEOUT,
+            max_retries=configs.OPENAI_MAX_RETRIES,
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def drop_client():
+    """
+    Forget a client bound to an event loop that is gone, without closing it.
+    """
+    global _client
+    _client = None
+
+
+async def stream_openai_response(request: str, deadline: float | None = None) -> AsyncIterator[str]:
+    """
+    Yield the answer to '<max_words>: <prompt>' as it is generated
+    (deadline: see stream_chat_completion).
+    """
+    parsed = chat_budget.parse_chat_request(request)
+    if parsed is None:
+        logging.warning("Invalid message format. Please use 'gpt <max_words>: <prompt>'")
         return
+    budget, prompt = parsed
+    logging.info("Budget of response: %s %s", budget.value, budget.unit)
+    logging.info("Prompt to ChatGPT: %s", prompt)
+
+    messages = [
+        {"role": "user", "content": f"Answer this question in maximum {budget.value} words: \nUser: {prompt}."}
+    ]
+    async for text in stream_chat_completion(messages, deadline):
+        yield text
+
 
-    chatCompletion = client.chat.completions.create(
+async def stream_chat_completion(messages: list[dict], deadline: float | None = None) -> AsyncIterator[str]:
+    """
+    Yield the completion text as it is generated.
+
+    The whole completion must arrive before deadline (time.monotonic(),
+    default configs.OPENAI_RESPONSE_TIMEOUT from now), otherwise
+    TimeoutError is raised. A stalled stream is stopped by the read
+    timeout (configs.OPENAI_TIMEOUT, capped at the deadline). The stream
+    is closed when the caller stops iterating or is cancelled.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + configs.OPENAI_RESPONSE_TIMEOUT
+
+    stream = await get_client().chat.completions.create(
         model = "gpt-4-1106-preview",
         stop = None,
         n=1,
-        messages = [
-            {"role": "user", "content": f"Answer this question in maximum {max_words} words: \nUser: {prompt}."}
-        ])
-    response = chatCompletion.choices[0].message.content
+        stream=True,
+        timeout=max(0.0, min(configs.OPENAI_TIMEOUT, deadline - time.monotonic())),
+        messages = messages)
+
+    try:
+        async for chunk in stream:
+            if time.monotonic() > deadline:
+                raise TimeoutError("OpenAI response not complete before the deadline")
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+
+
+async def request_openai_response(request: str, deadline: float | None = None) -> str | None:
+    """
+    The complete answer, or None for an invalid request.
+    """
+    response = "".join([text async for text in stream_openai_response(request, deadline)])
 
     logging.info("Response from Chat-GPT: %s", response)
 
-    return response
\ No newline at end of file
+    return response or None
+
+
+async def request_budgeted_response(request: str, deadline: float | None = None) -> str | None:
+    """
+    Answer for a message or character budget ('2m: <prompt>',
+    '200c: <prompt>'), guaranteed to fit the budget.
+
+    The answer is compacted (chat_budget.compact_text). While it is
+    still too long the model is asked to shorten it, at most
+    configs.CHAT_COMPACTION_ROUNDS times; what is left over is cut at a
+    sentence or word. Returns None for an invalid request.
+    """
+    parsed = chat_budget.parse_chat_request(request)
+    if parsed is None or parsed[0].max_chars is None:
+        logging.warning("Invalid message format. Please use 'gpt <n>m: <prompt>' or 'gpt <n>c: <prompt>'")
+        return None
+
+    budget, prompt = parsed
+    max_chars = budget.max_chars
+    if deadline is None:
+        deadline = time.monotonic() + configs.OPENAI_RESPONSE_TIMEOUT
+    # Aim below the limit: the model does not count characters exactly
+    target = int(max_chars * configs.CHAT_TARGET_RATIO)
+    logging.info("Chat budget %s characters, prompt: %s", max_chars, prompt)
+
+    messages = [
+        {"role": "system", "content": "You answer sailors over a satellite text link. "
+                                      "Plain text only, no lists or markdown. Use common nautical abbreviations."},
+        {"role": "user", "content": f"Answer in at most {target} characters including spaces: {prompt}"},
+    ]
+
+    answer = ""
+    for attempt in range(configs.CHAT_COMPACTION_ROUNDS + 1):
+        raw = "".join([text async for text in stream_chat_completion(messages, deadline)])
+        answer = chat_budget.compact_text(raw)
+        logging.info("Chat answer %s: %s of %s characters", attempt + 1, len(answer), max_chars)
+
+        if len(answer) <= max_chars:
+            return answer
+
+        messages += [
+            {"role": "assistant", "content": answer},
+            {"role": "user", "content": f"That is {len(answer)} characters. Rewrite it in at most "
+                                        f"{target} characters, keeping the key facts."},
+        ]
+
+    return chat_budget.fit_to_budget(answer, max_chars)
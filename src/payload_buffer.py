@@ -0,0 +1,69 @@
+#FILE src/payload_buffer.py
+import binascii
+from io import BytesIO
+
+# Transfer encodings a PayloadBuffer can hold
+RAW = "raw"
+BASE64 = "base64"
+
+# base64 of b"GRIB": raw GRIB data never starts like this
+_BASE64_GRIB = b"R1JJQ"
+
+
+class PayloadBuffer:
+    """
+    Attachment bytes together with their transfer encoding.
+
+    The GRIB pipeline (repack, compress, encode for InReach) always reads
+    raw() and never guesses whether data is already encoded, so a
+    payload cannot be base64 encoded twice. Data is kept as the bytes or
+    bytearray it was received in; no copies are made unless the buffer
+    holds base64 and has to be decoded once.
+    """
+
+    __slots__ = ("_data", "encoding", "name")
+
+    def __init__(self, data: bytes | bytearray, encoding: str = RAW, name: str | None = None):
+        if encoding not in (RAW, BASE64):
+            raise ValueError(f"Unknown payload encoding: {encoding}")
+        if encoding == RAW and bytes(data[:len(_BASE64_GRIB)]) == _BASE64_GRIB:
+            raise ValueError("Payload is base64 encoded GRIB, use encoding=BASE64")
+
+        self._data = data
+        self.encoding = encoding
+        self.name = name
+
+    @classmethod
+    def from_source(cls, source: "str | BytesIO | bytes | bytearray | PayloadBuffer") -> "PayloadBuffer":
+        """
+        Wrap a file path, BytesIO or raw bytes. BytesIO content is shared,
+        not copied.
+        """
+        if isinstance(source, PayloadBuffer):
+            return source
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                return cls(f.read(), name=source)
+        if isinstance(source, BytesIO):
+            return cls(source.getvalue(), name=getattr(source, "name", None))
+        if isinstance(source, (bytes, bytearray)):
+            return cls(source)
+        raise TypeError(f"Unsupported payload source: {type(source).__name__}")
+
+    def raw(self) -> bytes | bytearray:
+        """
+        The decoded bytes. A base64 buffer is decoded once and then kept raw.
+        """
+        if self.encoding == BASE64:
+            self._data = binascii.a2b_base64(self._data)
+            self.encoding = RAW
+        return self._data
+
+    def view(self) -> memoryview:
+        return memoryview(self.raw())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"PayloadBuffer(name={self.name!r}, encoding={self.encoding}, size={len(self._data)})"
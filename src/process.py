@@ -1,16 +1,50 @@
 #FILE src/process.py
+import asyncio
 import logging
+import time
+from collections import Counter
 
+import src.configs as configs
 from src.email_functions import (
     request_weather_report,
     process_new_saildocs_response,
-    retrieve_new_inreach_request,
+    retrieve_new_inreach_requests,
 )
+from src import chat_budget
+from src import chat_cache
 from src import openai_functions as openai_func
 from src import saildoc_functions as saildoc_func
+from src import forecast
+from src import framing
+from src import grib_cache
+from src import route
 from src import inreach_functions as inreach_func
+from src import sent_parts
+from src import service_registry
 from src.graph_mail import GraphMailService
 from src.inreach_sender import InReachSender
+from src.job_store import (
+    Job,
+    JobStore,
+    open_job_store,
+    RECEIVED,
+    QUERIED,
+    GRIB_READY,
+    SENDING,
+    DONE,
+    FAILED,
+)
+from src.payload_buffer import PayloadBuffer
+from src.single_flight import SingleFlight
+
+# Saildocs queries and replies currently in flight, by canonical command
+_weather_flights = SingleFlight()
+
+# Job types answered from a Saildocs GRIB
+_SAILDOCS_TYPES = ("weather", "forecast")
+
+# Outcome of a job step that raised (the job is retried next run)
+ERROR = "error"
 
 # =================================================
 # CORE ASYNC PROCESSOR
@@ -19,75 +53,533 @@ async def run(
     *,
     mail: GraphMailService | None = None,
     inreach_sender: InReachSender | None = None,
+    job_store: JobStore | None = None,
 ) -> bool:
     """
-    Main processing loop.
+    One timer tick.
+
+    New InReach requests are stored as jobs (see job_store), then every
+    unfinished job is advanced as far as it can get without blocking:
+    RECEIVED -> QUERIED -> GRIB_READY -> SENDING(k/n) -> DONE.
+    A job waiting for Saildocs is only checked briefly and picked up
+    again next tick, and sending stops at configs.RUN_TIME_BUDGET and
+    resumes from the last delivered part.
+
+    Jobs are advanced concurrently, at most configs.MAX_CONCURRENT_REQUESTS
+    at a time. A failing job does not affect the others. Weather jobs
+    for the same Saildocs command share one Saildocs query; the GRIB is
+    sent to every reply URL.
+
+    Mail and InReach services default to the process wide ones of
+    service_registry, which stay open between ticks.
 
     Parameters:
     - mail (GraphMailService, optional): injectable for tests
     - inreach_sender (InReachSender, optional): injectable for tests
+    - job_store (JobStore, optional): default configs.JOB_STORE_PATH
 
     Returns:
-    - bool: success/failure
+    - bool: False if a job step failed during this tick
     """
     logging.info("Starting mail processor run()")
+    started = time.monotonic()
+    deadline = started + configs.RUN_TIME_BUDGET
 
-    mail = mail or GraphMailService()
-    inreach_sender = inreach_sender or InReachSender()
+    # Close the store only if this run opened it
+    owns_store = job_store is None
+    job_store = job_store or open_job_store()
 
     try:
+        if mail is None or inreach_sender is None:
+            services = await service_registry.get_services()
+            mail = mail or services.mail
+            inreach_sender = inreach_sender or services.inreach_sender
+
         # -------------------------------------------------
-        # Step 1: Fetch InReach request
+        # Step 1: Store new InReach requests as jobs
         # -------------------------------------------------
-        inreach_request = await retrieve_new_inreach_request(mail)
+        inreach_requests = await retrieve_new_inreach_requests(mail)
 
-        if not inreach_request:
+        if not inreach_requests:
             logging.info("No new InReach requests")
+
+        for inreach_request in inreach_requests:
+            job = Job.from_request(inreach_request)
+            job_store.save(job)
+            logging.info("New job %s: %s", job.id, inreach_request)
+
+        jobs = job_store.active()
+        if not jobs:
             return True
 
         # -------------------------------------------------
-        # Step 2A: Handle weather request
+        # Step 2: Advance jobs with bounded concurrency
         # -------------------------------------------------
-        if(inreach_request.type == "weather"):
-            await request_weather_report(mail, inreach_request.payload_text)
+        semaphore = asyncio.Semaphore(configs.MAX_CONCURRENT_REQUESTS)
 
-            grib_file = await process_new_saildocs_response(
-                mail,
-                inreach_request.payload_text
-            )
+        async def bounded(job: Job) -> str:
+            async with semaphore:
+                return await _advance_job(job, mail, inreach_sender, job_store, deadline)
 
-            if not grib_file:
-                logging.info("No Saildocs response received within timeout")
-                return True
-            
-            message = saildoc_func.encode_saildocs_grib_file(grib_file)
+        outcomes = await asyncio.gather(*(bounded(job) for job in jobs))
 
-        # -------------------------------------------------
-        # Step 2B: Handle weather request
-        # -------------------------------------------------
-        elif(inreach_request.type == "chat"):
-            message = await openai_func.request_openai_response(inreach_request.payload_text)
-            if not message:
-                logging.info("No OpenAI response received")
-                return True
+        job_store.prune(time.time() - configs.JOB_RETENTION_SECONDS)
+
+        summary = Counter(outcomes)
+        logging.info(
+            "Run summary: %d jobs in %.1fs %s",
+            len(jobs),
+            time.monotonic() - started,
+            dict(summary),
+        )
+        return summary[ERROR] == 0
+
+    except Exception:
+        logging.exception("Fatal error during mail processing")
+        return False
+
+    finally:
+        if owns_store:
+            job_store.close()
+
+
+# =================================================
+# JOB STATE MACHINE
+# =================================================
+async def _advance_job(
+    job: Job,
+    mail: GraphMailService,
+    inreach_sender: InReachSender,
+    job_store: JobStore,
+    deadline: float,
+) -> str:
+    """
+    Run job steps until the job waits (no progress), finishes, has had
+    its send round or the run deadline passes. The job is saved after
+    every step.
+
+    Returns the job state, or ERROR if a step raised.
+    """
+    while not job.is_terminal and time.monotonic() < deadline:
+        before = job.progress
+        state = job.state
+
+        try:
+            job.error = None
+            await _STEPS[job.state](job, mail, inreach_sender, job_store, deadline)
+        except Exception as e:
+            logging.exception("Job %s failed in state %s", job.id, job.progress)
+            job.attempts += 1
+            job.error = str(e)
+            if job.attempts >= configs.JOB_MAX_ATTEMPTS:
+                job.state = FAILED
+            job_store.save(job)
+            return ERROR
+
+        job_store.save(job)
+        # One send round per run; undelivered parts are retried next run
+        if job.progress == before or state == SENDING:
+            break
+
+    logging.info("Job %s: %s", job.id, job.progress)
+    return job.state
+
+
+async def _step_received(job: Job, mail, inreach_sender, job_store: JobStore, deadline):
+    """
+    Weather and forecast: answer from the GRIB cache or send the
+    Saildocs query.
+    Chat: answer from the chat cache or OpenAI (see _answer_chat).
+    Resend: the listed parts of an earlier reply (see _resend_parts).
+    """
+    if job.type in _SAILDOCS_TYPES:
+        try:
+            command = _saildocs_command(job)
+        except ValueError as e:
+            logging.warning("Invalid request of job %s: %s", job.id, e)
+            job.state = FAILED
+            job.error = str(e)
+            return
+
+        cache = _grib_cache()
+        grib_file = cache.get(command) if cache is not None else None
+
+        if grib_file is not None:
+            job.message = _grib_reply(job, grib_file)
+            job.state = GRIB_READY
+            return
+
+        key = grib_cache.canonical_command(command)
+        outstanding = _outstanding_query(job_store, key)
+
+        if outstanding is not None:
+            logging.info("Job %s shares the Saildocs query of job %s", job.id, outstanding.id)
+            job.queried_at = outstanding.queried_at
         else:
-            logging.warning("Chat request type is not handled: %s", inreach_request.type)
-            return True
-            
-        # -------------------------------------------------
-        # Step 3: Send to InReach
-        # -------------------------------------------------
-        message_parts = inreach_func.split_message(message)
-        wrapped_message_parts = inreach_func.wrap_messages(message_parts)
-        await inreach_func.send_messages_to_inreach(
-            inreach_request.reply_url,
-            wrapped_message_parts,
+            # Jobs receiving the same command in this tick send one mail
+            await _weather_flights.do(("query", key), lambda: request_weather_report(mail, command))
+            job.queried_at = time.time()
+
+        job.state = QUERIED
+
+    elif job.type == "chat":
+        if job.delivered:
+            # The run died while streaming: a new answer would follow the
+            # parts already delivered, so the answer so far is sent
+            logging.warning("Job %s was interrupted after parts %s", job.id, job.delivered)
+            _send_answer_so_far(job)
+        else:
+            await _answer_chat(job, inreach_sender, job_store, deadline)
+
+    elif job.type == "resend":
+        _resend_parts(job)
+
+    else:
+        logging.warning("Chat request type is not handled: %s", job.type)
+        job.state = FAILED
+        job.error = f"Unsupported request type: {job.type}"
+
+
+async def _answer_chat(job: Job, inreach_sender, job_store: JobStore, deadline: float):
+    """
+    Chat: a repeated question is answered from the chat cache. Message
+    and character budgets need the whole answer to fit it; other
+    answers are streamed to InReach.
+    """
+    cache = _chat_cache()
+    message = cache.get(job.payload_text) if cache is not None else None
+
+    if message is not None:
+        job.message = message
+        job.state = GRIB_READY
+        return
+
+    if chat_budget.is_size_budget(job.payload_text):
+        message = await openai_func.request_budgeted_response(
+            job.payload_text,
+            deadline=min(deadline, time.monotonic() + configs.OPENAI_RESPONSE_TIMEOUT),
+        )
+        if message:
+            job.message = message
+            job.state = GRIB_READY
+    else:
+        message = await _stream_chat(job, inreach_sender, job_store, deadline)
+        if job.state == SENDING and not message:
+            # Broke off after some parts were delivered, not cached
+            return
+
+    if not message:
+        logging.info("No OpenAI response received")
+        job.state = FAILED
+        job.error = "No OpenAI response"
+        return
+
+    if cache is not None:
+        cache.put(job.payload_text, message)
+
+
+async def _stream_chat(job: Job, inreach_sender, job_store: JobStore, deadline: float) -> str | None:
+    """
+    Stream the OpenAI answer straight into InReach parts: each part is
+    sent as soon as it is complete, before the whole answer exists.
+    Parts not delivered here are sent by the SENDING step, with their
+    final "msg x/y" numbering. If the answer breaks off after a part was
+    delivered, the rest of the answer so far is sent instead of
+    retrying the question.
+    """
+    splitter = inreach_func.MessageSplitter()
+    answer_deadline = min(deadline, time.monotonic() + configs.OPENAI_RESPONSE_TIMEOUT)
+
+    async def parts():
+        async for text in openai_func.stream_openai_response(job.payload_text, deadline=answer_deadline):
+            for part in splitter.feed(text):
+                yield part
+        for part in splitter.finish():
+            yield part
+
+    job.delivered = []
+
+    def on_delivered(part_number: int):
+        job.delivered.append(part_number)
+        # Saved with the answer so far, to finish it if the run dies
+        job.message = splitter.message
+        job_store.save(job)
+
+    try:
+        await inreach_func.send_stream_to_inreach(
+            job.reply_url,
+            parts(),
             inreach_sender,
+            on_delivered=on_delivered,
+            deadline=deadline,
         )
+    except Exception:
+        if not job.delivered:
+            raise
+        # A retry would stream a new answer after the parts already
+        # delivered, so the answer so far is sent as it is
+        logging.exception("Answer of job %s broke off after parts %s", job.id, job.delivered)
+        job.message = splitter.message
+        _send_answer_so_far(job)
+        return None
+
+    if not splitter.chunks:
+        return None
+
+    job.message = splitter.message
+    job.parts = inreach_func.wrap_messages(splitter.chunks)
+    _remember_parts(job)
+    job.state = SENDING
+    return job.message
 
+
+def _send_answer_so_far(job: Job):
+    """
+    Send the rest of a chat answer that broke off after some parts were
+    streamed. The parts are split like the stream (MessageSplitter), so
+    the delivered ones are skipped.
+    """
+    job.parts = inreach_func.wrap_messages(inreach_func.split_message(job.message))
+    _remember_parts(job)
+    job.state = SENDING
+
+
+def _resend_parts(job: Job):
+    """
+    "RESEND [job] 3,7": send the listed parts of an earlier reply to the
+    same InReach again, as they were sent (same frame headers).
+    """
+    store = _sent_part_store()
+    try:
+        job_id, numbers = sent_parts.parse_resend_request(job.payload_text)
+    except ValueError as e:
+        job.state = FAILED
+        job.error = str(e)
+        return
+
+    found = store.get(job.reply_url, job_id) if store is not None else None
+
+    if found is None:
+        logging.warning("No sent parts of job %s for %s", job_id or "(last)", job.reply_url)
+        job.state = FAILED
+        job.error = f"No sent parts of job {job_id or '(last)'}"
+        return
+
+    job_id, parts = found
+    unknown = [n for n in numbers if n > len(parts)]
+    if unknown:
+        job.state = FAILED
+        job.error = f"Job {job_id} has {len(parts)} parts, not {unknown}"
+        return
+
+    logging.info("Job %s resends parts %s of job %s", job.id, numbers, job_id)
+    job.parts = [parts[n - 1] for n in numbers]
+    job.delivered = []
+    job.state = SENDING
+
+
+async def _step_queried(job: Job, mail, inreach_sender, job_store, deadline):
+    """
+    Check (briefly) for the Saildocs reply.
+    Jobs for the same command share the wait and the encoded GRIB;
+    forecast and route jobs share the GRIB and make their own reply.
+    """
+    command = _saildocs_command(job)
+    key = grib_cache.canonical_command(command)
+
+    if job.type == "forecast" or saildoc_func.parse_grib_request(job.payload_text).waypoints:
+        grib_file = await _weather_flights.do(("grib", key), lambda: _fetch_grib(mail, command, deadline))
+        message = _grib_reply(job, grib_file) if grib_file else None
+    else:
+        message = await _weather_flights.do(key, lambda: _weather_message(mail, command, deadline))
+
+    if message:
+        job.message = message
+        job.state = GRIB_READY
+    elif time.time() - job.queried_at > configs.SAILDOCS_RESPONSE_TIMEOUT:
+        logging.warning("No Saildocs response for job %s within %ss", job.id, configs.SAILDOCS_RESPONSE_TIMEOUT)
+        job.state = FAILED
+        job.error = "No Saildocs response"
+    else:
+        logging.info("No Saildocs response yet for job %s", job.id)
+
+
+async def _step_grib_ready(job: Job, mail, inreach_sender, job_store, deadline):
+    request = saildoc_func.parse_grib_request(job.payload_text) if job.type == "weather" else None
+    compact = request is not None and request.frame == framing.COMPACT
+    parity = request.parity if request is not None else 0
+
+    if parity and not compact:
+        logging.warning("FEC needs compact framing, sending job %s without parity frames", job.id)
+        parity = 0
+
+    if parity:
+        job.parts = framing.frame_fec_messages(job.message, job.id, parity)
+    elif compact:
+        job.parts = framing.frame_messages(job.message, job.id)
+    else:
+        message_parts = inreach_func.split_message(job.message)
+        job.parts = inreach_func.wrap_messages(message_parts)
+    _remember_parts(job)
+    job.delivered = []
+    job.state = SENDING
+
+
+async def _step_sending(job: Job, mail, inreach_sender, job_store: JobStore, deadline):
+    """
+    Send the parts not delivered yet. Every delivered part is saved
+    right away, so a crash or timeout resumes after the last one.
+    """
+    def on_delivered(part_number: int):
+        job.delivered.append(part_number)
+        job_store.save(job)
+
+    summary = await inreach_func.send_messages_to_inreach(
+        job.reply_url,
+        job.parts,
+        inreach_sender,
+        delivered=job.delivered,
+        on_delivered=on_delivered,
+        deadline=deadline,
+    )
+
+    if summary.all_delivered:
         logging.info("Message sent back to InReach")
-        return True
+        job.state = DONE
+        return
 
-    except Exception:
-        logging.exception("Fatal error during mail processing")
-        return False
+    if summary.pending:
+        # Out of time, continue next tick
+        return
+
+    job.send_rounds += 1
+    logging.warning("Parts not delivered to InReach: %s", summary.failed)
+    if job.send_rounds >= configs.JOB_MAX_SEND_ROUNDS:
+        job.state = FAILED
+        job.error = f"Parts not delivered: {summary.failed}"
+
+
+_STEPS = {
+    RECEIVED: _step_received,
+    QUERIED: _step_queried,
+    GRIB_READY: _step_grib_ready,
+    SENDING: _step_sending,
+}
+
+
+# =================================================
+# WEATHER HELPERS
+# =================================================
+async def _weather_message(mail: GraphMailService, saildocs_command: str, deadline: float) -> str | None:
+    """
+    Encoded GRIB payload for a Saildocs command, or None if Saildocs
+    did not answer (yet).
+    """
+    grib_file = await _fetch_grib(mail, saildocs_command, deadline)
+
+    if not grib_file:
+        return None
+
+    return _encode_grib(grib_file)
+
+
+async def _fetch_grib(mail: GraphMailService, saildocs_command: str, deadline: float):
+    """
+    GRIB for a Saildocs command: from the GRIB cache if the same
+    (canonical) command was answered during the current model cycle,
+    otherwise the Saildocs reply (cached once received), waited for at
+    most until the run deadline.
+    """
+    cache = _grib_cache()
+
+    if cache is not None:
+        grib_file = cache.get(saildocs_command)
+        if grib_file is not None:
+            return grib_file
+
+    wait = max(0.0, min(configs.SAILDOCS_RESPONSE_WAIT, deadline - time.monotonic()))
+    grib_file = await process_new_saildocs_response(mail, saildocs_command, timeout=wait)
+
+    if grib_file and cache is not None:
+        cache.put(saildocs_command, PayloadBuffer.from_source(grib_file))
+
+    return grib_file
+
+
+def _encode_grib(grib_file) -> str:
+    if configs.GRIB_REPACK:
+        # numpy is only imported once a GRIB is actually repacked
+        from src import grib_functions as grib_func
+
+        grib_file = grib_func.repack_grib_file(grib_file)
+
+    return saildoc_func.encode_saildocs_grib_file(grib_file)
+
+
+def _grib_reply(job: Job, grib_file) -> str:
+    """
+    Text forecast for forecast jobs, the encoded GRIB otherwise, with
+    the grid points outside the corridor of a route masked out.
+    """
+    if job.type == "forecast":
+        grib = bytes(PayloadBuffer.from_source(grib_file).raw())
+        return forecast.forecast_text(grib, forecast.parse_forecast_request(job.payload_text))
+
+    request = saildoc_func.parse_grib_request(job.payload_text)
+    if request.waypoints:
+        # numpy is only imported once a GRIB is actually masked
+        from src import grib_functions as grib_func
+
+        buffer = PayloadBuffer.from_source(grib_file)
+        grib_file = PayloadBuffer(
+            grib_func.mask_grib(
+                bytes(buffer.raw()),
+                lambda lat, lon: route.distance_nm(lat, lon, request.waypoints) <= request.corridor_nm,
+            ),
+            name=buffer.name,
+        )
+    return _encode_grib(grib_file)
+
+
+def _saildocs_command(job: Job) -> str:
+    """
+    The Saildocs command of a weather job without the options handled
+    here (fec=K, corridor=NM), or the one covering the positions of a
+    forecast job. Raises ValueError for an invalid request.
+    """
+    if job.type == "forecast":
+        return forecast.saildocs_command(forecast.parse_forecast_request(job.payload_text))
+    return saildoc_func.parse_grib_request(job.payload_text).command
+
+
+def _grib_cache():
+    return grib_cache.get_grib_cache() if configs.GRIB_CACHE_ENABLED else None
+
+
+def _chat_cache():
+    return chat_cache.get_chat_cache() if configs.CHAT_CACHE_ENABLED else None
+
+
+def _sent_part_store():
+    return sent_parts.get_sent_part_store() if configs.SENT_PARTS_ENABLED else None
+
+
+def _remember_parts(job: Job):
+    store = _sent_part_store()
+    if store is not None:
+        store.put(job.reply_url, job.id, job.parts)
+
+
+def _outstanding_query(job_store: JobStore, key: str) -> Job | None:
+    """
+    A QUERIED job for the same canonical command still waiting for Saildocs.
+    """
+    for other in job_store.active():
+        if (
+            other.state == QUERIED
+            and other.type in _SAILDOCS_TYPES
+            and time.time() - other.queried_at <= configs.SAILDOCS_RESPONSE_TIMEOUT
+            and grib_cache.canonical_command(_saildocs_command(other)) == key
+        ):
+            return other
+    return None
@@ -0,0 +1,121 @@
+#FILE src/route.py
+import math
+import re
+
+# Positions and route corridors of weather requests.
+#
+# A GRIB request with waypoints instead of an area asks for a corridor
+# along the route (see saildoc_functions.parse_grib_request):
+#
+#   GRIB gfs:24n,65w;30n,55w;35n,40w|1,1|0,24,48|wind,press corridor=120
+#
+# Saildocs is asked for the bounding box of the corridor, and grid
+# points further than corridor nautical miles from the route are masked
+# out of the GRIB before it is encoded (grib_functions.mask_grib).
+
+_POSITION = re.compile(r"(\d+(?:\.\d+)?)\s*([NS])\s*,?\s*(\d+(?:\.\d+)?)\s*([EW])", re.I)
+
+_NM_PER_DEGREE = 60.0
+
+
+def parse_positions(text: str) -> tuple[tuple[float, float], ...]:
+    """
+    Positions written like "24.5n,65w" (lat, lon in degrees, north and
+    east positive). Raises ValueError for a position out of range.
+    """
+    positions = tuple(
+        (float(lat) * (1 if ns.upper() == "N" else -1), float(lon) * (1 if ew.upper() == "E" else -1))
+        for lat, ns, lon, ew in _POSITION.findall(text)
+    )
+    if any(abs(lat) > 90 or abs(lon) > 180 for lat, lon in positions):
+        raise ValueError(f"Position out of range: {text}")
+    return positions
+
+
+def format_degrees(value: float, positive: str, negative: str) -> str:
+    return f"{abs(value):g}{positive if value >= 0 else negative}"
+
+
+def unwrap_longitudes(lons: list[float]) -> list[float]:
+    """
+    Longitudes relative to the first one (within 180 degrees of it), so
+    positions on both sides of the 180th meridian stay together and
+    min/max give their west and east edge.
+    """
+    first = lons[0]
+    return [first + (lon - first + 180) % 360 - 180 for lon in lons]
+
+
+def box_longitudes(west: float, east: float) -> tuple[float, float]:
+    """
+    West and east edge of an unwrapped box, back in -180..180. A box
+    across 180 has west > east; one 360 degrees wide is the whole globe.
+    """
+    if east - west >= 360:
+        return -180, 180
+    return _wrap_longitude(west), _wrap_longitude(east)
+
+
+def _wrap_longitude(lon: float) -> float:
+    # Keeps 180 for the east edge of a box
+    return lon if -180 <= lon <= 180 else (lon + 180) % 360 - 180
+
+
+# =========================
+# CORRIDOR
+# =========================
+def corridor_area(waypoints: tuple[tuple[float, float], ...], corridor_nm: float) -> str:
+    """
+    Saildocs area "S,N,W,E" (whole degrees) around every point within
+    corridor_nm of the route. A route across the 180th meridian gets a
+    box with west > east, e.g. "18N,27N,167E,167W".
+    """
+    lats = [lat for lat, _ in waypoints]
+    lons = unwrap_longitudes([lon for _, lon in waypoints])
+
+    margin_lat = corridor_nm / _NM_PER_DEGREE
+    south = max(-90, math.floor(min(lats) - margin_lat))
+    north = min(90, math.ceil(max(lats) + margin_lat))
+
+    # Meridians converge: the same distance is more longitude near the poles
+    widest = math.cos(math.radians(min(89.0, max(abs(south), abs(north)))))
+    margin_lon = corridor_nm / (_NM_PER_DEGREE * widest)
+    west, east = box_longitudes(math.floor(min(lons) - margin_lon), math.ceil(max(lons) + margin_lon))
+
+    return ",".join([
+        format_degrees(south, "N", "S"),
+        format_degrees(north, "N", "S"),
+        format_degrees(west, "E", "W"),
+        format_degrees(east, "E", "W"),
+    ])
+
+
+def distance_nm(lat, lon, waypoints: tuple[tuple[float, float], ...]):
+    """
+    Distance in nautical miles from each position (numpy arrays) to the
+    nearest leg of the route. Each leg is measured in a local
+    equirectangular projection, accurate enough for corridors of a few
+    hundred miles.
+    """
+    # numpy is only imported once a GRIB is actually masked
+    import numpy as np
+
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    nearest = np.full(lat.shape, np.inf)
+
+    legs = list(zip(waypoints, waypoints[1:])) or [(waypoints[0], waypoints[0])]
+    for (lat_a, lon_a), (lat_b, lon_b) in legs:
+        scale = math.cos(math.radians((lat_a + lat_b) / 2)) * _NM_PER_DEGREE
+
+        # Leg from a to b and the positions, relative to a (dateline safe)
+        bx = ((lon_b - lon_a + 180) % 360 - 180) * scale
+        by = (lat_b - lat_a) * _NM_PER_DEGREE
+        px = ((lon - lon_a + 180) % 360 - 180) * scale
+        py = (lat - lat_a) * _NM_PER_DEGREE
+
+        length2 = bx * bx + by * by
+        t = np.clip((px * bx + py * by) / length2, 0.0, 1.0) if length2 else 0.0
+        nearest = np.minimum(nearest, np.hypot(px - t * bx, py - t * by))
+
+    return nearest
@@ -1,11 +1,17 @@
 # FILE src/saildoc_functions.py
 import asyncio
 import logging
-import base64
 import hashlib
+import re
 import src.configs as configs
+from dataclasses import dataclass
 from io import BytesIO
 from src.graph_mail import GraphMailService
+from src.compression_functions import compress_payload, decompress_payload
+from src.encoding_functions import encode_payload, decode_payload
+from src.framing import COMPACT, LEGACY, frames_to_payload_chunks, parse_frames
+from src.payload_buffer import PayloadBuffer
+from src import route
 
 # =========================
 # SAILDOCS EMAIL PROCESSING
@@ -41,29 +47,108 @@ async def process_new_saildocs_response(mail : GraphMailService):
 
 
 # =========================
-# ENCODE GRIB
+# REQUEST OPTIONS
 # =========================
-def encode_saildocs_grib_file(file: str | BytesIO):
+_FEC_OPTION = re.compile(r"\s*\bfec=(\d+)\b", re.I)
+_CORRIDOR_OPTION = re.compile(r"\s*\bcorridor=(\d+(?:\.\d+)?)\b", re.I)
+_FRAME_OPTION = re.compile(rf"\s*\bframe=({COMPACT}|{LEGACY})\b", re.I)
+
+
+@dataclass(frozen=True)
+class GribRequest:
     """
-    Accepts either a file path (str) or a BytesIO object.
-    Returns a list of base64-encoded message chunks.
+    A GRIB request split into the Saildocs command and the options
+    handled here. For a route, command asks for the bounding box of the
+    corridor and waypoints/corridor_nm describe the corridor.
     """
-    logging.info("Type: %s", type(file))
-    logging.info("Tell before read: %s", file.tell() if hasattr(file, "tell") else "N/A")
+    command: str
+    parity: int
+    waypoints: tuple[tuple[float, float], ...] = ()
+    corridor_nm: float = 0.0
+    frame: str = LEGACY
+
+
+def parse_grib_request(request: str) -> GribRequest:
+    """
+    Separate the options of a GRIB request from the Saildocs command:
+
+        "ecmwf:24n,34n,72w,60w|8,8|12,48|wind fec=2"
+            -> command "ecmwf:24n,34n,72w,60w|8,8|12,48|wind", parity 2
+
+    Waypoints separated by ";" instead of an area request a corridor of
+    corridor=NM nautical miles (default configs.GRIB_CORRIDOR_NM) along
+    the route:
+
+        "gfs:24n,65w;30n,55w|1,1|24|wind corridor=60"
+            -> command "gfs:23N,31N,67W,53W|1,1|24|wind", corridor 60
+
+    Parity defaults to configs.GRIB_FEC_PARITY and is capped at
+    configs.GRIB_FEC_MAX_PARITY. The reply framing is frame=compact or
+    frame=legacy (default configs.GRIB_FRAMING); fec=K needs compact
+    frames, so it implies frame=compact unless frame=legacy is given.
+    """
+    frame = configs.GRIB_FRAMING
+    parity = configs.GRIB_FEC_PARITY
+    match = _FEC_OPTION.search(request)
+    if match is not None:
+        parity = min(int(match.group(1)), configs.GRIB_FEC_MAX_PARITY)
+        frame = COMPACT
+        request = request[:match.start()] + request[match.end():]
+
+    match = _FRAME_OPTION.search(request)
+    if match is not None:
+        frame = match.group(1).lower()
+        request = request[:match.start()] + request[match.end():]
+
+    corridor_nm = configs.GRIB_CORRIDOR_NM
+    match = _CORRIDOR_OPTION.search(request)
+    if match is not None:
+        corridor_nm = float(match.group(1))
+        request = request[:match.start()] + request[match.end():]
+
+    command = request.strip()
+    head, bar, parameters = command.partition("|")
+    model, colon, area = head.rpartition(":")
+
+    if ";" not in area:
+        return GribRequest(command, parity, frame=frame)
+
+    waypoints = route.parse_positions(area)
+    if len(waypoints) < 2:
+        raise ValueError(f"A route needs at least two waypoints: {area}")
+
+    command = model + colon + route.corridor_area(waypoints, corridor_nm) + bar + parameters
+    return GribRequest(command, parity, waypoints, corridor_nm, frame)
 
-    if isinstance(file, str):
-        with open(file, "rb") as f:
-            data = f.read()
-    else:
-        file.seek(0)
-        data = file.read()
 
+# =========================
+# ENCODE GRIB
+# =========================
+def encode_saildocs_grib_file(
+    file: str | BytesIO | PayloadBuffer,
+    codec: str | None = None,
+    encoding: str | None = None,
+):
+    """
+    Accepts a file path (str), a BytesIO object or a PayloadBuffer
+    (as returned by download_grib_attachment).
+    The GRIB data is compressed with the given codec (default
+    configs.GRIB_COMPRESSION) and prefixed with a one-byte codec tag.
+    Returns the payload encoded as text with the given alphabet
+    (default configs.GRIB_ENCODING: base64, base85 or base88).
+    """
+    buffer = PayloadBuffer.from_source(file)
+    logging.info("Encoding %s", buffer)
+
+    data = buffer.raw()
     logging.info("Raw Grib data size: %s", len(data))
     logging.info("Raw bytes hash: %s", hashlib.sha256(data).hexdigest())
-    logging.info("Raw Grib data: %s", data)
 
-    encoded = base64.b64encode(data).decode("ascii")
-    logging.info("Base64 encode data: %s", encoded)
+    payload = compress_payload(data, codec or configs.GRIB_COMPRESSION)
+    logging.info("Compressed payload size: %s", len(payload))
+
+    encoded = encode_payload(payload, encoding or configs.GRIB_ENCODING)
+    logging.info("Encoded data size: %s", len(encoded))
     return encoded
 
 # =========================
@@ -71,14 +156,16 @@ def encode_saildocs_grib_file(file: str | BytesIO):
 # =========================
 def decode_saildocs_grib_file(message_chunks: list[str]):
     """
-    Accepts a list of base64-encoded message chunks and reconstructs
-    the original GRIB file.
+    Accepts a list of encoded message chunks and reconstructs
+    the original GRIB file. The text alphabet is picked from the payload
+    header (none = base64) and the codec from the payload tag, so both
+    compressed and uncompressed (legacy) payloads decode.
 
-    Each element in message_chunks MUST be a plain base64 string
+    Each element in message_chunks MUST be a plain encoded string
     with no headers, footers, or newlines.
 
     Args:
-        message_chunks (list[str]): Base64 chunks in correct order
+        message_chunks (list[str]): Encoded chunks in correct order
         output (str | BytesIO | None):
             - str: file path to write GRIB
             - BytesIO: in-memory buffer
@@ -87,18 +174,21 @@ def decode_saildocs_grib_file(message_chunks: list[str]):
     Returns:
         str | BytesIO
     """
-    logging.info("Decoding %d base64 chunks", len(message_chunks))
+    logging.info("Decoding %d payload chunks", len(message_chunks))
 
     if not message_chunks:
         raise ValueError("message_chunks is empty")
 
-    # 1. Concatenate base64 chunks directly
+    # 1. Concatenate encoded chunks directly
     encoded_data = "".join(message_chunks)
 
     logging.info("Total encoded length: %d", len(encoded_data))
 
-    # 2. Decode base64 → raw GRIB bytes
-    grib_bytes = base64.b64decode(encoded_data)
+    # 2. Decode text (base64/base85/base88) → tagged payload
+    payload = decode_payload(encoded_data)
+
+    # 3. Decompress payload → raw GRIB bytes
+    grib_bytes = decompress_payload(payload)
 
     logging.info("Decoded GRIB size: %d bytes", len(grib_bytes))
 
@@ -110,35 +200,27 @@ def decode_saildocs_grib_file(message_chunks: list[str]):
 # ===================================================
 def unwrap_messages_to_payload_chunks(text: str) -> list[str]:
     """
-    Parse InReach messages of the form:
+    Parse InReach messages in the compact format (see framing):
+
+        #1<job><seq><total>[*<crc>]
+        <encoded payload>
+
+    or the legacy format:
 
         msg 1/31
-        <base64>
+        <encoded payload>
         end
 
+    Compact frames may arrive in any order; missing frames or a CRC
+    mismatch raise ValueError. FEC frames (#2) need any N of their
+    N + parity frames.
+
     Returns:
-        list[str]: base64 payloads in correct order
+        list[str]: encoded payloads in correct order
     """
-    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
-
-    payloads: list[str] = []
-    i = 0
-
-    while i < len(lines):
-        header = lines[i]
-        payload = lines[i + 1]
-        footer = lines[i + 2]
-
-        if not header.startswith("msg "):
-            raise ValueError(f"Expected 'msg x/y' at line {i}, got: {header}")
-
-        if footer != "end":
-            raise ValueError(f"Expected 'end' at line {i+2}, got: {footer}")
-
-        payloads.append(payload)
-        i += 3
+    payloads = frames_to_payload_chunks(parse_frames(text))
 
     logging.info("Parsed %d payload chunks", len(payloads))
-    logging.info("Total base64 length: %d", sum(len(p) for p in payloads))
+    logging.info("Total encoded length: %d", sum(len(p) for p in payloads))
 
-    return payloads
\ No newline at end of file
+    return payloads
@@ -0,0 +1,312 @@
+#FILE src/send_scheduler.py
+import asyncio
+import heapq
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterable, Callable
+
+import src.configs as configs
+
+
+@dataclass
+class SendSummary:
+    """
+    Result of sending the parts of one reply.
+    Part numbers are 1-based, like in "msg x/y".
+    """
+    total: int
+    delivered: list[int] = field(default_factory=list)
+    failed: list[int] = field(default_factory=list)
+    attempts: int = 0
+    # Not attempted before the deadline
+    pending: list[int] = field(default_factory=list)
+
+    @property
+    def all_delivered(self) -> bool:
+        return len(self.delivered) == self.total
+
+
+# =========================
+# TOKEN BUCKET
+# =========================
+class TokenBucket:
+    """
+    Token bucket with adaptive rate (AIMD).
+
+    The rate (messages/second) grows additively while Garmin accepts
+    messages and is halved on throttling (429/5xx). Retry-After pauses
+    the bucket until the given time.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float,
+        capacity: float = 1.0,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+        wait = max(0.0, self._blocked_until - now)
+        if self._tokens < 1:
+            wait = max(wait, (1 - self._tokens) / self.rate)
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+            # The wait covered the missing token and any Retry-After pause
+            self._tokens = max(self._tokens, 1.0)
+            self._last = time.monotonic()
+            self._blocked_until = 0.0
+
+        self._tokens -= 1
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: float | None = None):
+        self.rate = max(self.min_rate, self.rate / 2)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        logging.warning("InReach throttling, send rate lowered to %.3f msg/s", self.rate)
+
+
+# =========================
+# SEND SCHEDULER
+# =========================
+class SendScheduler:
+    """
+    Sends the parts of one reply through a TokenBucket.
+
+    Failed parts are re-queued with jittered exponential backoff, so the
+    remaining parts keep going while a failed part waits for its retry.
+    """
+
+    def __init__(
+        self,
+        interval: float | None = None,
+        max_attempts: int | None = None,
+        retry_backoff: float | None = None,
+    ):
+        interval = interval if interval is not None else configs.DELAY_BETWEEN_MESSAGES
+        self.bucket = TokenBucket(
+            rate=1 / interval if interval > 0 else 1 / configs.SEND_MIN_INTERVAL,
+            min_rate=1 / configs.SEND_MAX_INTERVAL,
+            max_rate=1 / configs.SEND_MIN_INTERVAL,
+            increase=configs.SEND_RATE_INCREASE,
+        )
+        self.max_attempts = max_attempts or configs.SEND_MAX_ATTEMPTS
+        self.retry_backoff = retry_backoff if retry_backoff is not None else configs.SEND_RETRY_BACKOFF
+
+    async def send(
+        self,
+        reply_url: str,
+        parts: list[str],
+        sender,
+        delivered: list[int] | None = None,
+        on_delivered: Callable[[int], None] | None = None,
+        deadline: float | None = None,
+    ) -> SendSummary:
+        """
+        Send parts, skipping the (1-based) part numbers in delivered.
+        on_delivered is called with each part number once Garmin accepted
+        it. Parts not sent before deadline (time.monotonic()) are
+        reported as pending.
+        """
+        total = len(parts)
+        summary = SendSummary(total=total, delivered=sorted(set(delivered or [])))
+        already_sent = set(summary.delivered)
+
+        # (ready_at, part index, attempt)
+        queue = [(0.0, index, 1) for index in range(total) if index + 1 not in already_sent]
+        heapq.heapify(queue)
+
+        while queue:
+            ready_at, index, attempt = queue[0]
+
+            if deadline is not None and max(ready_at, time.monotonic()) >= deadline:
+                summary.pending = sorted(i + 1 for _, i, _ in queue)
+                logging.info("Send deadline reached, %s parts pending", len(summary.pending))
+                break
+
+            heapq.heappop(queue)
+
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await self.bucket.acquire()
+            summary.attempts += 1
+
+            status, retry_after = await self._send_part(reply_url, parts[index], sender, index, total)
+
+            if status is not None and 200 <= status < 300:
+                summary.delivered.append(index + 1)
+                self.bucket.on_success()
+                if on_delivered is not None:
+                    on_delivered(index + 1)
+                continue
+
+            retryable = status is None or status == 429 or status >= 500
+            if status is not None and retryable:
+                self.bucket.on_throttle(retry_after)
+
+            if retryable and attempt < self.max_attempts:
+                backoff = retry_after or self.retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logging.info("Retrying message %s/%s in %.1fs", index + 1, total, backoff)
+                heapq.heappush(queue, (time.monotonic() + backoff, index, attempt + 1))
+            else:
+                summary.failed.append(index + 1)
+
+        summary.delivered.sort()
+        summary.failed.sort()
+        logging.info(
+            "InReach send summary: %s/%s delivered, failed=%s, attempts=%s",
+            len(summary.delivered),
+            total,
+            summary.failed,
+            summary.attempts,
+        )
+        return summary
+
+    async def send_stream(
+        self,
+        reply_url: str,
+        parts: AsyncIterable[str],
+        sender,
+        on_delivered: Callable[[int], None] | None = None,
+        deadline: float | None = None,
+    ) -> SendSummary:
+        """
+        Send parts in order while they are still being produced.
+
+        parts is consumed by a separate task, so a slow send does not
+        stall the producer. A failed part is retried (jittered backoff)
+        before the next one is sent. Parts produced after deadline are
+        reported as pending. An exception raised by parts is raised here
+        once the parts produced before it were sent.
+        """
+        summary = SendSummary(total=0)
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for part in parts:
+                    queue.put_nowait(part)
+            finally:
+                queue.put_nowait(done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (part := await queue.get()) is not done:
+                summary.total += 1
+                number = summary.total
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    summary.pending.append(number)
+                    continue
+
+                if await self._send_with_retries(reply_url, part, sender, number, summary):
+                    summary.delivered.append(number)
+                    if on_delivered is not None:
+                        on_delivered(number)
+                else:
+                    summary.failed.append(number)
+
+            await producer
+        finally:
+            producer.cancel()
+
+        logging.info(
+            "InReach send summary: %s/%s delivered, failed=%s, pending=%s, attempts=%s",
+            len(summary.delivered),
+            summary.total,
+            summary.failed,
+            summary.pending,
+            summary.attempts,
+        )
+        return summary
+
+    async def _send_with_retries(self, reply_url, part, sender, number, summary: SendSummary) -> bool:
+        for attempt in range(1, self.max_attempts + 1):
+            await self.bucket.acquire()
+            summary.attempts += 1
+
+            status, retry_after = await self._send_part(reply_url, part, sender, number - 1, "?")
+
+            if status is not None and 200 <= status < 300:
+                self.bucket.on_success()
+                return True
+
+            retryable = status is None or status == 429 or status >= 500
+            if status is not None and retryable:
+                self.bucket.on_throttle(retry_after)
+
+            if not retryable or attempt == self.max_attempts:
+                return False
+
+            backoff = retry_after or self.retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            logging.info("Retrying message %s/? in %.1fs", number, backoff)
+            await asyncio.sleep(backoff)
+
+        return False
+
+    async def _send_part(self, reply_url, part, sender, index, total) -> tuple[int | None, float | None]:
+        try:
+            logging.info("Sending InReach message %s/%s", index + 1, total)
+            response = await sender.send(reply_url, part)
+        except Exception as e:
+            logging.exception("Exception sending message %s/%s: %s", index + 1, total, e)
+            return None, None
+
+        if response.status_code == 200:
+            logging.info("Message %s/%s sent successfully", index + 1, total)
+        else:
+            logging.error(
+                "Failed to send message %s/%s: %s %s",
+                index + 1,
+                total,
+                response.status_code,
+                response.text,
+            )
+
+        headers = getattr(response, "headers", None) or {}
+        return response.status_code, _parse_retry_after(headers.get("retry-after"))
+
+
+# =========================
+# HELPERS
+# =========================
+def _parse_retry_after(value: str | None) -> float | None:
+    """
+    Retry-After as seconds or HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,110 @@
+#FILE src/sent_parts.py
+import json
+import logging
+import re
+import time
+
+import src.configs as configs
+from src.sqlite_cache import SqliteLRUCache
+
+logger = logging.getLogger(__name__)
+
+# "RESEND k3x9a 3,7" or "RESEND 3,5-7" (the last reply to this InReach)
+_RESEND = re.compile(r"^\s*(?:([0-9a-z]{5})\s+)?(\d+(?:\s*-\s*\d+)?(?:\s*,\s*\d+(?:\s*-\s*\d+)?)*)\s*$", re.I)
+
+# Highest part number accepted, far above any reply sent to an InReach
+MAX_PART_NUMBER = 256
+
+
+# =========================
+# RESEND REQUEST
+# =========================
+def parse_resend_request(request: str) -> tuple[str | None, list[int]]:
+    """
+    Split '[<job>] <parts>' into the job id (None for the last reply)
+    and the sorted, 1-based part numbers. Parts are listed with commas
+    and ranges: "3,7" or "3-5,9".
+    Raises ValueError for any other format, a reversed range or a part
+    number above MAX_PART_NUMBER.
+    """
+    match = _RESEND.match(request)
+    if match is None:
+        raise ValueError(f"Expected 'RESEND [job] 3,7', got: {request}")
+
+    job_id, listed = match.groups()
+    numbers: set[int] = set()
+    for item in listed.split(","):
+        first, _, last = item.partition("-")
+        first, last = int(first), int(last or first)
+        # Checked before expanding, a typo must not build a huge range
+        if last > MAX_PART_NUMBER:
+            raise ValueError(f"Part numbers go up to {MAX_PART_NUMBER}, got: {item.strip()}")
+        if first > last:
+            raise ValueError(f"Reversed part range: {item.strip()}")
+        numbers.update(range(first, last + 1))
+
+    if 0 in numbers:
+        raise ValueError("Part numbers start at 1")
+    if not numbers:
+        raise ValueError(f"No part numbers in: {request}")
+    return (job_id.lower() if job_id else None), sorted(numbers)
+
+
+# =========================
+# SENT PART STORE
+# =========================
+class SentPartStore:
+    """
+    Wrapped parts of the replies sent, by reply URL and job id, so lost
+    parts can be sent again. A job is only found for the reply URL it
+    was sent to. Entries expire after configs.SENT_PARTS_TTL seconds.
+    """
+
+    def __init__(self, store: SqliteLRUCache, ttl: float | None = None):
+        self.store = store
+        self.ttl = ttl if ttl is not None else configs.SENT_PARTS_TTL
+
+    def put(self, reply_url: str, job_id: str, parts: list[str], now: float | None = None):
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl
+        self.store.put(_key(reply_url, job_id), json.dumps(parts).encode("utf-8"), expires_at, now=now)
+        # Latest reply to this InReach, for RESEND without a job id
+        self.store.put(_key(reply_url, ""), job_id.encode("ascii"), expires_at, now=now)
+        logger.info("Stored %d sent parts of job %s", len(parts), job_id)
+
+    def get(self, reply_url: str, job_id: str | None = None, now: float | None = None) -> tuple[str, list[str]] | None:
+        """
+        (job id, parts) of the job, or of the latest reply to reply_url
+        if job_id is None. None if unknown or expired.
+        """
+        if job_id is None:
+            latest = self.store.get(_key(reply_url, ""), now=now)
+            if latest is None:
+                return None
+            job_id = latest[0].decode("ascii")
+
+        entry = self.store.get(_key(reply_url, job_id), now=now)
+        if entry is None:
+            return None
+        return job_id, json.loads(entry[0])
+
+
+def _key(reply_url: str, job_id: str) -> str:
+    return f"{reply_url}|{job_id}"
+
+
+_sent_part_store: SentPartStore | None = None
+
+
+def get_sent_part_store() -> SentPartStore:
+    """
+    Process wide SentPartStore at configs.SENT_PARTS_PATH.
+    """
+    global _sent_part_store
+    if _sent_part_store is None:
+        _sent_part_store = SentPartStore(SqliteLRUCache(
+            configs.SENT_PARTS_PATH(),
+            max_entries=configs.SENT_PARTS_MAX_ENTRIES,
+            table="sent_parts",
+        ))
+    return _sent_part_store
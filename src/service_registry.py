@@ -0,0 +1,112 @@
+#FILE src/service_registry.py
+import asyncio
+import atexit
+import logging
+
+from src import openai_functions as openai_func
+from src.graph_mail import GraphMailService
+from src.inreach_sender import InReachSender
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Process wide services, kept alive between timer ticks.
+
+    The Functions worker process is reused between invocations, so the
+    Graph credential (and its token cache), the Graph and InReach HTTP
+    pools and the OpenAI client are created once instead of per tick.
+    Steady state ticks make no token-endpoint calls: the token is only
+    renewed when it is about to expire (see GraphMailService.refresh_token).
+
+    HTTP pools are bound to the event loop they were created on. When a
+    tick runs on another loop (e.g. asyncio.run per tick), those clients
+    are dropped and recreated; the credential and token are kept.
+    """
+
+    def __init__(self, mail: GraphMailService | None = None, inreach_sender: InReachSender | None = None):
+        self._mail = mail
+        self._inreach_sender = inreach_sender
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def mail(self) -> GraphMailService:
+        if self._mail is None:
+            self._mail = GraphMailService()
+        return self._mail
+
+    @property
+    def inreach_sender(self) -> InReachSender:
+        if self._inreach_sender is None:
+            self._inreach_sender = InReachSender()
+        return self._inreach_sender
+
+    async def prepare(self) -> "ServiceRegistry":
+        """
+        Called at the start of every tick: binds the services to the
+        running loop and renews the Graph token ahead of expiry.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self._loop is not loop:
+            if self._loop is not None:
+                logger.info("Event loop changed, recreating HTTP clients")
+                self.mail.drop_connections()
+                self.inreach_sender.drop_connections()
+                openai_func.drop_client()
+            self._loop = loop
+
+        await self.mail.refresh_token()
+        return self
+
+    async def aclose(self):
+        """
+        Close the HTTP pools, the credential and the OpenAI client.
+        """
+        if self._inreach_sender is not None:
+            await self._inreach_sender.aclose()
+        if self._mail is not None:
+            await self._mail.aclose()
+        await openai_func.close_client()
+
+        self._mail = None
+        self._inreach_sender = None
+        self._loop = None
+
+
+_registry: ServiceRegistry | None = None
+
+
+async def get_services() -> ServiceRegistry:
+    """
+    Process wide ServiceRegistry, prepared for the running loop.
+    """
+    global _registry
+    if _registry is None:
+        _registry = ServiceRegistry()
+    return await _registry.prepare()
+
+
+async def close_services():
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
+
+
+@atexit.register
+def _shutdown():
+    """
+    Close the services when the worker process exits, if their loop is
+    still usable. Otherwise the OS releases the sockets.
+    """
+    loop = _registry._loop if _registry is not None else None
+
+    if loop is None or loop.is_closed() or loop.is_running():
+        return
+
+    try:
+        loop.run_until_complete(close_services())
+    except Exception:
+        logger.exception("Failed to close services")
@@ -0,0 +1,35 @@
+#FILE src/single_flight.py
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key.
+
+    The first caller starts the work, callers arriving while it runs
+    wait for the same result (or exception). Once finished, the next
+    call for the key starts new work. A cancelled waiter does not
+    cancel the shared work.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable]):
+        task = self._flights.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(work())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            logger.info("Joining in-flight request: %s", key)
+
+        return await asyncio.shield(task)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
@@ -0,0 +1,80 @@
+#FILE src/sqlite_cache.py
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteLRUCache:
+    """
+    Small key/value cache in a local SQLite file.
+
+    Every entry has an absolute expiry time (epoch seconds). When more
+    than max_entries are stored, the least recently used entries are
+    evicted. path=":memory:" keeps the cache in the process only.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100, table: str = "cache"):
+        self.path = path
+        self.max_entries = max_entries
+        self.table = table
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " meta TEXT,"
+            " expires_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str, now: float | None = None) -> tuple[bytes, str | None] | None:
+        """
+        Returns (value, meta) or None if missing or expired.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT value, meta, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, meta, expires_at = row
+            if expires_at <= now:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+
+            self._db.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return value, meta
+
+    def put(self, key: str, value: bytes, expires_at: float, meta: str | None = None, now: float | None = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, meta, expires_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, bytes(value), meta, expires_at, now),
+            )
+            # Expired entries first, then least recently used beyond max_entries
+            self._db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key NOT IN"
+                f" (SELECT key FROM {self.table} ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        self._db.close()
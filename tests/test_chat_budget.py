@@ -0,0 +1,64 @@
+import pytest
+
+from src import chat_budget
+from src import openai_functions as openai_func
+from src.chat_budget import CHARS, MESSAGES, WORDS, ChatBudget
+
+
+def test_parse_budget_units():
+    assert chat_budget.parse_chat_request("50: wind?") == (ChatBudget(WORDS, 50), " wind?")
+    assert chat_budget.parse_chat_request("2m: wind?") == (ChatBudget(MESSAGES, 2), " wind?")
+    assert chat_budget.parse_chat_request(" 200C : wind?") == (ChatBudget(CHARS, 200), " wind?")
+    assert chat_budget.parse_chat_request("What is the weather like?") is None
+
+    assert ChatBudget(MESSAGES, 2).max_chars == 240
+    assert ChatBudget(MESSAGES, 100).max_chars == 600
+    assert chat_budget.is_size_budget("1m: x") and not chat_budget.is_size_budget("10: x")
+
+
+def test_compact_text_is_deterministic():
+    text = (
+        "**Forecast:** North-east winds of 15 knots, gusting 25 knots tomorrow,\n"
+        "- visibility  good; pressure 1012 hectopascals and rising ."
+    )
+
+    compacted = chat_budget.compact_text(text)
+
+    assert compacted == "fcst: NE winds of 15kt, gst 25kt tmrw, vis good; pres 1012hPa and rising."
+    assert chat_budget.compact_text(compacted) == compacted
+
+
+def test_compass_points_are_only_abbreviated_as_directions():
+    text = "The Middle East and West Africa, with winds from the east, 40 nautical miles south of Dakar: west 20 knots."
+
+    assert chat_budget.compact_text(text) == (
+        "The Middle East and West Africa, with winds from the east, 40nm S of Dakar: W 20kt."
+    )
+
+
+def test_fit_to_budget_cuts_at_sentence_or_word():
+    assert chat_budget.fit_to_budget("Short.", 10) == "Short."
+    assert chat_budget.fit_to_budget("Wind NE 15kt. Seas 2m from N.", 20) == "Wind NE 15kt."
+    assert chat_budget.fit_to_budget("Wind NE 15kt veering E later", 16) == "Wind NE 15kt.."
+
+    for max_chars in range(1, 5):
+        assert len(chat_budget.fit_to_budget("Wind NE 15kt veering E later", max_chars)) <= max_chars
+
+
+@pytest.mark.asyncio
+async def test_overflowing_answer_is_reasked_until_it_fits(monkeypatch):
+    answers = ["Wind " * 60, "Wind NE 15 knots, seas 2 meters."]
+    conversations: list[list[dict]] = []
+
+    async def fake_stream_chat_completion(messages, deadline=None):
+        conversations.append(list(messages))
+        yield answers.pop(0)
+
+    monkeypatch.setattr(openai_func, "stream_chat_completion", fake_stream_chat_completion)
+
+    answer = await openai_func.request_budgeted_response("1m: wind tomorrow?")
+
+    assert answer == "Wind NE 15kt, seas 2m."
+    assert len(conversations) == 2
+    assert "at most 102 characters" in conversations[0][-1]["content"]
+    assert conversations[1][-1]["content"].startswith("That is 299 characters.")
@@ -0,0 +1,75 @@
+import pytest
+
+from src import process
+from src.chat_cache import ChatCache, cache_key
+from src.InReachRequest import InReachRequest
+from src.job_store import MemoryJobStore
+from src.sqlite_cache import SqliteLRUCache
+
+
+def test_cache_key_ignores_case_punctuation_and_whitespace():
+    assert cache_key("50: What is a knot?") == "words=50|what is a knot"
+    assert cache_key("50:what  is a KNOT") == cache_key("50: What is a knot?")
+    assert cache_key("2m: what is a knot") != cache_key("50: what is a knot")
+    assert cache_key("What is a knot?") is None
+
+
+def test_cache_key_keeps_signs_decimals_and_units():
+    assert cache_key("50: convert -10C to F") == "words=50|convert -10c to f"
+    assert cache_key("50: convert -10C to F") != cache_key("50: convert 10C to F")
+    assert cache_key("50: is 1.5 kt slow?") != cache_key("50: is 1 5 kt slow?")
+    assert cache_key("50: wind 10-15 m/s, in kt?") == "words=50|wind 10-15 m/s in kt"
+    assert cache_key("50: wind 10-15 m/s, in kt?") != cache_key("50: wind 10 15 m s in kt")
+
+
+def test_entries_expire_after_ttl_and_metrics_are_counted(tmp_path):
+    path = str(tmp_path / "chat.sqlite")
+    cache = ChatCache(SqliteLRUCache(path, table="chat_cache"), ttl=3600)
+
+    assert cache.get("50: what is a knot?", now=1000) is None
+    cache.put("50: What is a knot?", "1 nm per hour.", now=1000)
+
+    # Survives a restart
+    reopened = ChatCache(SqliteLRUCache(path, table="chat_cache"), ttl=3600)
+    assert reopened.get("50: WHAT IS A KNOT", now=2000) == "1 nm per hour."
+    assert reopened.get("50: what is a knot?", now=1000 + 3600) is None
+
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert (reopened.hits, reopened.misses) == (1, 1)
+    assert reopened.hit_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_answered_without_openai(monkeypatch):
+    cache = ChatCache(SqliteLRUCache(":memory:"))
+    prompts: list[str] = []
+    sent: list[str] = []
+
+    async def fake_stream_openai_response(prompt, deadline=None):
+        prompts.append(prompt)
+        yield "Keep the vessel to starboard."
+
+    class FakeSender:
+        async def send(self, url, message):
+            sent.append(message)
+            return type("Response", (), {"status_code": 200, "text": "OK"})()
+
+    def requests(text):
+        async def fake_retrieve_new_inreach_requests(mail):
+            return [InReachRequest("chat", text, "https://garmin.com/sendmessage?extId=A")]
+        return fake_retrieve_new_inreach_requests
+
+    monkeypatch.setattr("src.process.chat_cache.get_chat_cache", lambda: cache)
+    monkeypatch.setattr("src.process.openai_func.stream_openai_response", fake_stream_openai_response)
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests("20: Which side to pass?"))
+    assert await process.run(mail=object(), inreach_sender=FakeSender(), job_store=MemoryJobStore())
+
+    store = MemoryJobStore()
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests("20: which side to pass"))
+    assert await process.run(mail=object(), inreach_sender=FakeSender(), job_store=store)
+
+    assert len(prompts) == 1
+    assert sent == ["msg 1/1:\nKeep the vessel to starboard.\nend"] * 2
+    assert store.active() == []
+    assert (cache.hits, cache.misses) == (1, 1)
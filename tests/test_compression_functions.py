@@ -0,0 +1,41 @@
+import pytest
+
+from pathlib import Path
+
+from src.compression_functions import (
+    CODEC_NAMES,
+    compress_payload,
+    decompress_payload,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def grib_bytes() -> bytes:
+    return (FIXTURES / "saildocs_sample.grb").read_bytes()
+
+
+@pytest.mark.parametrize("codec", list(CODEC_NAMES))
+def test_codec_roundtrip(grib_bytes, codec):
+    payload = compress_payload(grib_bytes, codec)
+
+    assert payload[0] == CODEC_NAMES[codec]
+    assert decompress_payload(payload) == grib_bytes
+
+
+def test_best_codec_keeps_smallest_payload(grib_bytes):
+    best = compress_payload(grib_bytes, "best")
+
+    assert len(best) == min(len(compress_payload(grib_bytes, c)) for c in CODEC_NAMES)
+    assert len(best) < len(grib_bytes)
+    assert decompress_payload(best) == grib_bytes
+
+
+def test_untagged_legacy_payload_decodes_unchanged(grib_bytes):
+    assert decompress_payload(grib_bytes) == grib_bytes
+
+
+def test_unknown_codec_tag_raises():
+    with pytest.raises(ValueError):
+        decompress_payload(b"\x7fdata")
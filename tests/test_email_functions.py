@@ -0,0 +1,57 @@
+import pytest
+
+from types import SimpleNamespace
+
+from src.email_functions import retrieve_new_inreach_requests
+from src.graph_query import BODY_PREVIEW_LENGTH
+
+REPLY = "Reply to Garmin: https://explore.garmin.com/textmessage/txtmsg?extId=TEST-GUID"
+
+
+class FakeMail:
+    def __init__(self, messages, full_bodies):
+        self.messages = messages
+        self.full_bodies = full_bodies
+        self.fetched: list[str] = []
+        self.marked_read: list[str] = []
+
+    async def search_messages(self, **kwargs):
+        return SimpleNamespace(value=self.messages)
+
+    async def get_message_body(self, user_id, message_id):
+        self.fetched.append(message_id)
+        return {"contentType": "text", "content": self.full_bodies[message_id]}
+
+    async def mark_as_read(self, user_id, message_id):
+        self.marked_read.append(message_id)
+
+
+def make_mail(message_id: str, preview: str):
+    return SimpleNamespace(id=message_id, body=None, body_preview=preview)
+
+
+@pytest.mark.asyncio
+async def test_short_preview_is_used_without_fetching_the_body():
+    mail = FakeMail([make_mail("short", f"GRIB 10N,20N,30W,40W|1,1|24|WIND\n{REPLY}")], {})
+
+    requests = await retrieve_new_inreach_requests(mail)
+
+    assert mail.fetched == []
+    assert mail.marked_read == ["short"]
+    assert requests[0].type == "weather"
+    assert requests[0].payload_text == "10n,20n,30w,40w|1,1|24|wind"
+
+
+@pytest.mark.asyncio
+async def test_truncated_preview_fetches_the_full_body():
+    full_body = "CHAT " + "how is the weather " * 20 + REPLY
+    mail = FakeMail(
+        [make_mail("long", full_body[:BODY_PREVIEW_LENGTH])],
+        {"long": full_body},
+    )
+
+    requests = await retrieve_new_inreach_requests(mail)
+
+    assert mail.fetched == ["long"]
+    assert requests[0].type == "chat"
+    assert requests[0].reply_url.endswith("extid=test-guid")
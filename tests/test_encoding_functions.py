@@ -0,0 +1,50 @@
+import base64
+import random
+import pytest
+
+from io import BytesIO
+from pathlib import Path
+
+from src import inreach_functions as inreach_func
+from src.encoding_functions import ALPHABETS, ESCAPE, decode_payload, encode_payload
+from src.saildoc_functions import (
+    decode_saildocs_grib_file,
+    encode_saildocs_grib_file,
+    unwrap_messages_to_payload_chunks,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.mark.parametrize("encoding", list(ALPHABETS))
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 4, 5, 57, 58, 59, 117, 1000])
+def test_payload_roundtrip(encoding, length):
+    data = random.Random(length).randbytes(length)
+
+    assert decode_payload(encode_payload(data, encoding)) == data
+
+
+@pytest.mark.parametrize("encoding", list(ALPHABETS))
+def test_encoded_text_avoids_blocked_sequences(encoding):
+    alphabet = ALPHABETS[encoding]
+    text = encode_payload(random.Random(1).randbytes(5000), encoding)
+
+    assert not any(seq in text for seq in alphabet.blocklist)
+    assert set(text) <= set(alphabet.chars + ESCAPE + "=")
+
+
+def test_legacy_base64_payload_without_header_decodes():
+    data = b"GRIB-DATA" * 10
+
+    assert decode_payload(base64.b64encode(data).decode("ascii")) == data
+
+
+@pytest.mark.parametrize("encoding", ["base85", "base88"])
+def test_grib_roundtrip_through_wrapped_messages(encoding):
+    original_bytes = (FIXTURES / "saildocs_sample.grb").read_bytes()
+
+    encoded = encode_saildocs_grib_file(BytesIO(original_bytes), encoding=encoding)
+    wrapped = inreach_func.wrap_messages(inreach_func.split_message(encoded))
+    payload_parts = unwrap_messages_to_payload_chunks("\n".join(wrapped))
+
+    assert decode_saildocs_grib_file(payload_parts) == original_bytes
@@ -0,0 +1,67 @@
+import itertools
+import random
+from pathlib import Path
+
+import pytest
+
+from src import fec
+from src import framing
+from src.saildoc_functions import (
+    decode_saildocs_grib_file,
+    encode_saildocs_grib_file,
+    parse_grib_request,
+    unwrap_messages_to_payload_chunks,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_any_data_count_blocks_rebuild_the_data():
+    rng = random.Random(3)
+    blocks = [bytes(rng.randrange(256) for _ in range(40)) for _ in range(4)]
+    received_all = dict(enumerate(blocks + fec.encode(blocks, 3)))
+
+    for indexes in itertools.combinations(range(7), 4):
+        assert fec.decode({i: received_all[i] for i in indexes}, 4) == blocks
+
+    with pytest.raises(ValueError, match="Need 4 blocks"):
+        fec.decode({i: received_all[i] for i in (0, 5, 6)}, 4)
+
+
+@pytest.mark.parametrize("encoding", ["base64", "base85", "base88"])
+def test_grib_rebuilds_from_any_subset_of_fec_frames(encoding):
+    grib = (FIXTURES / "saildocs_sample.grb").read_bytes()
+    payload = encode_saildocs_grib_file(str(FIXTURES / "saildocs_sample.grb"), encoding=encoding)
+
+    frames = framing.frame_fec_messages(payload, "k3x9a", parity=2, message_length=160)
+    parity_frames = frames[-2:]
+
+    assert all(len(f) <= 160 for f in frames)
+    assert frames[-1].startswith("#2k3x9a2")
+
+    # Lose two data frames, receive the rest out of order
+    received = frames[2:-2][::-1] + parity_frames + frames[1:2]
+    chunks = unwrap_messages_to_payload_chunks("\n".join(received))
+    assert decode_saildocs_grib_file(chunks) == grib
+
+    with pytest.raises(ValueError, match=r"Missing frames of job k3x9a: \[1, 2, 3\]"):
+        unwrap_messages_to_payload_chunks("\n".join(frames[3:]))
+
+
+def test_fec_option_is_not_sent_to_saildocs(monkeypatch):
+    monkeypatch.setattr("src.configs.GRIB_FEC_MAX_PARITY", 4)
+
+    request = parse_grib_request("gfs:40N,50N,10W,0W|1,1|0,24|WIND fec=2")
+    assert (request.command, request.parity) == ("gfs:40N,50N,10W,0W|1,1|0,24|WIND", 2)
+    assert parse_grib_request("FEC=9 gfs:40N,50N,10W,0W").parity == 4
+    assert parse_grib_request("gfs:40N,50N,10W,0W").parity == 0
+
+
+def test_frames_stay_legacy_unless_compact_is_asked_for():
+    assert parse_grib_request("gfs:40N,50N,10W,0W|1,1|24|WIND").frame == "legacy"
+
+    request = parse_grib_request("gfs:40N,50N,10W,0W|1,1|24|WIND frame=compact")
+    assert (request.command, request.frame) == ("gfs:40N,50N,10W,0W|1,1|24|WIND", "compact")
+
+    assert parse_grib_request("gfs:40N,50N,10W,0W fec=2").frame == "compact"
+    assert parse_grib_request("gfs:40N,50N,10W,0W fec=2 frame=legacy").frame == "legacy"
@@ -0,0 +1,82 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src import process
+from src.email_functions import _decode_inreach_request
+from src.forecast import ForecastRequest, forecast_text, parse_forecast_request, saildocs_command
+from src.grib_cache import GribCache
+from src.grib_functions import field_values, parse_grib
+from src.InReachRequest import InReachRequest
+from src.payload_buffer import PayloadBuffer
+from src.sqlite_cache import SqliteLRUCache
+
+# GFS 2026-01-18 06Z, 22N..34N 46W..30W at 4 degrees, 0..96h every 12h
+FIXTURE = Path(__file__).parent / "fixtures" / "saildocs_sample.grb"
+
+
+def test_request_is_decoded_into_a_small_saildocs_grid():
+    request = _decode_inreach_request("FCST 24.5n,41.2w;30N 34W|0,24 reply to garmin: https://garmin.com/a")
+    assert request.type == "forecast"
+
+    parsed = parse_forecast_request(request.payload_text)
+    assert parsed == ForecastRequest("gfs", ((24.5, -41.2), (30.0, -34.0)), "0,24")
+    assert saildocs_command(parsed) == "gfs:24.5N,30N,41.5W,34W|0.5,0.5|0,24|wind,press"
+
+    across_dateline = parse_forecast_request("10n,179.5e;10n,179.5w|0")
+    assert saildocs_command(across_dateline) == "gfs:10N,10.5N,179.5E,179.5W|0.5,0.5|0|wind,press"
+
+    assert parse_forecast_request("ecmwf: 10s,170e").model == "ecmwf"
+    with pytest.raises(ValueError):
+        parse_forecast_request("somewhere nice")
+
+
+def test_text_has_wind_and_pressure_of_the_nearest_grid_point():
+    grib = FIXTURE.read_bytes()
+    text = forecast_text(grib, ForecastRequest("gfs", ((26.4, -42.3), (60.0, 0.0)), "0"))
+    lines = text.split("\n")
+
+    # (26N, 42W) is grid point 6; u = -10.9, v = -1.9 m/s at +0h
+    pressure, u, v = (field_values(m)[6] for m in parse_grib(grib) if m.forecast_hour == 0)
+    assert (round(u, 1), round(v, 1), round(pressure / 100)) == (-10.9, -1.9, 1025)
+
+    assert lines[:3] == ["gfs 18/06Z", "26.4N 42.3W", "00 080/21 1025"]
+    assert len(lines) == 1 + 2 * (1 + 9)
+    assert lines[-1] == "96 - -"
+    assert len(text) < 300
+
+
+@pytest.mark.asyncio
+async def test_forecast_is_sent_as_text_instead_of_the_grib(monkeypatch):
+    saildocs_queries: list[str] = []
+    sent: list[str] = []
+
+    async def fake_retrieve_new_inreach_requests(mail):
+        return [InReachRequest("forecast", "26n,42w|0,12", "https://garmin.com/a")]
+
+    async def fake_request_weather_report(mail, command):
+        saildocs_queries.append(command)
+
+    async def fake_process_new_saildocs_response(mail, command, timeout=None):
+        return PayloadBuffer(FIXTURE.read_bytes(), name="gfs.grb")
+
+    class FakeSender:
+        async def send(self, url, message):
+            sent.append(message)
+            return type("Response", (), {"status_code": 200, "text": "OK"})()
+
+    async def fake_sleep(_):
+        return None
+
+    monkeypatch.setattr("src.process.grib_cache.get_grib_cache", lambda: GribCache(SqliteLRUCache(":memory:")))
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", fake_retrieve_new_inreach_requests)
+    monkeypatch.setattr("src.process.request_weather_report", fake_request_weather_report)
+    monkeypatch.setattr("src.process.process_new_saildocs_response", fake_process_new_saildocs_response)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    assert await process.run(mail=object(), inreach_sender=FakeSender())
+
+    assert saildocs_queries == ["gfs:26N,26.5N,42W,41.5W|0.5,0.5|0,12|wind,press"]
+    assert len(sent) == 2
+    assert sent[0].startswith("msg 1/2:\ngfs 18/06Z\n26.0N 42.0W\n00 080/21 1025\n12 080/22 1025\n")
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from src import framing
+from src import inreach_functions as inreach_func
+from src.saildoc_functions import unwrap_messages_to_payload_chunks
+
+PAYLOAD = "".join(random.Random(7).choice("ABCdef0123+/") for _ in range(2000))
+
+
+@pytest.mark.parametrize("crc", [False, True])
+def test_compact_frames_fill_each_message_and_roundtrip(crc):
+    frames = framing.frame_messages(PAYLOAD, "k3x9a", message_length=160, crc=crc)
+
+    assert all(len(f) == 160 for f in frames[:-1])
+    # 2000 chars in 153 (145 with CRC) char chunks: 14 frames
+    assert frames[0].startswith("#1k3x9a1e*" if crc else "#1k3x9a1e\n")
+    assert unwrap_messages_to_payload_chunks("\n".join(reversed(frames))) == \
+        [f.split("\n", 1)[1] for f in frames]
+    assert "".join(unwrap_messages_to_payload_chunks("\n".join(frames))) == PAYLOAD
+
+
+def test_seq_and_total_grow_to_two_digits():
+    frames = framing.frame_messages(PAYLOAD * 3, "00000", message_length=160)
+
+    assert len(frames) > 35
+    assert frames[0].split("\n")[0] == "#100000" + "01" + framing._to_base36(len(frames), 2)
+    assert "".join(unwrap_messages_to_payload_chunks("\n\n".join(frames))) == PAYLOAD * 3
+
+
+def test_legacy_messages_are_still_parsed():
+    legacy = inreach_func.wrap_messages(inreach_func.split_message(PAYLOAD))
+
+    assert "".join(unwrap_messages_to_payload_chunks("\n".join(legacy))) == PAYLOAD
+
+
+def test_corrupt_or_missing_frames_are_rejected():
+    frames = framing.frame_messages(PAYLOAD, "k3x9a", crc=True)
+
+    header, data = frames[1].split("\n")
+    with pytest.raises(ValueError, match="CRC mismatch"):
+        unwrap_messages_to_payload_chunks("\n".join([frames[0], f"{header}\n{data[:-1]}X"]))
+
+    with pytest.raises(ValueError, match=r"Missing frames of job k3x9a: \[2\]"):
+        unwrap_messages_to_payload_chunks("\n".join(frames[:1] + frames[2:]))
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+
+from src.graph_batch import GraphBatcher, GraphBatchError
+
+
+class FakeTransport:
+    def __init__(self, fail_ids=(), error: Exception | None = None):
+        self.calls: list[list[dict]] = []
+        self.fail_ids = set(fail_ids)
+        self.error = error
+
+    async def __call__(self, requests):
+        self.calls.append(requests)
+        if self.error:
+            raise self.error
+        return [
+            {"id": r["id"], "status": 404, "body": {"error": {"message": "not found"}}}
+            if r["url"] in self.fail_ids
+            else {"id": r["id"], "status": 200, "body": {"url": r["url"]}}
+            for r in reversed(requests)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_batches_of_twenty():
+    transport = FakeTransport()
+    batcher = GraphBatcher(transport, window=0.01)
+
+    urls = [f"/users/u/messages/{i}" for i in range(45)]
+    results = await asyncio.gather(*(batcher.submit("GET", url) for url in urls))
+
+    assert [r["url"] for r in results] == urls
+    assert sorted(len(call) for call in transport.calls) == [5, 20, 20]
+
+
+@pytest.mark.asyncio
+async def test_each_caller_gets_its_own_error():
+    transport = FakeTransport(fail_ids={"/bad"})
+    batcher = GraphBatcher(transport, window=0.01)
+
+    good, bad = await asyncio.gather(
+        batcher.submit("PATCH", "/good", body={"isRead": True}),
+        batcher.submit("GET", "/bad"),
+        return_exceptions=True,
+    )
+
+    assert good == {"url": "/good"}
+    assert isinstance(bad, GraphBatchError) and bad.status == 404
+    assert len(transport.calls) == 1
+    patch = transport.calls[0][0]
+    assert patch["body"] == {"isRead": True}
+    assert patch["headers"]["Content-Type"] == "application/json"
+
+
+@pytest.mark.asyncio
+async def test_transport_failure_is_raised_to_every_caller():
+    batcher = GraphBatcher(FakeTransport(error=RuntimeError("offline")), window=0.01)
+
+    results = await asyncio.gather(
+        batcher.submit("GET", "/a"),
+        batcher.submit("GET", "/b"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from src.graph_query import DEFAULT_MESSAGE_SELECT, build_message_query, to_query_string_params
+
+
+def test_orderby_field_is_first_filter_clause():
+    query = build_message_query(sender_email="Service@Mail.com", unread_only=True, top=25)
+
+    assert query["$orderby"] == ["receivedDateTime desc"]
+    assert query["$filter"] == (
+        "receivedDateTime ge 1900-01-01T00:00:00Z"
+        " and from/emailAddress/address eq 'service@mail.com'"
+        " and isRead eq false"
+    )
+    assert query["$select"] == DEFAULT_MESSAGE_SELECT
+    assert query["$top"] == 25
+
+
+def test_received_after_and_subject_are_pushed_to_server():
+    query = build_message_query(
+        received_after=datetime(2026, 1, 20, 22, 30, tzinfo=timezone.utc),
+        subject_contains="O'Brien",
+        select=["id", "body"],
+    )
+
+    assert query["$filter"] == "receivedDateTime ge 2026-01-20T22:30:00Z and contains(subject,'O''Brien')"
+    assert to_query_string_params(query)["$select"] == "id,body"
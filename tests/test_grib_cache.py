@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src import process
+from src.grib_cache import GribCache, canonical_command, next_cycle_available
+from src.InReachRequest import InReachRequest
+from src.payload_buffer import PayloadBuffer
+from src.saildoc_functions import unwrap_messages_to_payload_chunks
+from src.sqlite_cache import SqliteLRUCache
+
+FIXTURE = Path(__file__).parent / "fixtures" / "saildocs_small.grb"
+
+
+def epoch(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_equivalent_commands_share_one_key():
+    assert canonical_command("GFS:50N, 40N,020W,010W|0.50,0.5|24,0|WIND,PRMSL") == \
+        canonical_command("40n,50n,20w,10w | 0.5,0.5 | 0,24 | prmsl,wind")
+
+
+def test_different_areas_do_not_share_a_key():
+    assert canonical_command("40N,50N,20W,10W|1,1|24|WIND") != \
+        canonical_command("40N,50N,10W,20W|1,1|24|WIND")
+
+
+def test_entries_expire_when_next_cycle_is_available():
+    # GFS 06z is available at 10:00 UTC
+    assert next_cycle_available("gfs", epoch(2024, 6, 1, 7, 30)) == epoch(2024, 6, 1, 10)
+    assert next_cycle_available("gfs", epoch(2024, 6, 1, 10)) == epoch(2024, 6, 1, 16)
+    # ECMWF 12z is available at 20:00 UTC
+    assert next_cycle_available("ecmwf", epoch(2024, 6, 1, 9)) == epoch(2024, 6, 1, 20)
+
+
+def test_cache_hit_until_next_cycle():
+    cache = GribCache(SqliteLRUCache(":memory:"))
+    grib = FIXTURE.read_bytes()
+
+    cache.put("gfs:40N,50N,20W,10W|1,1|24|WIND", PayloadBuffer(grib, name="gfs.grb"), now=epoch(2024, 6, 1, 7))
+
+    hit = cache.get("40n,50n,20w,10w|1,1|24|wind", now=epoch(2024, 6, 1, 9, 59))
+    assert bytes(hit.raw()) == grib
+    assert hit.name == "gfs.grb"
+    assert cache.get("40n,50n,20w,10w|1,1|24|wind", now=epoch(2024, 6, 1, 10)) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = SqliteLRUCache(":memory:", max_entries=2)
+    store.put("a", b"1", expires_at=100, now=1)
+    store.put("b", b"2", expires_at=100, now=2)
+    store.get("a", now=3)
+    store.put("c", b"3", expires_at=100, now=4)
+
+    assert store.get("b", now=5) is None
+    assert store.get("a", now=5) == (b"1", None)
+    assert len(store) == 2
+
+
+@pytest.mark.asyncio
+async def test_repeated_weather_request_is_served_from_cache(monkeypatch):
+    cache = GribCache(SqliteLRUCache(":memory:"))
+    saildocs_queries: list[str] = []
+    sent: list[str] = []
+
+    async def fake_retrieve_new_inreach_requests(mail):
+        return [InReachRequest("weather", "40N,50N,20W,10W|1,1|24|WIND", "https://garmin.com/a")]
+
+    async def fake_request_weather_report(mail, command):
+        saildocs_queries.append(command)
+
+    async def fake_process_new_saildocs_response(mail, command, timeout=None):
+        return PayloadBuffer(FIXTURE.read_bytes(), name="gfs.grb")
+
+    class FakeSender:
+        async def send(self, url, message):
+            sent.append(message)
+            return type("Response", (), {"status_code": 200, "text": "OK"})()
+
+    async def fake_sleep(_):
+        return None
+
+    monkeypatch.setattr("src.process.grib_cache.get_grib_cache", lambda: cache)
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", fake_retrieve_new_inreach_requests)
+    monkeypatch.setattr("src.process.request_weather_report", fake_request_weather_report)
+    monkeypatch.setattr("src.process.process_new_saildocs_response", fake_process_new_saildocs_response)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    assert await process.run(mail=object(), inreach_sender=FakeSender())
+    first_reply = list(sent)
+    sent.clear()
+    assert await process.run(mail=object(), inreach_sender=FakeSender())
+
+    assert saildocs_queries == ["40N,50N,20W,10W|1,1|24|WIND"]
+    # Same payload, framed for the new job
+    assert unwrap_messages_to_payload_chunks("\n".join(sent)) == unwrap_messages_to_payload_chunks("\n".join(first_reply))
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from pathlib import Path
+
+from src import grib_functions as grib_func
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PRECISION = {2: 100.0, 33: 0.5, 34: 0.5}
+
+
+@pytest.fixture
+def grib_bytes() -> bytes:
+    return (FIXTURES / "saildocs_sample.grb").read_bytes()
+
+
+def test_parse_saildocs_grib(grib_bytes):
+    messages = grib_func.parse_grib(grib_bytes)
+
+    assert len(messages) == 27
+    assert {m.parameter for m in messages} == {2, 33, 34}
+    assert b"".join(m.to_bytes() for m in messages) == grib_bytes
+
+
+def test_unpack_values_pressure_in_pascal(grib_bytes):
+    pressure = grib_func.unpack_values(grib_func.parse_grib(grib_bytes)[0])
+
+    assert pressure.shape == (20,)
+    assert 95000 < pressure.min() < pressure.max() < 106000
+
+
+@pytest.mark.parametrize("grid_type", [0, 1, 3, 5])
+def test_point_count_of_ni_nj_grids(grib_bytes, grid_type):
+    message = grib_func.parse_grib(grib_bytes)[0]
+    gds = message.gds[:5] + bytes([grid_type]) + message.gds[6:]
+    # Padding bits would count as extra points without Ni x Nj
+    bds = message.bds + bytes(8)
+
+    assert grib_func.GribMessage(message.pds, gds, None, bds).point_count() == 20
+
+
+def test_repack_keeps_values_within_precision_and_shrinks(grib_bytes):
+    repacked = grib_func.repack_grib(grib_bytes, PRECISION)
+
+    assert len(repacked) < len(grib_bytes)
+
+    for original, packed in zip(grib_func.parse_grib(grib_bytes), grib_func.parse_grib(repacked)):
+        assert packed.bits_per_value <= original.bits_per_value
+        error = np.abs(grib_func.unpack_values(original) - grib_func.unpack_values(packed))
+        assert error.max() <= PRECISION[original.parameter] / 2 + 1e-6
+
+
+def test_repack_without_precision_keeps_fields_unchanged(grib_bytes):
+    assert grib_func.repack_grib(grib_bytes, {}) == grib_bytes
+
+
+def test_repack_drops_junk_and_duplicate_fields(grib_bytes):
+    first = grib_func.parse_grib(grib_bytes)[0].to_bytes()
+    data = b"--mail-junk--" + first + b"\r\n" + first + grib_bytes
+
+    assert grib_func.repack_grib(data, {}) == grib_bytes
+
+
+def test_parse_skips_grib_text_in_junk(grib_bytes):
+    junk = b"Subject: GRIB request\r\nGRIB gfs:40N,50N,10W,0W\r\n"
+
+    assert grib_func.parse_grib(junk + grib_bytes + junk) == grib_func.parse_grib(grib_bytes)
+
+    with pytest.raises(ValueError, match="Unsupported GRIB edition 2"):
+        grib_func.parse_grib(b"GRIB\x00\x00\x00\x02" + bytes(20))
+
+
+@pytest.mark.parametrize("value", [0.0, 1.0, -1.0, 102083.1875, -122.8619384765625, 1e-5, 3.3e7])
+def test_ibm_float_rounds_towards_minus_infinity(value):
+    encoded = grib_func._ibm_to_float(grib_func._float_to_ibm(value))
+
+    assert encoded <= value
+    assert encoded == pytest.approx(value, rel=1e-6, abs=1e-12)
@@ -0,0 +1,55 @@
+import importlib.util
+import os
+
+from pathlib import Path
+
+import pytest
+
+BENCHMARK = Path(__file__).resolve().parent.parent / "benchmarks" / "bench_import_time.py"
+
+spec = importlib.util.spec_from_file_location("bench_import_time", BENCHMARK)
+bench_import_time = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_import_time)
+
+# Generous: a lazy src.process imports in ~0.1s, eager SDK imports took >1s.
+# Wall clock time depends on machine load, so it is only checked on request:
+#     CHECK_IMPORT_TIME=1 python -m pytest tests/test_import_time.py
+IMPORT_BUDGET_MS = 600
+
+
+def test_processor_import_does_not_load_heavy_sdks():
+    report = bench_import_time.measure_imports("src.process")
+
+    assert report.entries, "no -X importtime output"
+    assert report.heavy_loaded() == []
+
+
+def test_offline_decoder_does_not_load_service_clients():
+    report = bench_import_time.measure_imports("src.inreach_decoder")
+
+    assert report.heavy_loaded() == []
+    assert "src.graph_mail" not in report.loaded
+
+
+@pytest.mark.skipif(not os.environ.get("CHECK_IMPORT_TIME"), reason="set CHECK_IMPORT_TIME=1 to measure")
+def test_processor_import_time_within_budget():
+    report = bench_import_time.measure_imports("src.process")
+
+    assert report.total_ms < IMPORT_BUDGET_MS, [
+        (e.module, e.cumulative_us) for e in report.slowest_imports(5)
+    ]
+
+
+def test_parse_importtime_output():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |     zlib\n"
+        "import time:       300 |        400 |   src.compression_functions\n"
+        "import time:       500 |        900 | src.process\n"
+    )
+
+    report = bench_import_time.parse_importtime(stderr, "src.process")
+
+    assert report.total_ms == 0.9
+    assert [e.depth for e in report.entries] == [2, 1, 0]
+    assert report.slowest_imports(1)[0].module == "src.compression_functions"
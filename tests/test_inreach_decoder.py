@@ -0,0 +1,64 @@
+import random
+import time
+from pathlib import Path
+
+from src import framing
+from src import inreach_functions as inreach_func
+from src.inreach_decoder import InReachDecoder, main
+from src.saildoc_functions import encode_saildocs_grib_file
+
+FIXTURES = Path(__file__).parent / "fixtures"
+GRIB = FIXTURES / "saildocs_sample.grb"
+
+
+def test_messy_paste_decodes_and_reports_missing_parts():
+    frames = framing.frame_messages(encode_saildocs_grib_file(str(GRIB)), "k3x9a")
+    shuffled = frames[1:] + frames[3:5]
+    random.Random(1).shuffle(shuffled)
+
+    decoder = InReachDecoder()
+    decoder.feed("Sent 12:04 from Earthmate\n\n" + "\n\nView location or send reply\n".join(shuffled))
+
+    assert not decoder.complete
+    assert decoder.missing == [1]
+    assert decoder.duplicates == 2
+
+    # The last message arrives in two pieces
+    header, data = frames[0].split("\n")
+    assert decoder.feed(header) == []
+    assert decoder.feed(data + "\n") == [1]
+
+    assert decoder.complete
+    assert decoder.decode() == GRIB.read_bytes()
+
+
+def test_legacy_and_fec_messages_decode(tmp_path):
+    payload = encode_saildocs_grib_file(str(GRIB))
+
+    legacy = InReachDecoder()
+    legacy.feed("\n".join(reversed(inreach_func.wrap_messages(inreach_func.split_message(payload)))))
+    assert legacy.decode() == GRIB.read_bytes()
+
+    fec_frames = framing.frame_fec_messages(payload, "k3x9a", parity=2)
+    paste = tmp_path / "paste.txt"
+    paste.write_text("\n".join(fec_frames[2:]))
+    output = tmp_path / "out.grb"
+
+    assert main([str(paste), "-o", str(output)]) == 0
+    assert output.read_bytes() == GRIB.read_bytes()
+
+    paste.write_text("\n".join(fec_frames[3:]))
+    assert main([str(paste), "-o", str(output)]) == 1
+
+
+def test_large_paste_is_indexed_in_linear_time():
+    frames = framing.frame_messages("A" * 300_000, "k3x9a")
+    paste = "\n".join(frames * 5)
+
+    started = time.perf_counter()
+    decoder = InReachDecoder()
+    decoder.feed(paste)
+
+    assert decoder.complete
+    assert decoder.duplicates == 4 * len(frames)
+    assert time.perf_counter() - started < 2
@@ -8,6 +8,7 @@ from src.saildoc_functions import encode_saildocs_grib_file
 from src import inreach_functions as inreach_func
 from src.saildoc_functions import encode_saildocs_grib_file, decode_saildocs_grib_file
 from src.saildoc_functions import unwrap_messages_to_payload_chunks
+from src.compression_functions import decompress_payload
 
 
 # --------------------------------------------------
@@ -95,6 +96,6 @@ async def test_grib_encode_split_send_merge_decode(monkeypatch):
         for msg in sent_messages
     )
 
-    decoded = base64.b64decode(merged_encoded)
+    decoded = decompress_payload(base64.b64decode(merged_encoded))
 
     assert decoded == original_bytes
@@ -0,0 +1,38 @@
+import httpx
+import pytest
+
+from src.inreach_sender import InReachSender
+
+URL = "https://explore.garmin.com/textmessage/txtmsg?extId=TEST-GUID"
+
+
+@pytest.mark.asyncio
+async def test_sender_reuses_one_client_for_all_parts():
+    posted: list[dict] = []
+
+    def handler(request: httpx.Request):
+        posted.append(dict(httpx.QueryParams(request.content.decode())))
+        return httpx.Response(200, text="OK")
+
+    async with InReachSender(httpx.AsyncClient(transport=httpx.MockTransport(handler))) as sender:
+        client = sender.client
+        for part in ["msg 1/2:\nAAA\nend", "msg 2/2:\nBBB\nend"]:
+            response = await sender.send(URL, part)
+            assert response.status_code == 200
+        assert sender.client is client
+
+    assert client.is_closed
+    assert [p["ReplyMessage"] for p in posted] == ["msg 1/2:\nAAA\nend", "msg 2/2:\nBBB\nend"]
+    assert {p["Guid"] for p in posted} == {"TEST-GUID"}
+
+
+@pytest.mark.asyncio
+async def test_sender_recreates_client_after_close():
+    sender = InReachSender()
+    first = sender.client
+
+    await sender.aclose()
+
+    assert first.is_closed
+    assert sender.client is not first
+    await sender.aclose()
@@ -0,0 +1,229 @@
+import asyncio
+
+import pytest
+
+from pathlib import Path
+
+from src import process
+from src.grib_cache import GribCache
+from src.InReachRequest import InReachRequest
+from src.job_store import (
+    DONE,
+    FAILED,
+    QUERIED,
+    RECEIVED,
+    SENDING,
+    Job,
+    JobStore,
+    MemoryJobStore,
+    SqliteJobStore,
+)
+from src.payload_buffer import PayloadBuffer
+from src.sqlite_cache import SqliteLRUCache
+
+FIXTURE = Path(__file__).parent / "fixtures" / "saildocs_small.grb"
+WEATHER = InReachRequest("weather", "40N,50N,20W,10W|1,1|24|WIND", "https://garmin.com/a")
+
+
+class FakeSender:
+    def __init__(self, fail_after: int | None = None):
+        self.sent: list[str] = []
+        self.fail_after = fail_after
+
+    async def send(self, url, message):
+        if self.fail_after is not None and len(self.sent) >= self.fail_after:
+            raise ConnectionError("function timeout")
+        self.sent.append(message)
+        return type("Response", (), {"status_code": 200, "text": "OK"})()
+
+
+def requests_once(*requests):
+    pending = list(requests)
+
+    async def fake_retrieve_new_inreach_requests(mail):
+        taken = list(pending)
+        pending.clear()
+        return taken
+
+    return fake_retrieve_new_inreach_requests
+
+
+@pytest.fixture
+def fast_sending(monkeypatch):
+    monkeypatch.setattr("src.process.configs.DELAY_BETWEEN_MESSAGES", 0.001)
+    monkeypatch.setattr("src.process.configs.SEND_MIN_INTERVAL", 0.001)
+    monkeypatch.setattr("src.process.configs.SEND_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr("src.process.grib_cache.get_grib_cache", lambda: GribCache(SqliteLRUCache(":memory:")))
+
+
+def test_incomplete_store_fails_at_construction():
+    class NoPruneJobStore(JobStore):
+        save = MemoryJobStore.save
+        get = MemoryJobStore.get
+        active = MemoryJobStore.active
+
+    with pytest.raises(TypeError, match="prune"):
+        NoPruneJobStore()
+
+
+def test_sqlite_store_keeps_jobs_between_connections(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+
+    store = SqliteJobStore(path)
+    job = Job.from_request(WEATHER)
+    job.state = SENDING
+    job.parts = ["msg 1/2:\nA\nend", "msg 2/2:\nB\nend"]
+    job.delivered = [1]
+    store.save(job)
+    store.close()
+
+    reopened = SqliteJobStore(path)
+    (active,) = reopened.active()
+    assert active == reopened.get(job.id)
+    assert active.progress == "sending(1/2)"
+
+    active.state = DONE
+    reopened.save(active)
+    assert reopened.active() == []
+    reopened.prune(older_than=active.updated_at + 1)
+    assert reopened.get(job.id) is None
+
+
+@pytest.mark.asyncio
+async def test_weather_job_waits_for_saildocs_across_runs(monkeypatch, fast_sending):
+    store = MemoryJobStore()
+    replies: list = [None, PayloadBuffer(FIXTURE.read_bytes())]
+    queries: list[str] = []
+    waits: list[float] = []
+
+    async def fake_request_weather_report(mail, command):
+        queries.append(command)
+
+    async def fake_process_new_saildocs_response(mail, command, timeout=None):
+        waits.append(timeout)
+        return replies.pop(0)
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests_once(WEATHER))
+    monkeypatch.setattr("src.process.request_weather_report", fake_request_weather_report)
+    monkeypatch.setattr("src.process.process_new_saildocs_response", fake_process_new_saildocs_response)
+    monkeypatch.setattr("src.process.configs.RUN_TIME_BUDGET", 5)
+
+    sender = FakeSender()
+    assert await process.run(mail=object(), inreach_sender=sender, job_store=store)
+    (job,) = store.active()
+    assert job.state == QUERIED
+    # The Saildocs wait ends with the run, not after SAILDOCS_RESPONSE_WAIT
+    assert 0 < waits[0] <= 5
+    assert sender.sent == []
+
+    assert await process.run(mail=object(), inreach_sender=sender, job_store=store)
+    assert store.active() == []
+    assert store.get(job.id).state == DONE
+    assert queries == [WEATHER.payload_text]
+    assert sender.sent
+
+
+@pytest.mark.asyncio
+async def test_interrupted_send_resumes_after_last_delivered_part(monkeypatch, fast_sending):
+    store = MemoryJobStore()
+
+    async def fake_stream_openai_response(prompt, deadline=None):
+        yield "x" * 300
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests_once(
+        InReachRequest("chat", "long answer please", "https://garmin.com/a")
+    ))
+    monkeypatch.setattr("src.process.openai_func.stream_openai_response", fake_stream_openai_response)
+    monkeypatch.setattr("src.process.configs.JOB_MAX_SEND_ROUNDS", 2)
+
+    first = FakeSender(fail_after=1)
+    await process.run(mail=object(), inreach_sender=first, job_store=store)
+    (job,) = store.active()
+    assert job.progress == "sending(1/3)"
+
+    second = FakeSender()
+    assert await process.run(mail=object(), inreach_sender=second, job_store=store)
+
+    # Part 1 was streamed before the total was known
+    assert [m.split(":")[0] for m in first.sent + second.sent] == ["msg 1/?", "msg 2/3", "msg 3/3"]
+    assert store.get(job.id).state == DONE
+
+
+@pytest.mark.asyncio
+async def test_broken_off_answer_is_not_streamed_again(monkeypatch, fast_sending):
+    store = MemoryJobStore()
+    questions: list[str] = []
+
+    async def fake_stream_openai_response(prompt, deadline=None):
+        questions.append(prompt)
+        yield "x" * 200
+        await asyncio.sleep(0)
+        raise TimeoutError("No complete OpenAI response in time")
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests_once(
+        InReachRequest("chat", "long answer please", "https://garmin.com/a")
+    ))
+    monkeypatch.setattr("src.process.openai_func.stream_openai_response", fake_stream_openai_response)
+
+    sender = FakeSender()
+    assert await process.run(mail=object(), inreach_sender=sender, job_store=store)
+    assert await process.run(mail=object(), inreach_sender=sender, job_store=store)
+
+    assert questions == ["long answer please"]
+    assert [m.split(":")[0] for m in sender.sent] == ["msg 1/?", "msg 2/2"]
+    assert "".join(m.split("\n")[1] for m in sender.sent) == "x" * 200
+    assert store.active() == []
+
+
+@pytest.mark.asyncio
+async def test_answer_is_not_streamed_again_after_a_restart(monkeypatch, fast_sending):
+    store = MemoryJobStore()
+    questions: list[str] = []
+
+    async def fake_stream_openai_response(prompt, deadline=None):
+        questions.append(prompt)
+        yield "x" * 200
+        # The worker dies after part 1 was delivered
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests_once(
+        InReachRequest("chat", "long answer please", "https://garmin.com/a")
+    ))
+    monkeypatch.setattr("src.process.openai_func.stream_openai_response", fake_stream_openai_response)
+
+    sender = FakeSender()
+    with pytest.raises(asyncio.CancelledError):
+        await process.run(mail=object(), inreach_sender=sender, job_store=store)
+
+    (job,) = store.active()
+    assert (job.state, job.delivered) == (RECEIVED, [1])
+
+    assert await process.run(mail=object(), inreach_sender=sender, job_store=store)
+
+    assert questions == ["long answer please"]
+    assert [m.split(":")[0] for m in sender.sent] == ["msg 1/?", "msg 2/2"]
+    assert store.get(job.id).state == DONE
+
+
+@pytest.mark.asyncio
+async def test_job_is_given_up_after_max_attempts(monkeypatch):
+    store = MemoryJobStore()
+
+    async def failing_openai(prompt, deadline=None):
+        raise RuntimeError("OpenAI failure")
+        yield
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests_once(
+        InReachRequest("chat", "question", "https://garmin.com/a")
+    ))
+    monkeypatch.setattr("src.process.openai_func.stream_openai_response", failing_openai)
+    monkeypatch.setattr("src.process.configs.JOB_MAX_ATTEMPTS", 2)
+
+    assert not await process.run(mail=object(), inreach_sender=FakeSender(), job_store=store)
+    (job,) = store.active()
+    assert job.state == RECEIVED and job.attempts == 1
+
+    assert not await process.run(mail=object(), inreach_sender=FakeSender(), job_store=store)
+    assert store.active() == []
+    assert store.get(job.id).state == FAILED
+    assert store.get(job.id).error == "OpenAI failure"
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+
+from io import BytesIO
+from types import SimpleNamespace
+
+from src import configs
+from src.email_functions import process_new_saildocs_response
+from src.mail_subscription import LocalNotifier, MailSubscription
+
+
+def make_mail(message_id: str, sender: str, body: str, is_read: bool = False):
+    return SimpleNamespace(
+        id=message_id,
+        is_read=is_read,
+        from_=SimpleNamespace(email_address=SimpleNamespace(address=sender)),
+        body=SimpleNamespace(content=body, content_type="text"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_waiter_wakes_on_matching_mail_only():
+    notifier = LocalNotifier()
+    subscription = MailSubscription(notifier)
+
+    waiter = asyncio.create_task(subscription.wait_for(lambda m: m.id == "wanted", timeout=5))
+    await asyncio.sleep(0)
+
+    notifier.publish(make_mail("other", "a@b.c", ""))
+    notifier.publish(make_mail("wanted", "a@b.c", ""))
+
+    assert (await waiter).id == "wanted"
+
+
+@pytest.mark.asyncio
+async def test_mail_arriving_before_waiter_is_claimed_later():
+    notifier = LocalNotifier()
+    subscription = MailSubscription(notifier)
+
+    first = asyncio.create_task(subscription.wait_for(lambda m: m.id == "first", timeout=5))
+    await asyncio.sleep(0)
+    notifier.publish(make_mail("second", "a@b.c", ""), make_mail("first", "a@b.c", ""))
+    await first
+
+    assert (await subscription.wait_for(lambda m: m.id == "second", timeout=0.01)).id == "second"
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_none_on_timeout():
+    subscription = MailSubscription(LocalNotifier())
+
+    assert await subscription.wait_for(lambda m: True, timeout=0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_saildocs_response_wakes_waiting_request():
+    notifier = LocalNotifier()
+    marked_read: list[str] = []
+
+    class FakeMail:
+        subscription = MailSubscription(notifier)
+
+        def inbox_subscription(self, user_id):
+            return self.subscription
+
+        async def download_grib_attachment(self, user_id, message_id):
+            return BytesIO(b"GRIB-" + message_id.encode())
+
+        async def mark_as_read(self, user_id, message_id):
+            marked_read.append(message_id)
+
+    saildocs = configs.SAILDOCS_RESPONSE_EMAIL()
+    command = "ecmwf:24n,34n,72w,60w|8,8|12,48|wind,press"
+
+    waiter = asyncio.create_task(process_new_saildocs_response(FakeMail(), command))
+    await asyncio.sleep(0)
+
+    notifier.publish(
+        make_mail("from-someone-else", "someone@else.com", f"send {command}"),
+        make_mail("already-read", saildocs, f"send {command}", is_read=True),
+        make_mail("other-command", saildocs, "send gfs:10n,20n,10w,20w"),
+        make_mail("reply", saildocs, f"Data extracted from file ... request: send {command.upper()}"),
+    )
+
+    grib_file = await asyncio.wait_for(waiter, 5)
+
+    assert grib_file.read() == b"GRIB-reply"
+    assert marked_read == ["reply"]
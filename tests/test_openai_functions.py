@@ -0,0 +1,64 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import openai_functions as openai_func
+
+
+class FakeStream:
+    def __init__(self, texts: list[str], delay: float = 0):
+        self.texts = texts
+        self.delay = delay
+        self.closed = False
+
+    async def __aiter__(self):
+        for text in self.texts:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_client(stream: FakeStream, requests: list[dict]):
+    async def create(**kwargs):
+        requests.append(kwargs)
+        return stream
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@pytest.mark.asyncio
+async def test_answer_is_streamed(monkeypatch):
+    stream = FakeStream(["Light ", "winds", None])
+    requests: list[dict] = []
+    monkeypatch.setattr(openai_func, "get_client", lambda: fake_client(stream, requests))
+
+    texts = [text async for text in openai_func.stream_openai_response("10: wind tomorrow?")]
+
+    assert texts == ["Light ", "winds"]
+    assert requests[0]["stream"] is True
+    assert "maximum 10 words" in requests[0]["messages"][0]["content"]
+    assert stream.closed
+
+
+@pytest.mark.asyncio
+async def test_stream_is_closed_at_the_deadline(monkeypatch):
+    stream = FakeStream(["a"] * 10, delay=0.01)
+    monkeypatch.setattr(openai_func, "get_client", lambda: fake_client(stream, []))
+
+    with pytest.raises(TimeoutError):
+        await openai_func.request_openai_response("10: question", deadline=time.monotonic() + 0.025)
+
+    assert stream.closed
+
+
+@pytest.mark.asyncio
+async def test_invalid_request_is_not_sent(monkeypatch):
+    requests: list[dict] = []
+    monkeypatch.setattr(openai_func, "get_client", lambda: fake_client(FakeStream([]), requests))
+
+    assert await openai_func.request_openai_response("no word limit") is None
+    assert requests == []
@@ -0,0 +1,75 @@
+import base64
+import json
+import time
+import httpx
+import pytest
+
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.graph_mail import GraphMailService
+from src.payload_buffer import BASE64, RAW, PayloadBuffer
+from src.saildoc_functions import encode_saildocs_grib_file, decode_saildocs_grib_file
+
+FIXTURE = Path(__file__).parent / "fixtures" / "saildocs_small.grb"
+
+
+def test_base64_buffer_is_decoded_once():
+    grib = FIXTURE.read_bytes()
+    buffer = PayloadBuffer(base64.b64encode(grib), BASE64)
+
+    assert bytes(buffer.raw()) == grib
+    assert buffer.encoding == RAW
+    assert buffer.raw() is buffer.raw()
+
+
+def test_base64_grib_cannot_be_wrapped_as_raw():
+    with pytest.raises(ValueError):
+        PayloadBuffer(base64.b64encode(FIXTURE.read_bytes()))
+
+
+def test_bytesio_content_is_not_copied():
+    grib = FIXTURE.read_bytes()
+
+    assert PayloadBuffer.from_source(BytesIO(grib)).raw() is grib
+
+
+def test_encoded_grib_is_identical_for_raw_and_base64_buffers():
+    grib = FIXTURE.read_bytes()
+
+    from_raw = encode_saildocs_grib_file(PayloadBuffer(bytearray(grib)))
+    from_base64 = encode_saildocs_grib_file(PayloadBuffer(base64.b64encode(grib), BASE64))
+
+    assert from_raw == from_base64
+    assert decode_saildocs_grib_file([from_raw]) == grib
+
+
+@pytest.mark.asyncio
+async def test_attachment_is_streamed_from_value_endpoint():
+    grib = FIXTURE.read_bytes()
+    requested: list[str] = []
+
+    def handler(request: httpx.Request):
+        requested.append(request.url.raw_path.decode())
+        if request.url.path.endswith("/$batch"):
+            (batched,) = json.loads(request.content)["requests"]
+            assert "contentBytes" not in batched["url"]
+            body = {"value": [
+                {"id": "att-1", "name": "notes.txt", "size": 10},
+                {"id": "att/2", "name": "gfs.grb", "size": len(grib)},
+            ]}
+            return httpx.Response(200, json={"responses": [{"id": batched["id"], "status": 200, "body": body}]})
+        return httpx.Response(200, content=grib)
+
+    mail = GraphMailService()
+    mail._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    mail._token = SimpleNamespace(token="token", expires_on=time.time() + 3600)
+
+    buffer = await mail.download_grib_attachment("user@mail.com", "msg-1")
+    await mail.aclose()
+
+    assert buffer.name == "gfs.grb"
+    assert buffer.encoding == RAW
+    assert bytes(buffer.raw()) == grib
+    assert requested[-1].endswith("/attachments/att%2F2/$value")
@@ -1,4 +1,5 @@
 #FILE test_process_run.py
+import asyncio
 import pytest
 from src.InReachRequest import InReachRequest
 from src.process import run
@@ -15,16 +16,16 @@ async def test_run_triggers_weather_request_for_weather_inreach_message(monkeypa
     # -------------------------------------------------
     # Fake InReach request (weather)
     # -------------------------------------------------
-    async def fake_retrieve_new_inreach_request(mail):
-        return InReachRequest(
+    async def fake_retrieve_new_inreach_requests(mail):
+        return [InReachRequest(
             "weather",
             "TEST-COMMAND",
             "https://garmin.com/sendmessage?extId=TEST-GUID"
-        )
+        )]
 
     monkeypatch.setattr(
-        "src.process.retrieve_new_inreach_request",
-        fake_retrieve_new_inreach_request,
+        "src.process.retrieve_new_inreach_requests",
+        fake_retrieve_new_inreach_requests,
     )
 
     # -------------------------------------------------
@@ -45,7 +46,7 @@ async def test_run_triggers_weather_request_for_weather_inreach_message(monkeypa
     # -------------------------------------------------
     # Short-circuit downstream processing
     # -------------------------------------------------
-    async def fake_process_new_saildocs_response(mail, payload_text):
+    async def fake_process_new_saildocs_response(mail, payload_text, timeout=None):
         return None  # stop pipeline early
 
     monkeypatch.setattr(
@@ -85,32 +86,33 @@ async def test_run_triggers_chatgpt_and_sends_response_to_inreach(monkeypatch):
     # -------------------------------------------------
     # Fake InReach request (chat)
     # -------------------------------------------------
-    async def fake_retrieve_new_inreach_request(mail):
-        return InReachRequest(
+    async def fake_retrieve_new_inreach_requests(mail):
+        return [InReachRequest(
             type="chat",
             payload_text="What is the weather like tomorrow?",
             reply_url="https://garmin.com/sendmessage?extId=CHAT-GUID"
-        )
+        )]
 
     monkeypatch.setattr(
-        "src.process.retrieve_new_inreach_request",
-        fake_retrieve_new_inreach_request,
+        "src.process.retrieve_new_inreach_requests",
+        fake_retrieve_new_inreach_requests,
     )
 
     # -------------------------------------------------
     # Mock OpenAI call
     # -------------------------------------------------
-    async def fake_request_openai_response(prompt: str) -> str:
+    async def fake_stream_openai_response(prompt: str, deadline=None):
         nonlocal openai_called
         openai_called = True
 
         assert prompt == "What is the weather like tomorrow?"
 
-        return "Tomorrow will be sunny with light winds."
+        for text in ["Tomorrow will be ", "sunny with light winds."]:
+            yield text
 
     monkeypatch.setattr(
-        "src.process.openai_func.request_openai_response",
-        fake_request_openai_response,
+        "src.process.openai_func.stream_openai_response",
+        fake_stream_openai_response,
     )
 
     # -------------------------------------------------
@@ -141,3 +143,52 @@ async def test_run_triggers_chatgpt_and_sends_response_to_inreach(monkeypatch):
     assert openai_called is True
     assert len(sent_messages) == 1
     assert "Tomorrow will be sunny" in sent_messages[0]
+
+
+@pytest.mark.asyncio
+async def test_run_processes_all_requests_concurrently_and_isolates_failures(monkeypatch):
+    """
+    run() should dispatch every pending request, at most
+    MAX_CONCURRENT_REQUESTS at a time, and keep going when one fails.
+    """
+
+    in_flight = 0
+    max_in_flight = 0
+    sent_to: list[str] = []
+
+    async def fake_retrieve_new_inreach_requests(mail):
+        return [
+            InReachRequest("chat", f"10:question {i}", f"https://garmin.com/sendmessage?extId=GUID-{i}")
+            for i in range(6)
+        ]
+
+    async def fake_stream_openai_response(prompt: str, deadline=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+        if prompt.endswith("3"):
+            raise RuntimeError("OpenAI failure")
+        yield f"answer to {prompt}"
+
+    class FakeSender:
+        async def send(self, url: str, message: str):
+            sent_to.append(url)
+
+            class Response:
+                status_code = 200
+                text = "OK"
+
+            return Response()
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", fake_retrieve_new_inreach_requests)
+    monkeypatch.setattr("src.process.openai_func.stream_openai_response", fake_stream_openai_response)
+    monkeypatch.setattr("src.process.configs.MAX_CONCURRENT_REQUESTS", 2)
+
+    result = await run(mail=object(), inreach_sender=FakeSender())
+
+    assert result is False
+    assert max_in_flight == 2
+    assert sorted(sent_to) == [f"https://garmin.com/sendmessage?extId=GUID-{i}" for i in (0, 1, 2, 4, 5)]
@@ -0,0 +1,125 @@
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src import process
+from src import route
+from src.grib_cache import GribCache
+from src.grib_functions import GribMessage, field_values, mask_grib, pack_values, parse_grib
+from src.InReachRequest import InReachRequest
+from src.payload_buffer import PayloadBuffer
+from src.saildoc_functions import (
+    decode_saildocs_grib_file,
+    parse_grib_request,
+    unwrap_messages_to_payload_chunks,
+)
+from src.sqlite_cache import SqliteLRUCache
+
+FIXTURE = Path(__file__).parent / "fixtures" / "saildocs_sample.grb"
+
+
+def lat_lon_grib(ni: int, nj: int, la1: float, lo1: float, step: float) -> bytes:
+    """
+    One UGRD field on a regular grid, south to north, with the PDS of the fixture.
+    """
+    def signed24(value):
+        millidegrees = round(value * 1000)
+        return ((0x800000 | -millidegrees) if millidegrees < 0 else millidegrees).to_bytes(3, "big")
+
+    gds = (
+        (32).to_bytes(3, "big") + bytes([0, 255, 0])
+        + ni.to_bytes(2, "big") + nj.to_bytes(2, "big")
+        + signed24(la1) + signed24(lo1) + b"\x80"
+        + signed24(la1 + (nj - 1) * step) + signed24(lo1 + (ni - 1) * step)
+        + round(step * 1000).to_bytes(2, "big") + round(step * 1000).to_bytes(2, "big")
+        + b"\x40" + bytes(4)
+    )
+    template = parse_grib(FIXTURE.read_bytes())[9]
+    values = np.random.default_rng(5).normal(0, 8, ni * nj)
+    message = pack_values(GribMessage(template.pds, gds, None, template.bds), values, 0.1)
+    return message.to_bytes()
+
+
+def test_route_request_asks_saildocs_for_the_corridor_box():
+    request = parse_grib_request("gfs:24n,65w;30n,55w;35n,40w|1,1|0,24,48|wind,press corridor=60 fec=1")
+
+    assert request.command == "gfs:23N,36N,67W,38W|1,1|0,24,48|wind,press"
+    assert request.waypoints == ((24.0, -65.0), (30.0, -55.0), (35.0, -40.0))
+    assert (request.corridor_nm, request.parity) == (60.0, 1)
+
+    with pytest.raises(ValueError, match="two waypoints"):
+        parse_grib_request("gfs:24n,65w;|1,1|24|wind")
+
+
+def test_route_across_the_dateline_asks_for_a_box_across_180():
+    request = parse_grib_request("gfs:20n,170e;25n,170w|1,1|24|wind corridor=120")
+
+    assert request.command == "gfs:18N,27N,167E,167W|1,1|24|wind"
+    assert route.corridor_area(((0.0, -10.0), (0.0, 10.0)), 60) == "1S,1N,12W,12E"
+
+
+def test_distance_to_route_legs():
+    waypoints = ((0.0, 0.0), (0.0, 10.0))
+
+    distances = route.distance_nm(np.array([1.0, 0.0, 0.0]), np.array([5.0, -1.0, 179.0]), waypoints)
+    assert distances[0] == pytest.approx(60.0)
+    assert distances[1] == pytest.approx(60.0)
+    assert distances[2] > 3000
+
+
+def test_masked_grib_shrinks_with_the_corridor_share():
+    grib = lat_lon_grib(ni=41, nj=31, la1=20.0, lo1=-70.0, step=1.0)
+    waypoints = ((22.0, -68.0), (48.0, -32.0))
+
+    masked = mask_grib(grib, lambda lat, lon: route.distance_nm(lat, lon, waypoints) <= 120, precision={})
+
+    original, cropped = parse_grib(grib)[0], parse_grib(masked)[0]
+    lat, lon = cropped.grid().coordinates()
+    inside = route.distance_nm(lat, lon, waypoints) <= 120
+    share = inside.mean()
+
+    assert 0.1 < share < 0.4
+    assert np.array_equal(cropped.bitmap(), inside)
+    assert np.allclose(field_values(cropped)[inside], field_values(original)[inside], atol=0.05)
+    # Packed values shrink with the share kept; the bitmap costs one bit per point
+    assert len(cropped.bds) < share * len(original.bds) + 16
+    assert len(masked) < (share + 0.15) * len(grib)
+
+
+@pytest.mark.asyncio
+async def test_route_reply_is_masked_before_encoding(monkeypatch):
+    saildocs_queries: list[str] = []
+    sent: list[str] = []
+
+    async def fake_retrieve_new_inreach_requests(mail):
+        return [InReachRequest("weather", "gfs:22n,46w;34n,30w|4,4|0,96|wind,press corridor=150", "https://garmin.com/a")]
+
+    async def fake_request_weather_report(mail, command):
+        saildocs_queries.append(command)
+
+    async def fake_process_new_saildocs_response(mail, command, timeout=None):
+        return PayloadBuffer(FIXTURE.read_bytes(), name="gfs.grb")
+
+    class FakeSender:
+        async def send(self, url, message):
+            sent.append(message)
+            return type("Response", (), {"status_code": 200, "text": "OK"})()
+
+    async def fake_sleep(_):
+        return None
+
+    monkeypatch.setattr("src.process.grib_cache.get_grib_cache", lambda: GribCache(SqliteLRUCache(":memory:")))
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", fake_retrieve_new_inreach_requests)
+    monkeypatch.setattr("src.process.request_weather_report", fake_request_weather_report)
+    monkeypatch.setattr("src.process.process_new_saildocs_response", fake_process_new_saildocs_response)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    assert await process.run(mail=object(), inreach_sender=FakeSender())
+
+    assert saildocs_queries == ["gfs:19N,37N,50W,26W|4,4|0,96|wind,press"]
+    messages = parse_grib(decode_saildocs_grib_file(unwrap_messages_to_payload_chunks("\n".join(sent))))
+    assert len(messages) == 27
+    # The corners away from the diagonal route are masked out
+    assert all(m.bitmap() is not None and not m.bitmap()[[4, 15]].any() for m in messages)
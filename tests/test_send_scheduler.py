@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+
+from src import inreach_functions as inreach_func
+from src.send_scheduler import SendScheduler, TokenBucket
+
+URL = "https://garmin.com/sendmessage?extId=TEST-GUID"
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict | None = None):
+        self.status_code = status_code
+        self.text = "OK" if status_code == 200 else "ERROR"
+        self.headers = headers or {}
+
+
+class ScriptedSender:
+    """
+    Returns scripted responses per part; default 200.
+    """
+    def __init__(self, script: dict[str, list[FakeResponse]] | None = None):
+        self.script = script or {}
+        self.sent: list[str] = []
+
+    async def send(self, url: str, message: str):
+        self.sent.append(message)
+        responses = self.script.get(message)
+        if responses:
+            return responses.pop(0)
+        return FakeResponse(200)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded: list[float] = []
+
+    async def fake_sleep(seconds):
+        recorded.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+@pytest.mark.asyncio
+async def test_all_parts_delivered_with_summary(sleeps):
+    sender = ScriptedSender()
+
+    summary = await inreach_func.send_messages_to_inreach(URL, ["p1", "p2", "p3"], sender)
+
+    assert sender.sent == ["p1", "p2", "p3"]
+    assert summary.delivered == [1, 2, 3]
+    assert summary.failed == []
+    assert summary.all_delivered
+
+
+@pytest.mark.asyncio
+async def test_failed_part_is_retried_without_stalling_queue(sleeps):
+    sender = ScriptedSender({"p2": [FakeResponse(503)]})
+
+    summary = await SendScheduler(interval=1, retry_backoff=30).send(URL, ["p1", "p2", "p3", "p4"], sender)
+
+    assert sender.sent == ["p1", "p2", "p3", "p4", "p2"]
+    assert summary.delivered == [1, 2, 3, 4]
+    assert summary.attempts == 5
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_sending(sleeps):
+    sender = ScriptedSender({"p1": [FakeResponse(429, {"retry-after": "42"})]})
+
+    summary = await SendScheduler(interval=1).send(URL, ["p1", "p2"], sender)
+
+    assert summary.all_delivered
+    assert max(sleeps) == pytest.approx(42, abs=0.5)
+
+
+@pytest.mark.asyncio
+async def test_permanent_error_is_not_retried(sleeps):
+    sender = ScriptedSender({"p2": [FakeResponse(400)]})
+
+    summary = await SendScheduler(interval=1, max_attempts=3).send(URL, ["p1", "p2"], sender)
+
+    assert sender.sent == ["p1", "p2"]
+    assert summary.delivered == [1]
+    assert summary.failed == [2]
+
+
+def test_token_bucket_speeds_up_and_backs_off():
+    bucket = TokenBucket(rate=0.2, min_rate=0.05, max_rate=1.0, increase=0.1)
+
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 1.0
+
+    bucket.on_throttle()
+    assert bucket.rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_streamed_parts_are_sent_before_the_message_is_complete(monkeypatch):
+    monkeypatch.setattr("src.inreach_functions.configs.MESSAGE_SPLIT_LENGTH", 5)
+    monkeypatch.setattr("src.send_scheduler.configs.SEND_MIN_INTERVAL", 0.001)
+    sender = ScriptedSender({"msg 2/?:\nfghij\nend": [FakeResponse(503)]})
+    splitter = inreach_func.MessageSplitter()
+    rest_of_answer = asyncio.Event()
+
+    async def parts():
+        for text in ["abc", "defg", "hij"]:
+            for part in splitter.feed(text):
+                yield part
+        await rest_of_answer.wait()
+        for part in splitter.feed("k"):
+            yield part
+        for part in splitter.finish():
+            yield part
+
+    scheduler = SendScheduler(interval=0.001, retry_backoff=0.001)
+    sending = asyncio.create_task(scheduler.send_stream(URL, parts(), sender))
+    while not sender.sent:
+        await asyncio.sleep(0.001)
+
+    assert sender.sent == ["msg 1/?:\nabcde\nend"]
+    rest_of_answer.set()
+    summary = await sending
+
+    assert sender.sent[1:] == ["msg 2/?:\nfghij\nend", "msg 2/?:\nfghij\nend", "msg 3/3:\nk\nend"]
+    assert summary.delivered == [1, 2, 3] and summary.total == 3
+    assert splitter.message == "abcdefghijk"
+    assert inreach_func.wrap_messages(splitter.chunks)[0] == "msg 1/3:\nabcde\nend"
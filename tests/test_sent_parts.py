@@ -0,0 +1,70 @@
+import pytest
+
+from src import framing
+from src import process
+from src.email_functions import _decode_inreach_request
+from src.InReachRequest import InReachRequest
+from src.job_store import DONE, FAILED, MemoryJobStore
+from src.sent_parts import SentPartStore, parse_resend_request
+from src.sqlite_cache import SqliteLRUCache
+
+URL = "https://garmin.com/sendmessage?extId=A"
+
+
+def test_resend_request_is_decoded_and_parsed():
+    request = _decode_inreach_request(f"RESEND k3x9a 3,7\n\nReply to Garmin: {URL}")
+
+    assert request == InReachRequest("resend", "k3x9a 3,7", URL)
+    assert parse_resend_request(request.payload_text) == ("k3x9a", [3, 7])
+    assert parse_resend_request("2-4, 9,3") == (None, [2, 3, 4, 9])
+
+    with pytest.raises(ValueError):
+        parse_resend_request("k3x9a")
+    with pytest.raises(ValueError, match="up to 256"):
+        parse_resend_request("1-999999999")
+    for reversed_range in ("7-3", "ab12c 5-2"):
+        with pytest.raises(ValueError, match="Reversed"):
+            parse_resend_request(reversed_range)
+
+
+def test_parts_are_found_by_reply_url_and_expire():
+    store = SentPartStore(SqliteLRUCache(":memory:"), ttl=3600)
+    store.put(URL, "aaaaa", ["a1", "a2"], now=1000)
+    store.put(URL, "bbbbb", ["b1"], now=1001)
+
+    assert store.get(URL, "aaaaa", now=2000) == ("aaaaa", ["a1", "a2"])
+    assert store.get(URL, now=2000) == ("bbbbb", ["b1"])
+    assert store.get("https://garmin.com/sendmessage?extId=B", "aaaaa", now=2000) is None
+    assert store.get(URL, "aaaaa", now=1000 + 3600) is None
+
+
+@pytest.mark.asyncio
+async def test_only_listed_parts_are_sent_again(monkeypatch):
+    store = SentPartStore(SqliteLRUCache(":memory:"))
+    parts = framing.frame_messages("x" * 1000, "k3x9a")
+    store.put(URL, "k3x9a", parts)
+    sent: list[str] = []
+
+    class FakeSender:
+        async def send(self, url, message):
+            sent.append(message)
+            return type("Response", (), {"status_code": 200, "text": "OK"})()
+
+    def requests(text):
+        async def fake_retrieve_new_inreach_requests(mail):
+            return [InReachRequest("resend", text, URL)]
+        return fake_retrieve_new_inreach_requests
+
+    monkeypatch.setattr("src.process.sent_parts.get_sent_part_store", lambda: store)
+    monkeypatch.setattr("src.configs.DELAY_BETWEEN_MESSAGES", 0)
+    monkeypatch.setattr("src.configs.SEND_MIN_INTERVAL", 0.001)
+
+    job_store = MemoryJobStore()
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests("k3x9a 3,7"))
+    assert await process.run(mail=object(), inreach_sender=FakeSender(), job_store=job_store)
+    assert sent == [parts[2], parts[6]]
+
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", requests("zzzzz 1"))
+    assert await process.run(mail=object(), inreach_sender=FakeSender(), job_store=job_store)
+    assert len(sent) == 2
+    assert sorted(j.state for j in job_store._jobs.values()) == [DONE, FAILED]
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+
+from src.graph_mail import GraphMailService
+from src.inreach_sender import InReachSender
+from src.service_registry import ServiceRegistry
+
+
+class FakeToken:
+    def __init__(self, token: str, expires_on: float):
+        self.token = token
+        self.expires_on = expires_on
+
+
+class FakeCredential:
+    def __init__(self, lifetime: float = 3600):
+        self.lifetime = lifetime
+        self.calls = 0
+        self.closed = False
+
+    def get_token(self, scope):
+        self.calls += 1
+        return FakeToken(f"token-{self.calls}", time.time() + self.lifetime)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_steady_state_ticks_make_no_token_calls():
+    credential = FakeCredential()
+    registry = ServiceRegistry(mail=GraphMailService(credential=credential))
+
+    for _ in range(5):
+        services = await registry.prepare()
+        assert await services.mail._auth_headers() == {"Authorization": "Bearer token-1"}
+
+    assert credential.calls == 1
+    await registry.aclose()
+    assert credential.closed
+
+
+@pytest.mark.asyncio
+async def test_token_is_renewed_before_it_expires(monkeypatch):
+    monkeypatch.setattr("src.graph_mail.configs.GRAPH_TOKEN_REFRESH_MARGIN", 300)
+    credential = FakeCredential(lifetime=200)
+    registry = ServiceRegistry(mail=GraphMailService(credential=credential))
+
+    # Nothing is fetched before the first request
+    await registry.prepare()
+    assert credential.calls == 0
+
+    await registry.mail._access_token()
+    credential.lifetime = 3600
+    await registry.prepare()
+
+    assert credential.calls == 2
+    assert await registry.mail._access_token() == "token-2"
+
+
+def test_http_clients_are_recreated_for_a_new_event_loop():
+    credential = FakeCredential()
+    registry = ServiceRegistry(
+        mail=GraphMailService(credential=credential),
+        inreach_sender=InReachSender(),
+    )
+
+    async def tick():
+        services = await registry.prepare()
+        await services.mail._access_token()
+        return services.mail._http_client(), services.inreach_sender.client
+
+    first = asyncio.run(tick())
+    second = asyncio.run(tick())
+
+    assert first[0] is not second[0] and first[1] is not second[1]
+    assert registry.mail.credential is credential
+    assert credential.calls == 1
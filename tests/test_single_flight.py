@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+
+from collections import defaultdict
+from pathlib import Path
+
+from src import process
+from src.grib_cache import GribCache
+from src.InReachRequest import InReachRequest
+from src.payload_buffer import PayloadBuffer
+from src.saildoc_functions import unwrap_messages_to_payload_chunks
+from src.single_flight import SingleFlight
+from src.sqlite_cache import SqliteLRUCache
+
+FIXTURE = Path(__file__).parent / "fixtures" / "saildocs_small.grb"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "grib"
+
+    waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert "key" in flights
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["grib"] * 3
+    assert calls == 1
+    assert "key" not in flights
+
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_waiter_and_next_call_starts_fresh():
+    flights = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        raise RuntimeError("saildocs down")
+
+    results = await asyncio.gather(
+        flights.do("key", failing),
+        flights.do("key", failing),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    with pytest.raises(RuntimeError):
+        await flights.do("key", failing)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_identical_weather_requests_share_one_saildocs_query(monkeypatch):
+    saildocs_queries: list[str] = []
+    saildocs_waits: list[str] = []
+    sent: dict[str, list[str]] = defaultdict(list)
+
+    async def fake_retrieve_new_inreach_requests(mail):
+        return [
+            InReachRequest("weather", "ecmwf:40N,50N,20W,10W|1,1|24|WIND", "https://garmin.com/a"),
+            InReachRequest("weather", "ECMWF:50n,40n,20w,10w|1,1|24|wind", "https://garmin.com/b"),
+            InReachRequest("weather", "ecmwf:40N,50N,20W,10W|1,1|24|WIND", "https://garmin.com/c"),
+            InReachRequest("weather", "ecmwf:30N,40N,20W,10W|1,1|24|WIND", "https://garmin.com/d"),
+        ]
+
+    async def fake_request_weather_report(mail, command):
+        saildocs_queries.append(command)
+        await asyncio.sleep(0.01)
+
+    async def fake_process_new_saildocs_response(mail, command, timeout=None):
+        saildocs_waits.append(command)
+        await asyncio.sleep(0.01)
+        return PayloadBuffer(FIXTURE.read_bytes(), name="ecmwf.grb")
+
+    class FakeSender:
+        async def send(self, url, message):
+            sent[url].append(message)
+            return type("Response", (), {"status_code": 200, "text": "OK"})()
+
+    cache = GribCache(SqliteLRUCache(":memory:"))
+    monkeypatch.setattr("src.process.grib_cache.get_grib_cache", lambda: cache)
+    monkeypatch.setattr("src.process.retrieve_new_inreach_requests", fake_retrieve_new_inreach_requests)
+    monkeypatch.setattr("src.process.request_weather_report", fake_request_weather_report)
+    monkeypatch.setattr("src.process.process_new_saildocs_response", fake_process_new_saildocs_response)
+    monkeypatch.setattr("src.process.configs.DELAY_BETWEEN_MESSAGES", 0.001)
+    monkeypatch.setattr("src.process.configs.SEND_MIN_INTERVAL", 0.001)
+
+    assert await process.run(mail=object(), inreach_sender=FakeSender())
+
+    expected = ["ecmwf:30N,40N,20W,10W|1,1|24|WIND", "ecmwf:40N,50N,20W,10W|1,1|24|WIND"]
+    assert sorted(saildocs_queries) == expected
+    assert sorted(saildocs_waits) == expected
+    payloads = {url: unwrap_messages_to_payload_chunks("\n".join(messages)) for url, messages in sent.items()}
+    assert payloads["https://garmin.com/a"] == payloads["https://garmin.com/b"] == payloads["https://garmin.com/c"]
+    assert payloads["https://garmin.com/a"]